@@ -0,0 +1,157 @@
+# Сравнение движков постобработки: регулярные выражения по GFM, JSON AST
+# и потоковая обработка вывода pandoc.
+#
+#   python -m benchmarks.corpus out/large --docs 3 --pages 500 --images 40
+#   python -m benchmarks.bench_ast out/large --backend warm --memory --json out.json
+#
+# Сначала проверяется равнозначность результата: после нормализации (пустые
+# строки, якоря, имена файлов изображений заменены хэшами содержимого) текст
+# каждого движка должен совпадать с regex-вариантом. Код выхода 1, если нашлись
+# расхождения. --memory добавляет пиковый объём памяти Python (tracemalloc).
+# Известное отличие regex-варианта: ссылки из заменённого оглавления оставляют
+# после себя определения без использования — такие строки не сравниваются.
+import os
+import re
+import sys
+import glob
+import json
+import argparse
+import tempfile
+import tracemalloc
+from urllib.parse import unquote
+from src.converter.engine import convert_document
+from src.converter.pipeline import ENGINES
+from src.converter.tracing import Tracer
+from src.converter.utils import file_digest
+
+ANCHOR_RE = re.compile(r'<a id="([^"]*)"></a>')
+HTML_IMG_RE = re.compile(r'<img[^>]*src="([^"]+)"[^>]*>')
+MD_IMG_RE = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)\)")
+STYLE_RE = re.compile(r'style="([^"]*)"')
+REF_DEF_RE = re.compile(r"^\s*\[([^\]]+)\]:\s*(.*)$")
+
+
+def normalize(md_path):  # (строки текста, якоря) без различий, не влияющих на смысл.
+
+    md_dir = os.path.dirname(md_path)
+
+    def digest(src):
+        path = os.path.join(md_dir, unquote(src))
+        return file_digest(path)[:12] if os.path.isfile(path) else src
+
+    def html_img(match):
+        style = STYLE_RE.search(match.group(0))
+        return f"<img {digest(match.group(1))} {style.group(1) if style else ''}>"
+
+    with open(md_path, encoding="utf-8") as f:
+        content = f.read()
+    anchors = ANCHOR_RE.findall(content)
+    content = ANCHOR_RE.sub("", content)
+    content = HTML_IMG_RE.sub(html_img, content)
+    content = MD_IMG_RE.sub(lambda m: f"![{m.group(1)}]({digest(m.group(2))})", content)
+
+    lines = []
+    for line in content.splitlines():
+        ref = REF_DEF_RE.match(line)
+        if ref:
+            if f"[{ref.group(1)}]" not in content.replace(line, ""):
+                continue  # определение без использования
+            line = f"[{ref.group(1)}]: {unquote(ref.group(2))}"
+        if line.strip():
+            lines.append(line.rstrip())
+    return lines, anchors
+
+
+def same_anchors(regex, ast):  # regex-вариант теряет якорь первого раздела после TOC.
+    if regex == ast:
+        return True
+    if "оглавление" not in ast:
+        return False
+    i = ast.index("оглавление") + 1
+    return regex == ast[:i] + ast[i + 1 :]
+
+
+def convert(path, out_dir, engine, options):  # Один документ; интервалы стадий.
+    tracer = Tracer(os.path.basename(path))
+    output = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".md")
+    convert_document(path, output, dict(options, engine=engine), tracer)
+    return output, tracer.spans
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение движков постобработки")
+    parser.add_argument("corpus", help="папка с DOCX (benchmarks.corpus)")
+    parser.add_argument("--backend", default="subprocess")
+    parser.add_argument(
+        "--memory", action="store_true", help="замерять пиковую память Python"
+    )
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    files = sorted(glob.glob(os.path.join(args.corpus, "*.docx")))
+    if not files:
+        print("В папке нет DOCX файлов", file=sys.stderr)
+        return 1
+
+    totals = {engine: {} for engine in ENGINES}
+    peak_mb = {engine: 0.0 for engine in ENGINES}
+    mismatches = []
+    with tempfile.TemporaryDirectory(prefix="docx2md-bench-") as work_dir:
+        options = {"backend": args.backend, "cache_dir": os.path.join(work_dir, "c")}
+        for path in files:
+            outputs = {}
+            for engine in ENGINES:
+                out_dir = os.path.join(work_dir, engine, os.path.basename(path))
+                os.makedirs(out_dir)
+                if args.memory:
+                    tracemalloc.start()
+                outputs[engine], spans = convert(path, out_dir, engine, options)
+                if args.memory:
+                    peak = tracemalloc.get_traced_memory()[1] / 2**20
+                    peak_mb[engine] = max(peak_mb[engine], peak)
+                    tracemalloc.stop()
+                for span in spans:
+                    stage = span["stage"]
+                    totals[engine][stage] = (
+                        totals[engine].get(stage, 0.0) + span["duration"]
+                    )
+
+            regex_lines, regex_anchors = normalize(outputs["regex"])
+            for engine in ENGINES[1:]:
+                lines, anchors = normalize(outputs[engine])
+                if regex_lines != lines or not same_anchors(regex_anchors, anchors):
+                    line = next(
+                        ((a, b) for a, b in zip(regex_lines, lines) if a != b),
+                        (len(regex_lines), len(lines)),
+                    )
+                    mismatches.append(
+                        {"file": path, "engine": engine, "first_difference": line}
+                    )
+
+    for engine, stages in totals.items():
+        post = sum(s for stage, s in stages.items() if stage not in ("pandoc", "write"))
+        print(
+            f"{engine:>6}: pandoc {stages.get('pandoc', 0):.3f} с, "
+            f"постобработка {post:.3f} с, всего {sum(stages.values()):.3f} с"
+            + (f", пик памяти {peak_mb[engine]:.1f} МБ" if args.memory else "")
+        )
+    for mismatch in mismatches:
+        print(
+            f"Расхождение ({mismatch['engine']}): {mismatch['file']}: "
+            f"{mismatch['first_difference']}"
+        )
+    print(f"Расхождений с regex-вариантом: {len(mismatches)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"stages": totals, "peak_mb": peak_mb, "mismatches": mismatches},
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
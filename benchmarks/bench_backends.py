@@ -0,0 +1,65 @@
+# Сравнение backend'ов pandoc: документов в секунду на одном процессе.
+#
+#   python -m benchmarks.bench_backends "docs/**/*.docx" --repeat 3 --json out.json
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+from src.converter.backends import BACKENDS
+
+
+def bench_backend(
+    name, files, repeat
+):  # Время конвертации всех файлов; первый прогон прогревочный.
+    backend = BACKENDS[name]()
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            backend.convert(files[0], temp_dir)  # запуск воркера не входит в замер
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for path in files:
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    backend.convert(path, temp_dir)
+        elapsed = time.perf_counter() - started
+    finally:
+        backend.close()
+    count = len(files) * repeat
+    return {
+        "backend": name,
+        "documents": count,
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(count / elapsed, 2) if elapsed else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение backend'ов pandoc")
+    parser.add_argument("pattern", help="glob-шаблон DOCX файлов")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS))
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    files = sorted(glob.glob(args.pattern, recursive=True))
+    if not files:
+        print("Нет файлов для замера", file=sys.stderr)
+        return 1
+
+    results = [
+        bench_backend(name, files, args.repeat)
+        for name in args.backend or sorted(BACKENDS)
+    ]
+    for r in results:
+        print(
+            f"{r['backend']:>12}: {r['docs_per_sec']} док/с ({r['documents']} за {r['seconds']} с)"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# Встроенный конвертер простых документов (backend auto) против pandoc.
+#
+#   python -m benchmarks.bench_native "docs/**/*.docx" --repeat 3 --json out.json
+#   python -m benchmarks.bench_native --docs 20 --pages 10
+#
+# Каждый документ сначала проверяется встроенным конвертером: поддерживаемые
+# (простые) документы должны давать тот же GFM, что и pandoc, байт в байт,
+# остальные уходят в pandoc. Печатается доля простых документов, ускорение на
+# них и на всём наборе (auto против subprocess). Без шаблона корпус
+# генерируется во временной папке. Код выхода 1 при расхождении с pandoc.
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+from src.converter import native
+from src.converter.backends import AutoBackend, SubprocessBackend
+from benchmarks.corpus import build_corpus
+
+
+def timed(convert, files, repeat):  # Секунды на все файлы (медиа извлекаются).
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for path in files:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                convert(path, temp_dir)
+    return time.perf_counter() - started
+
+
+def bench(files, repeat):
+    pandoc = SubprocessBackend()
+    simple, complex_, mismatched = [], [], []
+    for path in files:
+        try:
+            content = native.convert(path)
+        except native.Unsupported as e:
+            complex_.append((path, str(e)))
+            continue
+        simple.append(path)
+        if content != pandoc.convert(path):
+            mismatched.append(path)
+
+    auto = AutoBackend()
+    report = {
+        "documents": len(files),
+        "simple": len(simple),
+        "simple_share": round(len(simple) / len(files), 3),
+        "mismatched": mismatched,
+        "fallback_reasons": {},
+    }
+    for _, reason in complex_:
+        report["fallback_reasons"][reason] = (
+            report["fallback_reasons"].get(reason, 0) + 1
+        )
+    if simple:
+        native_seconds = timed(auto.convert, simple, repeat)
+        pandoc_seconds = timed(pandoc.convert, simple, repeat)
+        report["simple_native_seconds"] = round(native_seconds, 3)
+        report["simple_pandoc_seconds"] = round(pandoc_seconds, 3)
+        report["simple_speedup"] = round(pandoc_seconds / native_seconds, 2)
+    auto_seconds = timed(auto.convert, files, repeat)
+    pandoc_seconds = timed(pandoc.convert, files, repeat)
+    report["auto_seconds"] = round(auto_seconds, 3)
+    report["pandoc_seconds"] = round(pandoc_seconds, 3)
+    report["speedup"] = round(pandoc_seconds / auto_seconds, 2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Встроенный конвертер против pandoc")
+    parser.add_argument("pattern", nargs="?", help="glob-шаблон DOCX файлов")
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docx2md-native-") as work_dir:
+        if args.pattern:
+            files = sorted(glob.glob(args.pattern, recursive=True))
+        else:
+            files = build_corpus(work_dir, docs=args.docs, pages=args.pages)
+        if not files:
+            print("Нет файлов для замера", file=sys.stderr)
+            return 1
+        report = bench(files, args.repeat)
+
+    print(
+        f"простых документов: {report['simple']} из {report['documents']} "
+        f"({report['simple_share']:.0%})"
+    )
+    for reason, count in sorted(
+        report["fallback_reasons"].items(), key=lambda item: -item[1]
+    ):
+        print(f"  в pandoc: {reason} — {count}")
+    if "simple_speedup" in report:
+        print(
+            f"простые: {report['simple_native_seconds']} с без pandoc против "
+            f"{report['simple_pandoc_seconds']} с, ускорение {report['simple_speedup']}x"
+        )
+    print(
+        f"весь набор: auto {report['auto_seconds']} с, subprocess "
+        f"{report['pandoc_seconds']} с, ускорение {report['speedup']}x"
+    )
+    for path in report["mismatched"]:
+        print(f"Расхождение с pandoc: {path}", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 1 if report["mismatched"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
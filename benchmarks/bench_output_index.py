@@ -0,0 +1,114 @@
+# Выдача имён в images/: перебор по диску (reserve_filename) против индекса
+# папки результатов (OutputIndex), на папке, где много имён уже занято.
+#
+#   python -m benchmarks.bench_output_index --existing 2000 --images 200 --json out.json
+#
+# В images/ заранее лежат Image1.png, Image1_1.png ... (--existing штук), как
+# после многих запусков в ту же папку. Каждому из --images изображений нужно
+# свободное имя с основой Image1. Считаются обращения к диску (os.open) и
+# время. Второй запуск индекса — с владельцами из прошлого: документ получает
+# свои прежние имена. Код выхода 1, если имена индекса не уникальны или
+# повторный запуск выдал другие имена.
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from unittest import mock
+from src.converter.utils import reserve_filename
+from src.converter.output_index import OutputIndex
+
+BASE, EXT = "Image1", ".png"
+
+
+def populate(images_folder, existing):  # Занятые имена, как после прошлых запусков.
+    os.makedirs(images_folder, exist_ok=True)
+    names = [f"{BASE}{EXT}"] + [f"{BASE}_{i}{EXT}" for i in range(1, existing)]
+    for name in names:
+        open(os.path.join(images_folder, name), "w").close()
+
+
+def counted(func):  # (результат, число os.open, секунды).
+    real_open = os.open
+    calls = [0]
+
+    def counting_open(*args, **kwargs):
+        calls[0] += 1
+        return real_open(*args, **kwargs)
+
+    started = time.perf_counter()
+    with mock.patch("os.open", counting_open):
+        result = func()
+    return result, calls[0], time.perf_counter() - started
+
+
+def by_disk(images_folder, images):
+    return [
+        reserve_filename(images_folder, f"{BASE}{EXT}", BASE, EXT)
+        for _ in range(images)
+    ]
+
+
+def by_index(output_folder, images):  # Один документ: загрузка индекса и выдача имён.
+    index = OutputIndex.load(output_folder)
+    names = index.for_document(os.path.join(output_folder, "doc.md"))
+    allocated = [names.reserve(f"{BASE}{EXT}", BASE, EXT) for _ in range(images)]
+    index.claim({"ok": True, "skipped": False, "output": "doc.md", "images": allocated})
+    index.save()
+    return allocated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Выдача имён изображений")
+    parser.add_argument("--existing", type=int, default=2000)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docx2md-names-") as work_dir:
+        disk_folder = os.path.join(work_dir, "disk")
+        index_folder = os.path.join(work_dir, "index")
+        populate(os.path.join(disk_folder, "images"), args.existing)
+        populate(os.path.join(index_folder, "images"), args.existing)
+
+        _, disk_calls, disk_seconds = counted(
+            lambda: by_disk(os.path.join(disk_folder, "images"), args.images)
+        )
+        first, index_calls, index_seconds = counted(
+            lambda: by_index(index_folder, args.images)
+        )
+        second, rerun_calls, rerun_seconds = counted(
+            lambda: by_index(index_folder, args.images)
+        )
+
+    report = {
+        "existing": args.existing,
+        "images": args.images,
+        "disk_opens": disk_calls,
+        "disk_seconds": round(disk_seconds, 4),
+        "index_opens": index_calls,
+        "index_seconds": round(index_seconds, 4),
+        "rerun_opens": rerun_calls,
+        "rerun_seconds": round(rerun_seconds, 4),
+        "unique": len({n.lower() for n in first}) == len(first),
+        "stable": first == second,
+    }
+
+    print(
+        f"по диску: {disk_calls} os.open, {report['disk_seconds']} с; "
+        f"по индексу: {index_calls} os.open, {report['index_seconds']} с; "
+        f"повторно: {rerun_calls} os.open, {report['rerun_seconds']} с"
+    )
+    if not report["unique"]:
+        print("Индекс выдал повторяющиеся имена", file=sys.stderr)
+    if not report["stable"]:
+        print("Повторный запуск выдал другие имена", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0 if report["unique"] and report["stable"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
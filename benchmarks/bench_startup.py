@@ -0,0 +1,122 @@
+# Время запуска графического интерфейса: от старта интерпретатора до первого
+# показанного окна, и какие модули при этом импортируются (-X importtime).
+#
+#   python -m benchmarks.bench_startup --runs 5 --budget 1500 --json out.json
+#
+# Каждый запуск — отдельный процесс `python -X importtime` с Qt в режиме
+# offscreen; окно закрывается на первом такте цикла событий. Первый запуск
+# идёт с пустой папкой кэша (проверка pandoc запускает его через pypandoc),
+# остальные — с закэшированной проверкой; импорты сверяются по тёплым запускам.
+# Код выхода 1, если медиана тёплых запусков выше --budget мс или до окна
+# импортирован модуль, который должен грузиться лениво.
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+LAZY_MODULES = ("pypandoc", "markdown", "wand", "bs4")  # не нужны до первого окна
+
+CHILD = """
+import sys
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+exec_ = QApplication.exec_
+
+
+def first_tick():  # окно показано и цикл событий запущен
+    sys.stdout.write("ready\\n")
+    sys.stdout.flush()
+    QApplication.quit()
+
+
+def run_once():
+    QTimer.singleShot(0, first_tick)
+    return exec_()
+
+
+QApplication.exec_ = staticmethod(run_once)
+from src.main import run_gui
+
+sys.exit(run_gui())
+"""
+
+
+def parse_importtime(stderr):  # {модуль: накопленные мкс} из вывода -X importtime.
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def launch(cache_dir):  # (мс до первого окна, импорты до него).
+    env = dict(os.environ, XDG_CACHE_HOME=cache_dir, QT_QPA_PLATFORM="offscreen")
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+    )
+    line = proc.stdout.readline()
+    elapsed = (time.perf_counter() - started) * 1000
+    _, stderr = proc.communicate()
+    if line.strip() != "ready":
+        raise RuntimeError(f"Окно не открылось: {line.strip()}\n{stderr[-2000:]}")
+    return elapsed, parse_importtime(stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время запуска интерфейса")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1500, help="мс, медиана")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docx2md-startup-") as cache_dir:
+        cold, _ = launch(cache_dir)  # промах кэша проверки импортирует pypandoc
+        launches = [launch(cache_dir) for _ in range(max(args.runs, 1))]
+
+    warm = [ms for ms, _ in launches]
+    modules = launches[-1][1]
+    slowest = sorted(modules.items(), key=lambda item: -item[1])[: args.top]
+    eager = [
+        name
+        for name in LAZY_MODULES
+        if any(name in imported for _, imported in launches)
+    ]
+    report = {
+        "cold_ms": round(cold, 1),
+        "warm_ms": [round(ms, 1) for ms in warm],
+        "warm_median_ms": round(statistics.median(warm), 1),
+        "budget_ms": args.budget,
+        "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in slowest},
+        "eager_imports": eager,
+    }
+
+    print(
+        f"до первого окна: {report['cold_ms']} мс без кэша проверки, "
+        f"медиана {report['warm_median_ms']} мс с кэшем (бюджет {args.budget:.0f} мс)"
+    )
+    for name, ms in report["slowest_imports_ms"].items():
+        print(f"  {ms:8.1f} мс  {name}")
+    for name in eager:
+        print(f"Модуль импортирован до первого окна: {name}", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 1 if eager or report["warm_median_ms"] > args.budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
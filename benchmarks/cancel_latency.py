@@ -0,0 +1,127 @@
+# Задержка отмены пакета: от CancelToken.cancel() до полной остановки iter_batch
+# (рабочие процессы свободны, pandoc завершён).
+#
+#   python -m benchmarks.cancel_latency --pages 400 --limit 0.5 --json out.json
+#
+# Корпус из больших документов генерируется во временной папке, отмена
+# приходит, пока pandoc ещё работает. Для каждого сочетания движка, backend'а
+# и числа процессов проверяется, что задержка меньше --limit и что в images/
+# нет файлов, кроме записанных документами, завершёнными до отмены.
+# Код выхода 1, если хотя бы одна проверка не прошла.
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from src.converter.engine import iter_batch
+from src.converter.cancel import CancelToken
+from benchmarks.corpus import build_corpus
+
+SCENARIOS = (  # (движок, backend, процессов)
+    ("regex", "subprocess", 1),
+    ("regex", "subprocess", 2),
+    ("ast", "subprocess", 2),
+    ("regex", "warm", 2),
+    ("stream", "subprocess", 1),
+    ("stream", "subprocess", 2),
+)
+
+
+def orphan_images(out_dir, completed):  # Файлы images/ от незавершённых документов.
+    images = os.path.join(out_dir, "images")
+    if not os.path.isdir(images):
+        return []
+    written = {name for result in completed for name in result.get("images", [])}
+    return sorted(set(os.listdir(images)) - written)
+
+
+def measure(
+    files, out_dir, engine, backend, workers, delay
+):  # Секунды от отмены до закрытия пакета и результаты, готовые до отмены.
+
+    options = {"engine": engine, "backend": backend, "workers": workers}
+    token = CancelToken()
+    batch = iter_batch(files, out_dir, options, token)
+    finished = threading.Event()
+    completed = []
+
+    def consume():  # так же, как EnhancedConverterThread.run
+        try:
+            for result in batch:
+                if result["cancelled"]:
+                    break
+                completed.append(result)
+        finally:
+            batch.close()
+            finished.set()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    time.sleep(delay)
+    started = time.perf_counter()
+    token.cancel()
+    finished.wait()
+    latency = time.perf_counter() - started
+    consumer.join()
+    return latency, completed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Задержка отмены пакета")
+    parser.add_argument("--docs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument(
+        "--delay", type=float, default=0.5, help="секунд работы до отмены"
+    )
+    parser.add_argument(
+        "--limit", type=float, default=0.5, help="допустимая задержка, с"
+    )
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="docx2md-cancel-") as work_dir:
+        files = build_corpus(
+            os.path.join(work_dir, "corpus"),
+            docs=args.docs,
+            pages=args.pages,
+            images=args.images,
+        )
+        for engine, backend, workers in SCENARIOS:
+            out_dir = os.path.join(work_dir, f"{engine}-{backend}-{workers}")
+            os.makedirs(out_dir)
+            latency, completed = measure(
+                files, out_dir, engine, backend, workers, args.delay
+            )
+            orphans = orphan_images(out_dir, completed)
+            ok = latency < args.limit and not orphans
+            failed = failed or not ok
+            results.append(
+                {
+                    "engine": engine,
+                    "backend": backend,
+                    "workers": workers,
+                    "latency": round(latency, 3),
+                    "completed": len(completed),
+                    "orphan_images": len(orphans),
+                    "ok": ok,
+                }
+            )
+            print(
+                f"{engine:>6} {backend:>10} x{workers}: отмена за {latency * 1000:.0f} мс, "
+                f"готово до отмены {len(completed)}/{len(files)}, "
+                f"лишних изображений {len(orphans)}" + ("" if ok else "  <-- FAIL")
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# Сравнение двух результатов benchmarks.run (например, до и после коммита).
+#
+#   python -m benchmarks.compare results/base.json results/HEAD.json --threshold 10
+#
+# Код выхода 1, если какая-либо стадия замедлилась больше порога (в процентах).
+import sys
+import json
+import argparse
+
+
+def delta(old, new):  # Изменение в процентах; None, если сравнивать нечего.
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение результатов замеров")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+
+    print(
+        f"{'стадия':>20} {base.get('revision')!s:>12} {head.get('revision')!s:>12}  изменение"
+    )
+    regressions = []
+    for stage, old in base["stages"].items():
+        new = head["stages"].get(stage)
+        old_total = old["total"] if old else None
+        new_total = new["total"] if new else None
+        change = delta(old_total, new_total)
+        change_str = "—" if change is None else f"{change:+.1f}%"
+        print(f"{stage:>20} {old_total!s:>12} {new_total!s:>12}  {change_str}")
+        if change is not None and change > args.threshold:
+            regressions.append(stage)
+
+    old_tp = base["throughput"]["docs_per_sec"]
+    new_tp = head["throughput"]["docs_per_sec"]
+    change = delta(old_tp, new_tp)
+    print(
+        f"{'док/с':>20} {old_tp!s:>12} {new_tp!s:>12}  "
+        f"{'—' if change is None else f'{change:+.1f}%'}"
+    )
+    if change is not None and -change > args.threshold:
+        regressions.append("throughput")
+
+    if regressions:
+        print("Замедление: " + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+# Генератор воспроизводимого корпуса DOCX для замеров.
+#
+#   python -m benchmarks.corpus out/corpus --docs 20 --pages 30 --images 10 --emf-share 0.3
+#
+# Документы собираются напрямую из WordprocessingML (без python-docx), поэтому
+# при одинаковых параметрах и seed файлы совпадают побайтно.
+import os
+import sys
+import json
+import zlib
+import struct
+import random
+import zipfile
+import argparse
+from xml.sax.saxutils import escape
+
+PARAGRAPHS_PER_PAGE = 8
+ZIP_DATE = (2020, 1, 1, 0, 0, 0)  # фиксированная дата — воспроизводимые архивы
+
+NS = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture"'
+)
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Default Extension="png" ContentType="image/png"/>
+<Default Extension="emf" ContentType="image/x-emf"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+</Types>"""
+
+ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>
+<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/><w:pPr><w:outlineLvl w:val="0"/></w:pPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/><w:pPr><w:outlineLvl w:val="1"/></w:pPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading3"><w:name w:val="heading 3"/><w:basedOn w:val="Normal"/><w:pPr><w:outlineLvl w:val="2"/></w:pPr></w:style>
+</w:styles>"""
+
+WORDS = (
+    "система модуль параметр значение конфигурация сервер клиент запрос ответ "
+    "данные файл документ раздел таблица схема процесс контроль доступ журнал "
+    "версия обновление настройка интерфейс протокол сеть хранилище отчёт"
+).split()
+
+
+def make_png(
+    width, height, rng
+):  # Несжатая по смыслу, но валидная PNG-картинка случайного цвета.
+    color = bytes(rng.randrange(256) for _ in range(3))
+    row = b"\x00" + color * width
+    raw = row * height
+
+    def chunk(tag, data):
+        return (
+            struct.pack(">I", len(data))
+            + tag
+            + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+        )
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def make_emf(width, height, rng):  # Минимальный EMF: заголовок, прямоугольник и EOF.
+    rect = struct.pack("<4i", 0, 0, width, height)
+    records = []
+    # EMR_RECTANGLE
+    records.append(
+        struct.pack("<II", 43, 24)
+        + struct.pack("<4i", *(rng.randrange(width) for _ in range(2)), width, height)
+    )
+    # EMR_EOF
+    records.append(struct.pack("<IIIII", 14, 20, 0, 16, 20))
+    header_size = 88
+    total = header_size + sum(len(r) for r in records)
+    header = (
+        struct.pack("<II", 1, header_size)
+        + rect
+        + struct.pack("<4i", 0, 0, width * 26, height * 26)
+        + struct.pack("<I", 0x464D4520)  # " EMF"
+        + struct.pack("<I", 0x00010000)
+        + struct.pack("<I", total)
+        + struct.pack("<I", len(records) + 1)
+        + struct.pack("<HH", 0, 0)
+        + struct.pack("<III", 0, 0, 0)
+        + struct.pack("<2i", 1920, 1080)
+        + struct.pack("<2i", 508, 286)
+    )
+    return header + b"".join(records)
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def paragraph(text, style=None):
+    ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f'<w:p>{ppr}<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def hyperlink(text, rel_id):
+    return (
+        f'<w:p><w:hyperlink r:id="{rel_id}"><w:r><w:t>{escape(text)}</w:t></w:r>'
+        "</w:hyperlink></w:p>"
+    )
+
+
+def picture(rel_id, index, name):
+    cx, cy = 2743200, 1371600
+    return (
+        "<w:p><w:r><w:drawing><wp:inline>"
+        f'<wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{index}" name="Picture {index}"/>'
+        '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+        f'<pic:pic><pic:nvPicPr><pic:cNvPr id="{index}" name="{name}"/><pic:cNvPicPr/></pic:nvPicPr>'
+        f'<pic:blipFill><a:blip r:embed="{rel_id}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+        f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+        '<a:prstGeom prst="rect"/></pic:spPr></pic:pic>'
+        "</a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>"
+    )
+
+
+def table(rng, rows, cols):
+    cells = "".join(
+        "<w:tr>"
+        + "".join(
+            f"<w:tc><w:p><w:r><w:t>{escape(rng.choice(WORDS))}</w:t></w:r></w:p></w:tc>"
+            for _ in range(cols)
+        )
+        + "</w:tr>"
+        for _ in range(rows)
+    )
+    return f"<w:tbl><w:tblPr/>{cells}</w:tbl>"
+
+
+def build_docx(
+    path, pages=10, heading_density=2, images=4, emf_share=0.0, tables=2, seed=0
+):  # Один документ; heading_density — заголовков на страницу.
+
+    rng = random.Random(seed)
+    paragraphs = max(pages * PARAGRAPHS_PER_PAGE, 1)
+    headings = max(int(pages * heading_density), 1)
+    emf_count = int(round(images * emf_share))
+
+    # Позиции вставок распределяются по документу детерминированно
+    heading_at = set(rng.sample(range(paragraphs), min(headings, paragraphs)))
+    image_at = sorted(rng.choices(range(paragraphs), k=images))
+    table_at = sorted(rng.choices(range(paragraphs), k=tables))
+
+    rels = []
+    media = {}
+    body = [paragraph("Оглавление", "Heading2"), paragraph("Будет заменено.")]
+
+    link_id = "rId2"
+    rels.append(
+        f'<Relationship Id="{link_id}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink" '
+        'Target="http://example.com/docs/user guide.html" TargetMode="External"/>'
+    )
+    body.append(hyperlink("Руководство пользователя", link_id))
+
+    image_index = 0
+    figure = 0
+    for i in range(paragraphs):
+        if i in heading_at:
+            level = rng.choice((1, 2, 2, 3))
+            body.append(
+                paragraph(f"Раздел {i}: {sentence(rng, 3)[:-1]}", f"Heading{level}")
+            )
+        body.append(paragraph(sentence(rng, rng.randint(8, 30))))
+        while image_index < images and image_at[image_index] == i:
+            image_index += 1
+            is_emf = image_index <= emf_count
+            ext = "emf" if is_emf else "png"
+            name = f"image{image_index}.{ext}"
+            width, height = rng.randint(40, 400), rng.randint(30, 300)
+            media[name] = (make_emf if is_emf else make_png)(width, height, rng)
+            rel_id = f"rId{10 + image_index}"
+            rels.append(
+                f'<Relationship Id="{rel_id}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" '
+                f'Target="media/{name}"/>'
+            )
+            body.append(picture(rel_id, image_index, name))
+            figure += 1
+            body.append(paragraph(f"Рисунок {figure} – {sentence(rng, 4)[:-1]}"))
+        for _ in range(table_at.count(i)):
+            body.append(table(rng, rng.randint(2, 8), rng.randint(2, 5)))
+
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f"<w:document {NS}><w:body>{''.join(body)}<w:sectPr/></w:body></w:document>"
+    )
+    document_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        f"{''.join(rels)}</Relationships>"
+    )
+
+    parts = [
+        ("[Content_Types].xml", CONTENT_TYPES),
+        ("_rels/.rels", ROOT_RELS),
+        ("word/document.xml", document),
+        ("word/styles.xml", STYLES),
+        ("word/_rels/document.xml.rels", document_rels),
+    ] + [(f"word/media/{name}", data) for name, data in sorted(media.items())]
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in parts:
+            info = zipfile.ZipInfo(name, ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(
+                info, data.encode("utf-8") if isinstance(data, str) else data
+            )
+
+
+def build_corpus(
+    folder,
+    docs=10,
+    pages=10,
+    heading_density=2,
+    images=4,
+    emf_share=0.0,
+    tables=2,
+    seed=0,
+):  # Корпус документов и corpus.json с параметрами генерации.
+
+    os.makedirs(folder, exist_ok=True)
+    params = {
+        "docs": docs,
+        "pages": pages,
+        "heading_density": heading_density,
+        "images": images,
+        "emf_share": emf_share,
+        "tables": tables,
+        "seed": seed,
+    }
+    files = []
+    for i in range(docs):
+        path = os.path.join(folder, f"doc_{i:04d}.docx")
+        build_docx(
+            path, pages, heading_density, images, emf_share, tables, seed * 100003 + i
+        )
+        files.append(path)
+    with open(os.path.join(folder, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=2)
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генератор корпуса DOCX для замеров")
+    parser.add_argument("folder")
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--heading-density", type=float, default=2)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--emf-share", type=float, default=0.0)
+    parser.add_argument("--tables", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    files = build_corpus(
+        args.folder,
+        args.docs,
+        args.pages,
+        args.heading_density,
+        args.images,
+        args.emf_share,
+        args.tables,
+        args.seed,
+    )
+    print(f"Создано документов: {len(files)} в {args.folder}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
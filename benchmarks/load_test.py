@@ -0,0 +1,180 @@
+# Нагрузочный тест локального сервиса конвертации (src/service.py): задержки
+# p50/p90/p99, пропускная способность и распределение кодов ответа.
+#
+#   python -m benchmarks.load_test --requests 100 --concurrency 8 --json out.json
+#   python -m benchmarks.load_test --url http://127.0.0.1:8765 --docx report.docx
+#
+# Без --url сервис запускается на свободном порту (--workers, --queue,
+# --timeout передаются ему) и останавливается после теста. Без --docx
+# тестовый документ генерируется во временной папке. Ответы 503 (очередь
+# полна) и 504 (срок истёк) — ожидаемое обратное давление, а не сбой; код
+# выхода 1 при других ошибках или если ни один запрос не прошёл.
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from urllib.parse import urlsplit
+from benchmarks.corpus import build_docx
+
+
+def percentile(values, share):  # Ближайший ранг; values отсортированы.
+    if not values:
+        return None
+    rank = max(int(round(share * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+async def post_docx(host, port, body, timeout):  # (код ответа, байт в ответе).
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            (
+                "POST /convert?name=load.docx HTTP/1.1\r\n"
+                f"Host: {host}:{port}\r\n"
+                "Content-Type: application/octet-stream\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+        )
+        writer.write(body)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status = int(response.split(b" ", 2)[1])
+    return status, len(response)
+
+
+async def run_load(host, port, body, requests, concurrency, timeout):
+    latencies = {}  # код ответа -> [секунды]
+    next_request = iter(range(requests))
+
+    async def client():
+        for _ in next_request:
+            started = time.perf_counter()
+            try:
+                status, _ = await post_docx(host, port, body, timeout)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                status = 0  # соединение оборвано или ответ не получен
+            latencies.setdefault(status, []).append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(port, args):  # Процесс сервиса, готовый принимать запросы.
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "src.service",
+            "--port",
+            str(port),
+            "--workers",
+            str(args.workers),
+            "--queue",
+            str(args.queue),
+            "--timeout",
+            str(args.timeout),
+        ],
+        stdout=subprocess.PIPE,
+    )
+    proc.stdout.readline()  # {"event": "listening", ...}
+    if proc.poll() is not None:
+        raise RuntimeError("Сервис не запустился")
+    return proc
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервиса")
+    parser.add_argument("--url", help="адрес запущенного сервиса")
+    parser.add_argument("--docx", help="документ для загрузки")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--queue", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docx2md-load-") as work_dir:
+        docx = args.docx
+        if docx is None:
+            docx = os.path.join(work_dir, "load.docx")
+            build_docx(docx, pages=args.pages, images=args.images)
+        with open(docx, "rb") as f:
+            body = f.read()
+
+        proc = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port
+        else:
+            host, port = "127.0.0.1", free_port()
+            proc = start_service(port, args)
+        try:
+            latencies, elapsed = asyncio.run(
+                run_load(
+                    host, port, body, args.requests, args.concurrency, args.timeout + 5
+                )
+            )
+            with urllib.request.urlopen(f"http://{host}:{port}/health") as response:
+                health = json.load(response)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    ok = sorted(latencies.get(200, []))
+    report = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(ok) / elapsed, 2) if elapsed else None,
+        "status": {
+            str(code): len(values) for code, values in sorted(latencies.items())
+        },
+        "p50": percentile(ok, 0.5),
+        "p90": percentile(ok, 0.9),
+        "p99": percentile(ok, 0.99),
+        "max": ok[-1] if ok else None,
+        "service": health,
+    }
+    print(
+        f"{args.requests} запросов, {args.concurrency} клиентов: "
+        f"{report['seconds']} с, {report['throughput']} док/с; коды {report['status']}"
+    )
+    if ok:
+        print(
+            "задержка успешных, мс: "
+            + ", ".join(
+                f"{name} {report[name] * 1000:.0f}"
+                for name in ("p50", "p90", "p99", "max")
+            )
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    failures = sum(
+        len(values) for code, values in latencies.items() if code not in (200, 503, 504)
+    )
+    return 1 if failures or not ok else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# Замер конвертации по стадиям на корпусе DOCX (см. benchmarks/corpus.py).
+#
+#   python -m benchmarks.run out/corpus --json results/HEAD.json
+#   python -m benchmarks.compare results/base.json results/HEAD.json
+#
+# Стадии меряются по отдельности на одних и тех же данных: pandoc,
+# растеризация EMF, process_images, replace_image_links, fix_links_and_toc.
+# Затем весь пакет прогоняется через iter_batch для пропускной способности.
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from src.converter.backends import get_backend
+from src.converter.cache import pandoc_version
+from src.converter.engine import iter_batch
+from src.converter.media import MediaIndex
+from src.converter.pipeline import media_replacement_rules
+from src.converter.rasterizer import Rasterizer, VECTOR_EXTENSIONS
+from src.converter.utils import (
+    process_images_content,
+    replace_image_links_content,
+    fix_links_and_toc_content,
+)
+
+STAGES = (
+    "pandoc",
+    "emf",
+    "process_images",
+    "replace_image_links",
+    "fix_links_and_toc",
+)
+
+try:
+    import resource
+except ImportError:  # Windows: пиковая память не измеряется
+    resource = None
+
+
+def peak_rss_kb():  # Пиковая память процесса и дочерних процессов (pandoc), КБ.
+    if resource is None:
+        return None
+    scale = 1024 if sys.platform == "darwin" else 1  # macOS отдаёт байты
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+    }
+
+
+def git_revision():  # Текущий коммит, чтобы результаты можно было сравнивать.
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_document(
+    path, out_dir, backend, cache_dir
+):  # Время каждой стадии на одном документе.
+
+    timings = {}
+    md_dir = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0])
+    os.makedirs(md_dir)
+    with tempfile.TemporaryDirectory() as temp_dir, MediaIndex.from_docx(
+        path, temp_dir
+    ) as media:
+        started = time.perf_counter()
+        content = backend.convert(path)
+        timings["pandoc"] = time.perf_counter() - started
+
+        names = [n for n in media.names() if n.lower().endswith(VECTOR_EXTENSIONS)]
+        rasterized = {}
+        if names:
+            started = time.perf_counter()
+            try:
+                rasterizer = Rasterizer(cache_dir)
+                paths = {name: media.local_path(name) for name in names}
+                pngs = rasterizer.rasterize_all(list(paths.values()))
+                rasterized = {name: pngs[p] for name, p in paths.items()}
+                timings["emf"] = time.perf_counter() - started
+            except Exception:  # нет ImageMagick/wand — стадия пропускается
+                timings["emf"] = None
+        else:
+            timings["emf"] = 0.0
+
+        size_in = len(content.encode("utf-8"))
+        started = time.perf_counter()
+        try:
+            content = process_images_content(
+                content, md_dir, media, rasterized=rasterized
+            )
+        except Exception:  # EMF без wand
+            timings["process_images"] = None
+        else:
+            timings["process_images"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        content = replace_image_links_content(content, media_replacement_rules(media))
+        timings["replace_image_links"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        content = fix_links_and_toc_content(content)
+        timings["fix_links_and_toc"] = time.perf_counter() - started
+
+    return timings, size_in
+
+
+def summarize(values):  # Сводная статистика по ряду замеров, секунды.
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "total": round(sum(values), 6),
+        "mean": round(statistics.mean(values), 6),
+        "p50": round(statistics.median(values), 6),
+        "max": round(max(values), 6),
+    }
+
+
+def run(
+    files, backend_name, workers
+):  # Полный замер: стадии + пропускная способность пакета.
+
+    backend = get_backend(backend_name)
+    per_stage = {stage: [] for stage in STAGES}
+    markdown_bytes = 0
+
+    work_dir = tempfile.mkdtemp(prefix="docx2md-bench-")
+    try:
+        cache_dir = os.path.join(work_dir, "cache")
+        stage_dir = os.path.join(work_dir, "stages")
+        for path in files:
+            timings, size = time_document(path, stage_dir, backend, cache_dir)
+            markdown_bytes += size
+            for stage in STAGES:
+                per_stage[stage].append(timings[stage])
+
+        batch_dir = os.path.join(work_dir, "batch")
+        os.makedirs(batch_dir)
+        options = {
+            "workers": workers,
+            "backend": backend_name,
+            "cache_dir": os.path.join(work_dir, "batch-cache"),  # холодный кэш EMF
+        }
+        started = time.perf_counter()
+        results = list(iter_batch(files, batch_dir, options))
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    input_bytes = sum(os.path.getsize(p) for p in files)
+    return {
+        "stages": {stage: summarize(values) for stage, values in per_stage.items()},
+        "throughput": {
+            "documents": len(files),
+            "succeeded": sum(r["ok"] for r in results),
+            "workers": workers,
+            "seconds": round(elapsed, 4),
+            "docs_per_sec": round(len(files) / elapsed, 3) if elapsed else None,
+            "input_mb_per_sec": (
+                round(input_bytes / elapsed / 2**20, 3) if elapsed else None
+            ),
+            "markdown_bytes": markdown_bytes,
+        },
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер конвертации по стадиям")
+    parser.add_argument("corpus", help="папка корпуса (benchmarks.corpus)")
+    parser.add_argument("--backend", default="subprocess")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    files = sorted(glob.glob(os.path.join(args.corpus, "*.docx")))
+    if not files:
+        print("В папке нет DOCX файлов", file=sys.stderr)
+        return 1
+
+    corpus_meta = os.path.join(args.corpus, "corpus.json")
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandoc": pandoc_version(),
+        "backend": args.backend,
+        "corpus": (
+            json.load(open(corpus_meta, encoding="utf-8"))
+            if os.path.exists(corpus_meta)
+            else {"docs": len(files)}
+        ),
+    }
+    report.update(run(files, args.backend, args.workers))
+
+    for stage, summary in report["stages"].items():
+        if summary is None:
+            print(f"{stage:>20}: пропущено")
+        else:
+            print(f"{stage:>20}: {summary['total']:.3f} с (p50 {summary['p50']:.4f} с)")
+    t = report["throughput"]
+    print(f"{'пакет':>20}: {t['docs_per_sec']} док/с, {t['input_mb_per_sec']} МБ/с")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from src.converter.engine import iter_batch, default_workers
+from src.converter.journal import journal_files
+from src.converter.backends import BACKENDS
+from src.converter.image_store import DEDUP_MODES
+from src.converter.media import MEDIA_MODES
+from src.converter.tracing import TRACE_FORMATS, summarize_spans
+from src.converter.pipeline import ENGINES
+from src.converter.scheduler import SCHEDULES
+from src.converter.archive import ARCHIVE_FORMATS, ARCHIVE_SCOPES
+from src.converter.optimizer import DEFAULT_JPEG_QUALITY, savings_summary
+from src.converter.watch import FolderWatcher, DEFAULT_INTERVAL, DEFAULT_DEBOUNCE
+
+EXIT_OK = 0
+EXIT_FAILED = 1  # ошибка запуска или ни один файл не сконвертирован
+EXIT_PARTIAL = 2  # часть файлов завершилась с ошибкой
+
+
+def build_parser():  # Аргументы консольного режима.
+    parser = argparse.ArgumentParser(
+        prog="docx2md",
+        description="Пакетная конвертация DOCX в Markdown без графического интерфейса.",
+    )
+    parser.add_argument(
+        "inputs", nargs="*", help="DOCX файлы, папки или glob-шаблоны (**/*.docx)"
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="папка для сохранения результатов"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=default_workers(),
+        help="число параллельных процессов (по умолчанию — число ядер)",
+    )
+    parser.add_argument(
+        "--overwrite", action="store_true", help="перезаписывать существующие файлы"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default="subprocess",
+        help="запуск pandoc: процесс на файл, постоянные воркеры (warm) "
+        "или встроенный конвертер простых документов (auto)",
+    )
+    parser.add_argument(
+        "--dedup",
+        choices=DEDUP_MODES,
+        default="off",
+        help="повторяющиеся изображения: копии, жёсткие ссылки или ссылка на один файл",
+    )
+    parser.add_argument(
+        "--media",
+        choices=MEDIA_MODES,
+        default="direct",
+        help="изображения: читать прямо из DOCX или через --extract-media pandoc",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="regex",
+        help="постобработка: регулярные выражения по GFM, один обход JSON AST "
+        "или построчно по выводу pandoc (stream, для очень больших файлов)",
+    )
+    parser.add_argument(
+        "--emf-dpi", type=int, help="разрешение растеризации EMF/WMF в PNG"
+    )
+    parser.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="сжимать PNG (без потерь) и JPEG, убирать метаданные",
+    )
+    parser.add_argument(
+        "--max-image-size",
+        type=int,
+        metavar="PX",
+        help="уменьшать изображения до этой длины большей стороны",
+    )
+    parser.add_argument(
+        "--jpeg-quality",
+        type=int,
+        default=DEFAULT_JPEG_QUALITY,
+        metavar="Q",
+        help="качество JPEG и WebP из JPEG при сжатии",
+    )
+    parser.add_argument(
+        "--webp", action="store_true", help="сохранять сжатые изображения в WebP"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="использовать кэш конвертации"
+    )
+    parser.add_argument(
+        "--cache-dir", help="папка кэша (по умолчанию ~/.cache/docx2md)"
+    )
+    parser.add_argument(
+        "--trace", metavar="PATH", help="сохранить интервалы стадий в файл"
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=TRACE_FORMATS,
+        default="jsonl",
+        help="формат трассировки: JSON Lines или Chrome trace (chrome://tracing)",
+    )
+    parser.add_argument(
+        "--archive",
+        choices=ARCHIVE_FORMATS,
+        help="писать результаты сразу в архив, без отдельных файлов в папке",
+    )
+    parser.add_argument(
+        "--archive-scope",
+        choices=ARCHIVE_SCOPES,
+        default="batch",
+        help="один архив на пакет или отдельный архив на каждый документ",
+    )
+    parser.add_argument(
+        "--archive-name",
+        help="имя архива пакета без расширения (по умолчанию docx2md)",
+    )
+    parser.add_argument(
+        "--schedule",
+        choices=SCHEDULES,
+        default="cost",
+        help="порядок запуска: по времени прошлых запусков (cost), "
+        "крупные файлы первыми (size) или по списку (list)",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        metavar="MB",
+        help="память на одновременно идущие задачи "
+        "(по умолчанию 70%% физической памяти)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="продолжить прерванный пакет по журналу папки результатов: "
+        "готовые файлы пропускаются, повторяются незавершённые и ошибочные",
+    )
+    parser.add_argument(
+        "--no-journal",
+        dest="journal",
+        action="store_false",
+        help="не вести журнал пакета в папке результатов",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="следить за входными папками: конвертировать новые и изменённые "
+        "документы, удалять результаты удалённых",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        metavar="SEC",
+        help="пауза между проходами --watch; 0 — один проход и выход",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE,
+        metavar="SEC",
+        help="сколько секунд файл должен не меняться, прежде чем его конвертировать",
+    )
+    return parser
+
+
+def collect_inputs(
+    patterns,
+):  # Раскрытие папок и glob-шаблонов в список DOCX без повторов.
+
+    files = []
+    seen = set()
+
+    def add(path):
+        path = os.path.abspath(path)
+        if path not in seen and path.lower().endswith(".docx"):
+            seen.add(path)
+            files.append(path)
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, names in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(names):
+                    add(os.path.join(root, name))
+        elif glob.has_magic(pattern):
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    add(path)
+        else:
+            add(pattern)  # отсутствующий файл попадёт в отчёт как ошибка
+    return files
+
+
+def emit(event, **fields):  # Одна строка JSON на событие в stdout.
+    record = {"event": event}
+    record.update(fields)
+    sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def run_watch(args, options):  # Режим --watch: проходы синхронизации до Ctrl+C.
+    watcher = FolderWatcher(args.inputs, args.output, options, args.debounce)
+    emit("watch", output=os.path.abspath(args.output), interval=args.interval)
+    failed = 0
+    try:
+        while True:
+            started = time.perf_counter()
+            converted = removed = failed = 0
+            for kind, data in watcher.sync():
+                if kind == "removed":
+                    removed += 1
+                    emit("removed", **data)
+                    continue
+                converted += 1
+                failed += not data["ok"]
+                emit(
+                    "file",
+                    input=data["input"],
+                    output=data["output"],
+                    ok=data["ok"],
+                    cached=data["cached"],
+                    message=data["message"],
+                )
+            if converted or removed:
+                emit(
+                    "sync",
+                    converted=converted - failed,
+                    failed=failed,
+                    removed=removed,
+                    seconds=round(time.perf_counter() - started, 3),
+                )
+            if args.interval <= 0:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:  # как в пакетном режиме: сообщение вместо трассировки
+        emit("error", message=str(e))
+        return EXIT_FAILED
+    finally:
+        watcher.close()
+    return EXIT_PARTIAL if failed else EXIT_OK
+
+
+def run(argv=None):  # Точка входа консольного режима; возвращает код выхода.
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.resume:
+        parser.error("нужно указать входные файлы или --resume")
+    if args.watch and (args.resume or args.archive):
+        parser.error("--watch несовместим с --resume и --archive")
+
+    from src.dependencies.checker import DependencyChecker
+
+    missing = DependencyChecker.missing(libs=[])
+    if missing:
+        emit("error", message="Не хватает зависимостей: " + "; ".join(missing))
+        return EXIT_FAILED
+
+    if args.resume:  # список файлов и имена результатов — из журнала
+        files = journal_files(args.output)
+        if not files:
+            emit("error", message="В папке результатов нет журнала пакета")
+            return EXIT_FAILED
+    elif args.watch:  # файлы находит FolderWatcher, папка может быть ещё пуста
+        files = []
+    else:
+        files = collect_inputs(args.inputs)
+    if not files and not args.watch:
+        emit("error", message="Не найдено DOCX файлов для конвертации")
+        return EXIT_FAILED
+
+    try:
+        os.makedirs(args.output, exist_ok=True)
+    except OSError as e:
+        emit("error", message=f"Не удалось создать папку: {str(e)}")
+        return EXIT_FAILED
+
+    options = {
+        "overwrite": args.overwrite,
+        "workers": max(args.jobs, 1),
+        "backend": args.backend,
+        "image_dedup": args.dedup,
+        "emf_dpi": args.emf_dpi,
+        "optimize_images": args.optimize_images
+        or bool(args.max_image_size or args.webp),
+        "max_image_size": args.max_image_size,
+        "jpeg_quality": args.jpeg_quality,
+        "webp": args.webp,
+        "media_mode": args.media,
+        "engine": args.engine,
+        "cache": args.cache,
+        "cache_dir": args.cache_dir,
+        "trace_path": args.trace,
+        "trace_format": args.trace_format,
+        "archive": args.archive,
+        "archive_scope": args.archive_scope,
+        "archive_name": args.archive_name,
+        "schedule": args.schedule,
+        "memory_budget_mb": args.memory_budget,
+        "journal": args.journal,
+        "resume": args.resume,
+    }
+    if args.watch:
+        return run_watch(args, options)
+
+    total = len(files)
+    emit("start", total=total, output=os.path.abspath(args.output))
+    succeeded = 0
+    done = 0
+    spans = []
+    image_savings = []
+    try:
+        for result in iter_batch(files, args.output, options):
+            done += 1
+            succeeded += result["ok"]
+            spans.extend(result["spans"])
+            image_savings.extend(result["image_savings"])
+            stages = {}
+            for span in result["spans"]:
+                stages[span["stage"]] = round(span["duration"], 4)
+            emit(
+                "file",
+                done=done,
+                total=total,
+                input=result["input"],
+                output=result["output"],
+                ok=result["ok"],
+                cached=result["cached"],
+                skipped=result["skipped"],
+                emf=result["emf_timings"],
+                stages=stages,
+                message=result["message"],
+            )
+    except Exception as e:  # пакет не запустился или оборвался (архив есть, пул упал)
+        emit("error", message=str(e))
+        return EXIT_FAILED
+
+    summary = summarize_spans(spans)
+    emit(
+        "summary",
+        stages={stage: round(s, 4) for stage, s in summary["stages"].items()},
+        slowest_files=[[f, round(s, 4)] for f, s in summary["slowest_files"]],
+        images=savings_summary(image_savings) if options["optimize_images"] else None,
+    )
+
+    emit("finish", total=total, succeeded=succeeded, failed=total - succeeded)
+    if succeeded == total:
+        return EXIT_OK
+    return EXIT_PARTIAL if succeeded else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(run())
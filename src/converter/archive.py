@@ -0,0 +1,192 @@
+import io
+import os
+import re
+import time
+import shutil
+import tarfile
+import zipfile
+import tempfile
+from .utils import read_text, file_digest, apply_default_mode
+
+ARCHIVE_FORMATS = ("zip", "tar")
+ARCHIVE_SCOPES = ("batch", "document")  # один архив на пакет или на документ
+STORED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")  # уже сжаты
+
+
+def archive_extension(fmt):
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Неизвестный формат архива: {fmt}")
+    return "." + fmt
+
+
+class ArchiveWriter:  # Документы и изображения сразу в zip/tar; одинаковое содержимое хранится один раз.
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        fd, self._tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path) or ".", prefix=".", suffix=".partial"
+        )
+        os.close(fd)  # архив появляется под своим именем только целиком
+        if fmt == "zip":
+            self._archive = zipfile.ZipFile(self._tmp_path, "w", zipfile.ZIP_DEFLATED)
+        else:
+            self._archive = tarfile.open(self._tmp_path, "w")
+        self._by_digest = {}  # хэш содержимого -> имя в images/
+        self._taken = set()  # занятые имена в images/ (без учёта регистра)
+        self.images_written = 0
+        self.images_deduplicated = 0
+
+    def _add_file(self, path, arcname):
+        if self.fmt == "zip":
+            stored = arcname.lower().endswith(STORED_EXTENSIONS)
+            self._archive.write(
+                path,
+                arcname,
+                zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED,
+            )
+        else:
+            self._archive.add(path, arcname, recursive=False)
+
+    def _add_bytes(self, data, arcname):
+        if self.fmt == "zip":
+            info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self._archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(arcname)
+            info.size = len(data)
+            info.mtime = time.time()
+            self._archive.addfile(info, io.BytesIO(data))
+
+    def _add_image(self, path, name):  # Имя в images/; повтор содержимого не пишется.
+        digest = file_digest(path)
+        if digest in self._by_digest:
+            self.images_deduplicated += 1
+            return self._by_digest[digest]
+        base_name, ext = os.path.splitext(name)
+        candidate = name
+        counter = 1
+        while candidate.lower() in self._taken:  # то же имя у другого документа
+            candidate = f"{base_name}_{counter}{ext}"
+            counter += 1
+        self._taken.add(candidate.lower())
+        self._by_digest[digest] = candidate
+        self._add_file(path, f"images/{candidate}")
+        self.images_written += 1
+        return candidate
+
+    def add_document(
+        self, md_path, arcname
+    ):  # .md и его images/ из рабочей папки; ссылки правятся под имена в архиве.
+
+        images_dir = os.path.join(os.path.dirname(md_path), "images")
+        renamed = {}
+        if os.path.isdir(images_dir):
+            for name in sorted(os.listdir(images_dir)):
+                new_name = self._add_image(os.path.join(images_dir, name), name)
+                if new_name != name:
+                    renamed[name] = new_name
+
+        if not renamed:  # текст без изменений — копируется из файла потоком
+            self._add_file(md_path, arcname)
+            return
+        pattern = re.compile(
+            r'(?<=[("])images/('
+            + "|".join(map(re.escape, sorted(renamed, key=len, reverse=True)))
+            + r')(?=[)"\s])'
+        )
+        content = pattern.sub(
+            lambda m: "images/" + renamed[m.group(1)], read_text(md_path)
+        )
+        self._add_bytes(content.encode("utf-8"), arcname)
+
+    def close(self):  # Завершение архива и атомарная замена целевого файла.
+        self._archive.close()
+        apply_default_mode(self._tmp_path)  # mkstemp создаёт 0600
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):  # Недописанный архив удаляется, прежний остаётся на месте.
+        try:
+            self._archive.close()
+        finally:
+            os.remove(self._tmp_path)
+
+
+class ArchiveOutput:  # Режим архива: рабочие процессы пишут в локальную временную папку, родитель упаковывает.
+
+    def __init__(self, output_folder, options):
+        self.fmt = options["archive"]
+        self.ext = archive_extension(self.fmt)
+        self.per_document = options.get("archive_scope", "batch") == "document"
+        self.batch_path = None
+        if not self.per_document:
+            name = options.get("archive_name") or "docx2md"
+            self.batch_path = os.path.join(output_folder, name + self.ext)
+            if os.path.exists(self.batch_path) and not options.get("overwrite"):
+                raise FileExistsError(f"Архив уже существует: {self.batch_path}")
+        self.stage_root = tempfile.mkdtemp(prefix="docx2md-stage-")
+        self._writer = None
+        self.finals = {}  # номер задачи -> путь архива
+        self._overwrite = {}  # номер задачи -> можно ли заменить архив документа
+
+    def final_output(self, md_output):  # Куда попадёт документ.
+        if self.per_document:
+            return os.path.splitext(md_output)[0] + self.ext
+        return self.batch_path
+
+    def job(
+        self, index, input_path, output, options
+    ):  # Задача с выводом во временную папку; output — путь .md или архива документа.
+        md_output = os.path.splitext(output)[0] + ".md"
+        self.finals[index] = self.final_output(md_output)
+        self._overwrite[index] = options.get("overwrite")
+        staged = os.path.join(self.stage_root, str(index), os.path.basename(md_output))
+        os.makedirs(os.path.dirname(staged))
+        # повторы изображений убирает архив; рабочая папка документа всегда пуста
+        return (index, input_path, staged, dict(options, image_dedup="off"))
+
+    def pack(
+        self, result
+    ):  # Упаковка готового документа; результат указывает на архив.
+        staged_dir = os.path.join(self.stage_root, str(result["index"]))
+        try:
+            if not result["ok"] or result["skipped"]:
+                return result
+            final = self.finals[result["index"]]
+            md_path = result["output"]
+            arcname = os.path.basename(md_path)
+            if self.per_document:
+                if os.path.exists(final) and not self._overwrite[result["index"]]:
+                    raise FileExistsError(f"Архив уже существует: {final}")
+                writer = ArchiveWriter(final, self.fmt)
+                try:
+                    writer.add_document(md_path, arcname)
+                except BaseException:
+                    writer.abort()
+                    raise
+                writer.close()
+            else:
+                if self._writer is None:
+                    self._writer = ArchiveWriter(self.batch_path, self.fmt)
+                self._writer.add_document(md_path, arcname)
+            result["output"] = final
+            result["message"] = f"Успешно: {arcname} → {os.path.basename(final)}"
+        except OSError as e:
+            result["ok"] = False
+            result["output"] = ""
+            result["message"] = f"Ошибка ({result['filename']}): {str(e)}"
+        finally:
+            shutil.rmtree(staged_dir, ignore_errors=True)
+        return result
+
+    def close(
+        self, complete=True
+    ):  # Архив пакета публикуется, только если пакет дошёл до конца.
+        try:
+            if self._writer is not None and complete:
+                self._writer.close()
+            elif self._writer is not None:  # отмена или сбой
+                self._writer.abort()
+        finally:
+            shutil.rmtree(self.stage_root, ignore_errors=True)
@@ -0,0 +1,185 @@
+import os
+import re
+import json
+from .backends import get_backend
+from .utils import (
+    sanitize_filename,
+    image_alt_text,
+    unique_image_name,
+    place_image,
+    heading_anchor,
+    toc_markdown,
+)
+
+TOC_TITLE = "Оглавление"
+CAPTION_RE = re.compile(r"^Рисунок \d+( – .+|\.)$")  # подписи, которые удаляются
+
+# Элементы со списком строчных элементов: где он лежит в "c".
+INLINE_CONTAINERS = {
+    "Emph": None,
+    "Underline": None,
+    "Strong": None,
+    "Strikeout": None,
+    "Superscript": None,
+    "Subscript": None,
+    "SmallCaps": None,
+    "Quoted": 1,
+    "Cite": 1,
+    "Link": 1,
+    "Image": 1,
+    "Span": 1,
+}
+
+
+def _el(t, c=None):  # Узел AST pandoc.
+    return {"t": t} if c is None else {"t": t, "c": c}
+
+
+def _text_inlines(text):  # Текст -> Str/Space.
+    inlines = []
+    for i, word in enumerate(text.split()):
+        if i:
+            inlines.append(_el("Space"))
+        inlines.append(_el("Str", word))
+    return inlines
+
+
+def stringify(inlines):  # Плоский текст списка строчных элементов.
+
+    parts = []
+    for node in inlines:
+        t = node["t"]
+        if t == "Str":
+            parts.append(node["c"])
+        elif t in ("Space", "SoftBreak", "LineBreak"):
+            parts.append(" ")
+        elif t in ("Code", "Math"):
+            parts.append(node["c"][1])
+        elif t in INLINE_CONTAINERS:
+            pos = INLINE_CONTAINERS[t]
+            parts.append(stringify(node["c"] if pos is None else node["c"][pos]))
+    return "".join(parts)
+
+
+class AstTransformer:  # Один обход AST: изображения, ссылки, якоря заголовков, подписи.
+
+    def __init__(
+        self,
+        md_dir,
+        media,
+        written_images=None,
+        store=None,
+        rasterized=None,
+        names=None,
+    ):
+        self.md_dir = md_dir
+        self.media = media
+        self.images_folder = os.path.join(md_dir, "images")
+        self.written_images = written_images
+        self.store = store
+        self.rasterized = rasterized
+        self.names = names
+        self.image_counter = {}
+        self.toc_entries = []
+
+    def transform(self, ast):  # Изменяет и возвращает документ; TOC — после обхода.
+        os.makedirs(self.images_folder, exist_ok=True)
+        ast["blocks"] = self._walk(ast["blocks"])
+        ast["blocks"] = self._rebuild_toc(ast["blocks"])
+        return ast
+
+    def _walk(self, node):  # Обход в порядке документа; узел может стать списком.
+        if isinstance(node, list):
+            result = []
+            for item in node:
+                item = self._walk(item)
+                if isinstance(item, tuple):  # замена одного блока несколькими
+                    result.extend(item)
+                else:
+                    result.append(item)
+            return result
+        if not isinstance(node, dict) or "t" not in node:
+            return node
+
+        t = node["t"]
+        if t in ("Para", "Plain") and CAPTION_RE.match(stringify(node["c"])):
+            return ()
+        if "c" in node:
+            node["c"] = self._walk(node["c"])
+        if t == "Image":
+            self._image(node)
+        elif t == "Link":
+            node["c"][2][0] = node["c"][2][0].replace(" ", "%20")
+        elif t == "Header":
+            return self._header(node)
+        return node
+
+    def _image(self, node):  # Перенос изображения в images/ и новая ссылка.
+        attr, alt, (src, title) = node["c"]
+        if src.startswith("data:") or not src.strip():
+            return
+
+        original_name = os.path.basename(src.split("?")[0])
+        ext = os.path.splitext(original_name)[1]
+        alt_text = image_alt_text(stringify(alt).strip(), original_name)
+        base_name = sanitize_filename(alt_text)
+        img_name = unique_image_name(self.image_counter, base_name, ext)
+
+        img_name = place_image(
+            self.media,
+            original_name,
+            img_name,
+            base_name,
+            self.images_folder,
+            self.store,
+            self.rasterized,
+            self.names,
+        )
+        if img_name is None:
+            return
+        if self.written_images is not None:
+            self.written_images.append(img_name)
+        rel_path = os.path.relpath(
+            os.path.join(self.images_folder, img_name), self.md_dir
+        ).replace("\\", "/")
+        node["c"] = [attr, alt or _text_inlines(alt_text), [rel_path, title]]
+
+    def _header(self, node):  # Якорь перед заголовком и запись для оглавления.
+        level, attr, inlines = node["c"]
+        title = stringify(inlines).strip()
+        anchor = heading_anchor(title)
+        self.toc_entries.append((level, title, anchor))
+        return (_el("RawBlock", ["html", f'<a id="{anchor}"></a>']), node)
+
+    def _rebuild_toc(
+        self, blocks
+    ):  # Содержимое под "## Оглавление" до следующего заголовка 2-го уровня.
+
+        def is_h2(block):
+            return block["t"] == "Header" and block["c"][0] == 2
+
+        start = next(
+            (
+                i
+                for i, block in enumerate(blocks)
+                if is_h2(block) and stringify(block["c"][2]).strip() == TOC_TITLE
+            ),
+            None,
+        )
+        if start is None:
+            return blocks
+        end = next((i for i in range(start + 1, len(blocks)) if is_h2(blocks[i])), None)
+        if end is None:  # как и в regex-варианте: без следующего раздела не трогаем
+            return blocks
+        if blocks[end - 1]["t"] == "RawBlock":  # якорь следующего заголовка
+            end -= 1
+        toc = _el("RawBlock", ["markdown", toc_markdown(self.toc_entries)])
+        return blocks[: start + 1] + [toc] + blocks[end:]
+
+
+def ast_stage(content, ctx):  # JSON AST -> один обход -> GFM через backend pandoc.
+
+    ast = AstTransformer(
+        ctx.md_dir, ctx.media, ctx.images, ctx.store, ctx.rasterized, ctx.names
+    ).transform(json.loads(content))
+    return get_backend(ctx.options.get("backend")).from_json(json.dumps(ast))
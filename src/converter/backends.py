@@ -0,0 +1,287 @@
+import os
+import sys
+import tempfile
+import threading
+import subprocess
+import multiprocessing.util
+from .utils import read_text
+from .media import MediaIndex
+from . import native
+from .cancel import kill_on_cancel
+
+PANDOC_ARGS = ["--wrap=none", "--standalone", "--reference-links"]
+CREATE_NO_WINDOW = 0x08000000 if sys.platform == "win32" else 0  # без консоли в Windows
+
+# Скрипт постоянного воркера: читает из stdin строки
+# "вход<TAB>выход<TAB>формат входа<TAB>формат выхода", пишет результат
+# в выходной файл и отвечает "OK" или "ERR сообщение".
+WORKER_LUA = """
+local template = pandoc.template.compile(pandoc.template.default('gfm'))
+local opts = {wrap_text = 'wrap-none', reference_links = true, template = template}
+for line in io.lines() do
+  local input, output, reader, writer = line:match('^(.-)\\t(.-)\\t(.-)\\t(.*)$')
+  local ok, err = pcall(function()
+    local f = assert(io.open(input, 'rb'))
+    local data = f:read('a')
+    f:close()
+    pandoc.mediabag.empty()
+    local doc = pandoc.read(data, reader)
+    local result = writer == 'gfm' and pandoc.write(doc, 'gfm', opts)
+      or pandoc.write(doc, writer)
+    local out = assert(io.open(output, 'wb'))
+    out:write(result)
+    out:close()
+  end)
+  if ok then
+    io.stdout:write('OK\\n')
+  else
+    io.stdout:write('ERR ', (tostring(err):gsub('\\n', ' ')), '\\n')
+  end
+  io.stdout:flush()
+end
+"""
+
+
+def pandoc_path():  # Путь к pandoc; pypandoc импортируется при первом запуске.
+    import pypandoc
+
+    return pypandoc.get_pandoc_path()
+
+
+def run_pandoc(
+    args, text=None
+):  # Запуск pandoc с выводом в stdout; отмена пакета завершает процесс.
+    proc = subprocess.Popen(
+        [pandoc_path()] + args,
+        stdin=subprocess.PIPE if text is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        creationflags=CREATE_NO_WINDOW,
+    )
+    with kill_on_cancel(proc):
+        stdout, stderr = proc.communicate(
+            text.encode("utf-8") if text is not None else None
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(
+            f'Pandoc died with exitcode "{proc.returncode}" during conversion: '
+            + stderr.decode("utf-8", errors="replace")
+        )
+    return stdout.decode("utf-8", errors="replace")
+
+
+class SubprocessBackend:  # Новый процесс pandoc на каждый документ (запасной вариант).
+
+    name = "subprocess"
+
+    def convert(
+        self, input_path, temp_dir=None
+    ):  # DOCX -> GFM; медиа извлекаются в temp_dir.
+        extra_args = list(PANDOC_ARGS)
+        if temp_dir:
+            extra_args.insert(0, f"--extract-media={temp_dir}")
+        return run_pandoc(["--from=docx", "--to=gfm", input_path] + extra_args)
+
+    def to_json(
+        self, input_path, temp_dir=None
+    ):  # DOCX -> JSON AST pandoc (текст); медиа извлекаются в temp_dir.
+        extra_args = [f"--extract-media={temp_dir}"] if temp_dir else []
+        return run_pandoc(["--from=docx", "--to=json", input_path] + extra_args)
+
+    def from_json(self, text):  # JSON AST -> GFM с теми же параметрами, что convert.
+        return run_pandoc(["--from=json", "--to=gfm"] + PANDOC_ARGS, text)
+
+    def close(self):
+        pass
+
+
+class WarmBackend:  # Долгоживущий процесс `pandoc lua`: среда Haskell запускается один раз.
+
+    name = "warm"
+
+    def __init__(self):
+        self._proc = None
+        self._script = None
+        self._answered = False  # воркер хотя бы раз успешно ответил
+        self._fallback = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._script is None:
+            fd, self._script = tempfile.mkstemp(prefix="docx2md-", suffix=".lua")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(WORKER_LUA)
+        self._proc = subprocess.Popen(
+            [pandoc_path(), "lua", self._script],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            creationflags=CREATE_NO_WINDOW,
+        )
+
+    def _request(
+        self, input_path, output_path, reader="docx", writer="gfm"
+    ):  # Один запрос к воркеру; None, если воркер умер.
+        if self._proc is None or self._proc.poll() is not None:
+            self._start()
+        try:
+            with kill_on_cancel(self._proc):  # отмена обрывает и текущий документ
+                self._proc.stdin.write(
+                    f"{input_path}\t{output_path}\t{reader}\t{writer}\n"
+                )
+                self._proc.stdin.flush()
+                reply = self._proc.stdout.readline()
+        except OSError:
+            reply = ""
+        if not reply:
+            self._proc.kill()
+            self._proc = None
+            return None
+        return reply.rstrip("\n")
+
+    def convert(
+        self, input_path, temp_dir=None
+    ):  # DOCX -> GFM через постоянный воркер.
+        if self._fallback is not None:
+            return self._fallback.convert(input_path, temp_dir)
+
+        if temp_dir:
+            with MediaIndex.from_docx(input_path) as media:
+                media.extract_all(temp_dir)
+        content = self._run(input_path, "docx", "gfm")
+        if content is None:
+            return self._fallback.convert(input_path, temp_dir)
+        return content
+
+    def to_json(self, input_path, temp_dir=None):  # DOCX -> JSON AST через воркер.
+        if self._fallback is not None:
+            return self._fallback.to_json(input_path, temp_dir)
+
+        if temp_dir:
+            with MediaIndex.from_docx(input_path) as media:
+                media.extract_all(temp_dir)
+        text = self._run(input_path, "docx", "json")
+        if text is None:
+            return self._fallback.to_json(input_path, temp_dir)
+        return text
+
+    def from_json(self, text):  # JSON AST -> GFM через воркер.
+        if self._fallback is not None:
+            return self._fallback.from_json(text)
+
+        fd, input_path = tempfile.mkstemp(prefix="docx2md-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        try:
+            content = self._run(input_path, "json", "gfm")
+        finally:
+            os.remove(input_path)
+        if content is None:
+            return self._fallback.from_json(text)
+        return content
+
+    def _run(
+        self, input_path, reader, writer
+    ):  # Текст результата; None — воркер так и не заработал, нужен запасной backend.
+        fd, output_path = tempfile.mkstemp(prefix="docx2md-", suffix=".out")
+        os.close(fd)
+        try:
+            with self._lock:
+                try:
+                    reply = self._request(
+                        os.path.abspath(input_path), output_path, reader, writer
+                    )
+                except OSError:  # pandoc без подкоманды lua или не найден
+                    reply = None
+                if reply is None and not self._answered:
+                    self._fallback = SubprocessBackend()
+                    return None
+                if reply is None:
+                    raise RuntimeError("Процесс pandoc неожиданно завершился")
+                self._answered = True
+            if reply != "OK":
+                raise RuntimeError(reply[4:] or "Ошибка pandoc")
+            return read_text(output_path)
+        finally:
+            os.remove(output_path)
+
+    def close(self):  # Остановка воркера и удаление его скрипта; можно запустить снова.
+        with self._lock:  # предпросмотр в другом потоке дождётся своего ответа
+            if self._proc is not None:
+                try:
+                    self._proc.stdin.close()
+                except OSError:  # воркер уже завершился
+                    pass
+                self._proc.wait()
+                self._proc = None
+            if self._script is not None:
+                try:
+                    os.remove(self._script)
+                except OSError:
+                    pass
+                self._script = None
+
+
+class AutoBackend:  # Простые документы — встроенным конвертером, остальные — через pandoc.
+
+    name = "auto"
+
+    def __init__(self):
+        self._fallback = SubprocessBackend()
+        self.native_count = 0
+        self.pandoc_count = 0
+
+    def convert(
+        self, input_path, temp_dir=None
+    ):  # DOCX -> GFM; при неподдерживаемых конструкциях — pandoc.
+        try:
+            content = native.convert(input_path)
+        except native.Unsupported:
+            self.pandoc_count += 1
+            return self._fallback.convert(input_path, temp_dir)
+        if temp_dir:
+            with MediaIndex.from_docx(input_path) as media:
+                media.extract_all(temp_dir)
+        self.native_count += 1
+        return content
+
+    def to_json(self, input_path, temp_dir=None):  # AST строит только pandoc.
+        return self._fallback.to_json(input_path, temp_dir)
+
+    def from_json(self, text):
+        return self._fallback.from_json(text)
+
+    def close(self):
+        self._fallback.close()
+
+
+BACKENDS = {
+    SubprocessBackend.name: SubprocessBackend,
+    WarmBackend.name: WarmBackend,
+    AutoBackend.name: AutoBackend,
+}
+_instances = {}  # по одному экземпляру на процесс: воркеры пула держат свой pandoc
+_cleanup = None  # финализатор, закрывающий экземпляры при выходе процесса
+
+
+def get_backend(name=None):  # Backend pandoc по имени из настроек.
+    global _cleanup
+    name = name or SubprocessBackend.name
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный backend pandoc: {name}")
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+        if _cleanup is None or not _cleanup.still_active():
+            # atexit в процессах пула не вызывается, финализаторы multiprocessing —
+            # и там, и в основном процессе
+            _cleanup = multiprocessing.util.Finalize(
+                None, close_backends, exitpriority=10
+            )
+    return _instances[name]
+
+
+def close_backends():  # Остановка всех backend процесса (конец пакета, выход).
+    while _instances:
+        _instances.popitem()[1].close()
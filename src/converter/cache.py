@@ -0,0 +1,263 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import functools
+import subprocess
+from .utils import read_text, write_atomic, reserve_filename, file_digest
+
+PIPELINE_VERSION = "1"  # увеличивать при любом изменении постобработки в utils/pipeline
+DEFAULT_CACHE_MAX_MB = 1024
+PROBE_FILE = "dependencies.json"  # версия pandoc по пути и mtime бинарника
+IGNORED_OPTIONS = {
+    "overwrite",
+    "workers",
+    "backend",
+    "image_dedup",
+    "emf_workers",
+    "optimize_workers",
+    "media_mode",
+    "cache",
+    "cache_dir",
+    "cache_max_mb",
+    "trace_path",
+    "trace_format",
+    "journal",
+    "resume",
+    "schedule",
+    "memory_budget_mb",
+    "archive",
+    "archive_scope",
+    "archive_name",
+}
+
+
+def default_cache_dir():  # Папка кэша пользователя (XDG/LOCALAPPDATA).
+    base = (
+        os.environ.get("XDG_CACHE_HOME")
+        or os.environ.get("LOCALAPPDATA")
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(base, "docx2md")
+
+
+def probe_pandoc(
+    cache_dir=None,
+):  # Версия pandoc; поиск через pypandoc и `pandoc --version` — только при смене бинарника.
+    env = os.getenv("PYPANDOC_PANDOC")
+    probe_path = os.path.join(cache_dir or default_cache_dir(), PROBE_FILE)
+    try:
+        with open(probe_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["env"] == env and os.path.getmtime(cached["path"]) == cached["mtime"]:
+            return cached["version"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    from .backends import pandoc_path, CREATE_NO_WINDOW  # тянет pypandoc
+
+    path = pandoc_path()  # тот же pandoc, что и при конвертации; OSError, если нет
+    output = subprocess.run(
+        [path, "--version"],
+        capture_output=True,
+        text=True,
+        check=True,
+        creationflags=CREATE_NO_WINDOW,
+    ).stdout
+    version = output.split("\n", 1)[0].split()[-1]
+    probe = {
+        "env": env,
+        "path": path,
+        "mtime": os.path.getmtime(path),
+        "version": version,
+    }
+    try:
+        os.makedirs(os.path.dirname(probe_path), exist_ok=True)
+        write_atomic(probe_path, json.dumps(probe))
+    except OSError:  # кэш недоступен — в следующий раз проверим заново
+        pass
+    return version
+
+
+@functools.lru_cache(maxsize=None)
+def pandoc_version():  # Версия pandoc, не чаще одной проверки на процесс.
+    return probe_pandoc()
+
+
+def _dir_size(path):  # Суммарный размер файлов в папке.
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+class ConversionCache:  # Кэш результатов на диске: <root>/conversions/<ключ>/{document.md, images/, meta.json}.
+
+    def __init__(self, root=None, max_mb=DEFAULT_CACHE_MAX_MB):
+        self.root = os.path.join(root or default_cache_dir(), "conversions")
+        self.max_bytes = int(max_mb) * 1024 * 1024
+        os.makedirs(self.root, exist_ok=True)
+
+    @classmethod
+    def from_options(
+        cls, options
+    ):  # Кэш по настройкам конвертации или None, если выключен или недоступен.
+        if not options.get("cache"):
+            return None
+        try:
+            return cls(
+                options.get("cache_dir"),
+                options.get("cache_max_mb") or DEFAULT_CACHE_MAX_MB,
+            )
+        except OSError:  # папку кэша не создать — конвертация без кэша
+            return None
+
+    def key(
+        self, input_path, options
+    ):  # Ключ: хэш DOCX + значимые опции + версии pandoc и постобработки.
+        relevant = {k: v for k, v in options.items() if k not in IGNORED_OPTIONS}
+        h = hashlib.sha256()
+        h.update(file_digest(input_path).encode())
+        h.update(json.dumps(relevant, sort_keys=True, default=str).encode())
+        h.update(pandoc_version().encode())
+        h.update(PIPELINE_VERSION.encode())
+        return h.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def restore(
+        self, key, output_path, names=None
+    ):  # Восстановление .md и изображений из кэша; имена в images/ или None при промахе.
+
+        entry = self._entry(key)
+        meta_path = os.path.join(entry, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        os.utime(meta_path)  # отметка использования для LRU
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        images_folder = os.path.join(os.path.dirname(output_path), "images")
+        renamed = {}
+        if meta["images"]:
+            os.makedirs(images_folder, exist_ok=True)
+        for name in meta["images"]:
+            base_name, ext = os.path.splitext(name)
+            if names is not None:  # по индексу папки результатов
+                new_name = names.reserve(name, base_name, ext)
+            else:
+                new_name = reserve_filename(images_folder, name, base_name, ext)
+            shutil.copy2(
+                os.path.join(entry, "images", name),
+                os.path.join(images_folder, new_name),
+            )
+            renamed[name] = new_name
+
+        content = read_text(os.path.join(entry, "document.md"))
+        content = re.sub(
+            r'(?<=[("])images/([^)"\s]+)',
+            lambda m: "images/" + renamed.get(m.group(1), m.group(1)),
+            content,
+        )  # имена в images/ могли измениться из-за занятых файлов
+        write_atomic(output_path, content)
+        return list(renamed.values())
+
+    def store(
+        self, key, output_path, image_names
+    ):  # Сохранение результата; запись атомарна через rename папки.
+
+        entry = self._entry(key)
+        if os.path.exists(entry):
+            return
+        try:
+            tmp_entry = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        except OSError:
+            return
+        try:
+            shutil.copy2(output_path, os.path.join(tmp_entry, "document.md"))
+            os.makedirs(os.path.join(tmp_entry, "images"))
+            images_folder = os.path.join(os.path.dirname(output_path), "images")
+            for name in image_names:
+                shutil.copy2(
+                    os.path.join(images_folder, name),
+                    os.path.join(tmp_entry, "images", name),
+                )
+            with open(os.path.join(tmp_entry, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"images": list(image_names)}, f, ensure_ascii=False)
+            os.rename(tmp_entry, entry)
+        except OSError:  # запись в кэш не должна ломать конвертацию
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    def prune(
+        self,
+    ):  # LRU-вытеснение самых давно использованных записей до лимита размера.
+
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            entry = os.path.join(self.root, name)
+            meta_path = os.path.join(entry, "meta.json")
+            if name.startswith(".") or not os.path.exists(meta_path):
+                continue
+            size = _dir_size(entry)
+            entries.append((os.path.getmtime(meta_path), size, entry))
+            total += size
+
+        removed = 0
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+class PandocOutputCache:  # Небольшой кэш сырого вывода pandoc (GFM без извлечения медиа) для предпросмотра и конвертации.
+
+    def __init__(self, root=None, max_entries=64):
+        self.root = os.path.join(root or default_cache_dir(), "pandoc")
+        self.max_entries = max_entries  # папка создаётся при первой записи
+
+    def _path(self, input_path):  # Ключ: путь, mtime и размер файла, версия pandoc.
+        st = os.stat(input_path)
+        raw = f"{os.path.abspath(input_path)}|{st.st_mtime_ns}|{st.st_size}|{pandoc_version()}"
+        return os.path.join(self.root, hashlib.sha256(raw.encode()).hexdigest() + ".md")
+
+    def get(
+        self, input_path
+    ):  # Сохранённый вывод pandoc или None; ошибки кэша — промах.
+        try:
+            path = self._path(input_path)
+            content = read_text(path)
+            os.utime(path)  # отметка использования для LRU
+        except OSError:
+            return None
+        return content
+
+    def put(
+        self, input_path, content
+    ):  # Сохранение вывода и вытеснение старых записей; ошибки записи не критичны.
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            write_atomic(self._path(input_path), content)
+            entries = sorted(
+                (os.path.getmtime(os.path.join(self.root, f)), f)
+                for f in os.listdir(self.root)
+                if f.endswith(".md")
+            )
+        except OSError:
+            return
+        for _, name in entries[: max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
@@ -0,0 +1,76 @@
+import threading
+import contextlib
+import multiprocessing
+
+POLL_SECONDS = 0.05  # как часто наблюдатель проверяет флаг отмены
+
+_token = None  # флаг отмены текущего пакета в этом процессе
+
+
+class Cancelled(Exception):  # Пакет отменён пользователем.
+    pass
+
+
+class CancelToken:  # Флаг отмены, общий для процесса пакета и рабочих процессов пула.
+
+    def __init__(self):
+        self._event = multiprocessing.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def wait(self, timeout):
+        return self._event.wait(timeout)
+
+
+def set_token(token):  # Инициализатор пула: флаг отмены для всего процесса.
+    global _token
+    _token = token
+
+
+def current():
+    return _token
+
+
+def cancelled():
+    return _token is not None and _token.is_set()
+
+
+def check():  # Точка отмены между шагами работы.
+    if cancelled():
+        raise Cancelled("Конвертация отменена")
+
+
+@contextlib.contextmanager
+def kill_on_cancel(
+    proc,
+):  # Пока выполняется блок, отмена пакета завершает внешний процесс proc.
+
+    token = _token
+    if token is None:
+        yield
+        return
+    done = threading.Event()
+
+    def watch():  # без join: наблюдатель сам выходит за POLL_SECONDS после блока
+        while not done.is_set():
+            if token.wait(POLL_SECONDS):
+                if not done.is_set() and proc.poll() is None:
+                    proc.kill()
+                return
+
+    threading.Thread(target=watch, daemon=True).start()
+    try:
+        yield
+    except GeneratorExit:  # закрыт генератор вокруг блока — отмена уже обработана
+        raise
+    except BaseException:
+        check()  # процесс завершился из-за отмены — это не ошибка pandoc
+        raise
+    else:
+        check()
+    finally:
+        done.set()
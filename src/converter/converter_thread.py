@@ -1,104 +1,145 @@
 import os
-import re
-import shutil
-import tempfile
-import zipfile
+import time
 from PyQt5.QtCore import QThread, pyqtSignal
-import pypandoc
-from .utils import (
-    sanitize_filename,
-    convert_emf_to_png,
-    process_images,
-    fix_links_and_toc,
-    replace_image_links,
-)
-from os.path import normpath, basename
+from .engine import iter_batch
+from .cancel import CancelToken
+from .tracing import summarize_spans, format_summary
+from .optimizer import savings_summary
+
+PROGRESS_INTERVAL = 1 / 30  # не чаще ~30 обновлений прогресса в секунду
 
 
 class EnhancedConverterThread(QThread):
-    progress_updated = pyqtSignal(int, str)
-    conversion_finished = pyqtSignal(str, str, str)
+    progress_updated = pyqtSignal(object, object, str)  # байт готово, всего, файл
+    conversion_finished = pyqtSignal(str, str, str, float)  # ..., секунды на файл
     finished_all = pyqtSignal(int)
-    error_occurred = pyqtSignal(str)
+    error_occurred = pyqtSignal(str)  # ошибка пакета целиком
+    info_message = pyqtSignal(str)  # сводки по пакету для журнала
+    stage_timed = pyqtSignal(list)  # интервалы стадий одного файла
 
-    def __init__(self, files, output_folder, options):
+    def __init__(self, files, output_folder, options, sizes=None):
         super().__init__()
         self.files = files
+        self.sizes = sizes  # путь -> размер, если уже известен (список файлов GUI)
         self.output_folder = output_folder
         self.options = options
         self._is_running = True
+        self.cancel_token = CancelToken()  # доходит до pandoc и растеризации в пуле
         self.processed_images = set()
 
-    def run(self):  # Основной процесс конвертации с обработкой ошибок.
-
-        total_files = len(self.files)
+    def run(self):  # Основной процесс конвертации: задачи выполняются в пуле процессов.
+
+        sizes = dict(self.sizes or {})
+        for path in self.files:
+            if path not in sizes:
+                try:
+                    sizes[path] = os.path.getsize(path)
+                except OSError:
+                    sizes[path] = 0
+        total_bytes = sum(sizes.values())
+        done_bytes = 0
+        last_progress = 0.0
         success_count = 0
-
-        for i, input_path in enumerate(self.files):
-            if not self._is_running:
-                break
-
-            filename = os.path.basename(input_path)
-            self.progress_updated.emit(int((i + 1) / total_files * 100), filename)
-
-            try:
-                if not os.access(input_path, os.R_OK):
-                    raise PermissionError(f"Нет прав на чтение файла: {filename}")
-
-                if not os.access(self.output_folder, os.W_OK):
-                    raise PermissionError(
-                        f"Нет прав на запись в папку: {self.output_folder}"
+        done = 0
+        cache_hits = 0
+        emf_timings = []
+        image_savings = []
+        spans = []
+
+        batch = iter_batch(
+            self.files, self.output_folder, self.options, self.cancel_token
+        )
+        try:
+            for result in batch:
+                if result["cancelled"]:  # остальные задачи тоже прерваны
+                    break
+                done += 1
+                filename = result["filename"]
+                done_bytes += sizes.get(result["input"], 0)
+                now = time.monotonic()
+                if now - last_progress >= PROGRESS_INTERVAL or done == len(self.files):
+                    last_progress = now
+                    self.progress_updated.emit(done_bytes, total_bytes, filename)
+                spans.extend(result["spans"])
+                self.stage_timed.emit(result["spans"])
+                seconds = sum(span["duration"] for span in result["spans"])
+
+                if result["ok"]:
+                    success_count += 1
+                    cache_hits += result["cached"]
+                    self.processed_images.update(result["image_hashes"])
+                    emf_timings.extend(
+                        dict(t, file=filename) for t in result["emf_timings"]
                     )
-
-                if not os.path.exists(input_path):
-                    raise FileNotFoundError(f"Файл не найден: {filename}")
-
-                if not zipfile.is_zipfile(input_path):
-                    raise ValueError(f"Неверный формат DOCX: {filename}")
-
-                base_name = os.path.splitext(filename)[0]
-                safe_name = sanitize_filename(base_name)
-                output_path = os.path.join(self.output_folder, f"{safe_name}.md")
-
-                if os.path.exists(output_path) and not self.options.get("overwrite"):
-                    raise FileExistsError(f"Файл уже существует: {output_path}")
-
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    pypandoc.convert_file(
-                        input_path,
-                        "markdown",
-                        outputfile=output_path,
-                        format="docx",
-                        extra_args=[
-                            f"--extract-media={temp_dir}",
-                            "--wrap=none",
-                            "--to=gfm",
-                            "--standalone",
-                            "--reference-links",
-                        ],
+                    image_savings.extend(result["image_savings"])
+                    self.conversion_finished.emit(
+                        filename, result["message"], result["output"], seconds
+                    )
+                else:
+                    self.conversion_finished.emit(
+                        filename, result["message"], "", seconds
                     )
 
-                    process_images(output_path, temp_dir)
-                    replacement_rules = {}
-                    for f in os.listdir(os.path.join(temp_dir, "media")):
-                        if f.lower().endswith((".png", ".jpg", ".jpeg", ".gif")):
-                            old_path = os.path.join("media", f)
-                            new_path = os.path.join("images", f)
-                            replacement_rules[old_path] = new_path
-                    replace_image_links(output_path, replacement_rules)
-                    fix_links_and_toc(output_path)
-
-                success_count += 1
-                self.conversion_finished.emit(
-                    filename, f"Успешно: {safe_name}.md", output_path
-                )
-
-            except Exception as e:
-                error_msg = f"Ошибка ({filename}): {str(e)}"
-                self.error_occurred.emit(error_msg)
-                self.conversion_finished.emit(filename, error_msg, "")
-
+                if not self._is_running:
+                    break
+        except Exception as e:
+            self.error_occurred.emit(f"Ошибка пакета: {str(e)}")
+        finally:
+            batch.close()
+
+        if self.options.get("cache"):
+            misses = success_count - cache_hits
+            rate = cache_hits / success_count * 100 if success_count else 0
+            self.info_message.emit(
+                f"Кэш: попаданий {cache_hits}, промахов {misses} ({rate:.0f}%)"
+            )
+        if emf_timings:
+            self.info_message.emit(self.emf_summary(emf_timings))
+        if image_savings:
+            self.info_message.emit(self.savings_message(image_savings))
+        if spans:
+            self.info_message.emit(format_summary(summarize_spans(spans)))
+        if self.processed_images:
+            self.info_message.emit(
+                f"Уникальных изображений в пакете: {len(self.processed_images)}"
+            )
         self.finished_all.emit(success_count)
 
-    def stop(self):  # Безопасная остановка потока.
+    @staticmethod
+    def emf_summary(
+        timings, top=5
+    ):  # Сводка растеризации EMF/WMF с самыми медленными файлами.
+        cached = sum(t["cached"] for t in timings)
+        total = sum(t["seconds"] for t in timings)
+        slowest = sorted(timings, key=lambda t: t["seconds"], reverse=True)[:top]
+        lines = [
+            f"Растеризация EMF/WMF: {len(timings)} изображений, из кэша {cached}, "
+            f"всего {total:.2f} с"
+        ]
+        lines += [
+            f"  {t['seconds']:.2f} с — {t['image']} ({t['file']})"
+            for t in slowest
+            if not t["cached"]
+        ]
+        return "\n".join(lines)
+
+    @staticmethod
+    def savings_message(stats):  # Сводка сжатия изображений за пакет.
+        summary = savings_summary(stats)
+        share = (
+            summary["saved"] / summary["bytes_in"] * 100 if summary["bytes_in"] else 0
+        )
+        return (
+            f"Сжатие изображений: {summary['images']}, из кэша {summary['cached']}, "
+            f"сэкономлено {summary['saved'] / 1048576:.1f} МБ ({share:.0f}%)"
+        )
+
+    def stop(
+        self,
+    ):  # Отмена: текущие pandoc и растеризация прерываются, не дожидаясь конца.
         self._is_running = False
+        self.cancel_token.cancel()
+
+    @property
+    def cancelled(self):
+        return not self._is_running
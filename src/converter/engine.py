@@ -0,0 +1,328 @@
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .utils import sanitize_filename
+from .pipeline import PipelineContext, default_pipeline, ast_pipeline
+from .cache import ConversionCache, PandocOutputCache
+from .backends import get_backend, close_backends
+from .media import MediaIndex
+from .streaming import stream_to_file
+from .tracing import Tracer, TraceWriter
+from .journal import BatchJournal
+from .scheduler import JobScheduler
+from .archive import ArchiveOutput
+from .output_index import OutputIndex
+from . import cancel, output_index
+
+
+def default_workers():  # Число рабочих процессов по умолчанию — по числу ядер.
+    return os.cpu_count() or 1
+
+
+def plan_outputs(
+    files, output_folder, taken=None
+):  # Детерминированно назначает имена .md файлов в порядке списка, до запуска пула.
+
+    taken = set(taken or ())  # имена (без .md, в нижнем регистре), уже занятые
+    outputs = []
+    for input_path in files:
+        base_name = os.path.splitext(os.path.basename(input_path))[0]
+        safe_name = sanitize_filename(base_name)
+        candidate = safe_name
+        counter = 1
+        while candidate.lower() in taken:  # одинаковые имена из разных папок
+            candidate = f"{safe_name}_{counter}"
+            counter += 1
+        taken.add(candidate.lower())
+        outputs.append(os.path.join(output_folder, f"{candidate}.md"))
+    return outputs
+
+
+def convert_document(
+    input_path, output_path, options, tracer=None
+):  # Конвертация одного документа: pandoc + обработка изображений и ссылок (или кэш).
+
+    filename = os.path.basename(input_path)
+    tracer = tracer or Tracer(filename)
+    output_folder = os.path.dirname(output_path)
+
+    if not os.access(input_path, os.R_OK):
+        raise PermissionError(f"Нет прав на чтение файла: {filename}")
+
+    if not os.access(output_folder, os.W_OK):
+        raise PermissionError(f"Нет прав на запись в папку: {output_folder}")
+
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"Файл не найден: {filename}")
+
+    if not zipfile.is_zipfile(input_path):
+        raise ValueError(f"Неверный формат DOCX: {filename}")
+
+    index = output_index.current()  # снимок папки результатов, если идёт пакет
+    exists = (
+        index.output_exists(output_path)
+        if index is not None
+        else os.path.exists(output_path)
+    )
+    if exists and not options.get("overwrite"):
+        raise FileExistsError(f"Файл уже существует: {output_path}")
+
+    input_size = os.path.getsize(input_path)
+    cache = ConversionCache.from_options(options)
+    if cache is not None:
+        with tracer.span("cache", bytes_in=input_size) as span:
+            key = cache.key(input_path, options)
+            names = index.for_document(output_path) if index is not None else None
+            restored = cache.restore(key, output_path, names)
+            span["bytes_out"] = (
+                os.path.getsize(output_path) if restored is not None else 0
+            )
+        if restored is not None:  # имена нужны индексу папки результатов
+            return {"cached": True, "images": restored}
+
+    if options.get("engine") == "stream":  # pandoc запускается напрямую, без backend
+        with tempfile.TemporaryDirectory() as temp_dir, MediaIndex.from_docx(
+            input_path, temp_dir
+        ) as media:
+            ctx = PipelineContext(output_path, temp_dir, options, media, tracer)
+            _run_or_discard(stream_to_file, input_path, ctx)
+    else:
+        ctx = _convert_in_memory(input_path, output_path, options, tracer, input_size)
+
+    if cache is not None:
+        with tracer.span("cache_store", images=len(ctx.images)):
+            cache.store(key, output_path, ctx.images)
+    return {
+        "cached": False,
+        "images": ctx.images,
+        "image_hashes": ctx.store.digests if ctx.store is not None else [],
+        "emf_timings": ctx.emf_timings,
+        "image_savings": ctx.image_savings,
+    }
+
+
+def _convert_in_memory(
+    input_path, output_path, options, tracer, input_size
+):  # pandoc -> текст в памяти -> стадии Pipeline -> одна запись; контекст стадий.
+
+    backend = get_backend(options.get("backend"))
+    direct = options.get("media_mode", "direct") == "direct"
+    use_ast = options.get("engine") == "ast"
+    pipeline = ast_pipeline() if use_ast else default_pipeline()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        extract_dir = None if direct else temp_dir
+        with tracer.span("pandoc", bytes_in=input_size) as span:
+            content = None
+            # вывод pandoc мог остаться от предпросмотра; кэш только с --cache
+            if direct and not use_ast and options.get("cache"):
+                content = PandocOutputCache(options.get("cache_dir")).get(input_path)
+            if content is None and use_ast:
+                content = backend.to_json(input_path, extract_dir)
+            elif content is None:
+                content = backend.convert(input_path, extract_dir)
+            span["bytes_out"] = len(content)
+
+        if direct:  # медиа читаются прямо из архива DOCX и пишутся сразу в images/
+            with MediaIndex.from_docx(input_path, temp_dir) as media:
+                ctx = PipelineContext(output_path, temp_dir, options, media, tracer)
+                _run_or_discard(pipeline.run_to_file, content, ctx)
+        else:
+            ctx = PipelineContext(output_path, temp_dir, options, tracer=tracer)
+            _run_or_discard(pipeline.run_to_file, content, ctx)
+    return ctx
+
+
+def _run_or_discard(
+    func, source, ctx
+):  # Обработка документа; при ошибке или отмене его изображения удаляются.
+    try:
+        func(source, ctx)
+    except BaseException:
+        ctx.discard_images()  # .md не появляется: он пишется атомарно последним
+        raise
+
+
+def run_job(
+    index, input_path, output_path, options
+):  # Выполняет задачу в рабочем процессе и возвращает результат в виде словаря.
+
+    filename = os.path.basename(input_path)
+    tracer = Tracer(filename)
+    result = {
+        "index": index,
+        "input": input_path,
+        "filename": filename,
+        "output": "",
+        "ok": False,
+        "message": "",
+        "cached": False,
+        "image_hashes": [],
+        "emf_timings": [],
+        "image_savings": [],
+        "spans": tracer.spans,
+        "skipped": False,
+        "cancelled": False,
+    }
+    try:
+        result.update(convert_document(input_path, output_path, options, tracer))
+        result["ok"] = True
+        result["output"] = output_path
+        result["message"] = f"Успешно: {os.path.basename(output_path)}"
+    except cancel.Cancelled:
+        result["cancelled"] = True
+        result["message"] = f"Отменено: {filename}"
+    except Exception as e:
+        result["message"] = f"Ошибка ({filename}): {str(e)}"
+    return result
+
+
+def _prune_cache(options):  # Вытеснение старых записей кэша после пакета.
+    cache = ConversionCache.from_options(options)
+    if cache is not None:
+        cache.prune()
+
+
+def skipped_result(entry):  # Результат файла, готового по журналу прошлого запуска.
+    filename = os.path.basename(entry["input"])
+    return {
+        "index": entry["idx"],
+        "input": entry["input"],
+        "filename": filename,
+        "output": entry["output"],
+        "ok": True,
+        "message": f"Пропущен (уже сконвертирован): {os.path.basename(entry['output'])}",
+        "cached": False,
+        "image_hashes": [],
+        "emf_timings": [],
+        "image_savings": [],
+        "spans": [],
+        "skipped": True,
+        "cancelled": False,
+    }
+
+
+def iter_batch(
+    files, output_folder, options, cancel_token=None, outputs=None, replace=None
+):  # Генератор результатов пакета в порядке завершения; ведёт журнал и трассировку.
+
+    archive = ArchiveOutput(output_folder, options) if options.get("archive") else None
+    use_journal = options.get("journal", True) and (
+        archive is None or archive.per_document
+    )  # архив пакета после сбоя неполон — он собирается заново
+    journal = BatchJournal(output_folder) if use_journal else None
+    if journal is not None and options.get("resume"):  # пакет берётся из журнала
+        done, todo = journal.resume_plan()
+        jobs = [
+            (
+                entry["idx"],
+                entry["input"],
+                entry["output"],
+                dict(options, overwrite=True) if entry["overwrite"] else options,
+            )
+            for entry in todo
+        ]
+    else:
+        done = []
+        outputs = outputs or plan_outputs(files, output_folder)
+        if journal is not None:
+            finals = [archive.final_output(o) for o in outputs] if archive else outputs
+            journal.start(files, finals)
+        jobs = [(i, *paths, options) for i, paths in enumerate(zip(files, outputs))]
+        if replace is not None:  # можно ли заменить .md — отдельно для каждого файла
+            jobs = [
+                (i, input_path, output, dict(options, overwrite=flag))
+                for (i, input_path, output, _), flag in zip(jobs, replace)
+            ]
+    if archive is not None:
+        jobs = [archive.job(*job) for job in jobs]
+    # в архивном режиме документы пишутся в отдельные промежуточные папки
+    index = OutputIndex.load(output_folder) if archive is None else None
+
+    writer = None
+    if options.get("trace_path"):
+        writer = TraceWriter(
+            options["trace_path"], options.get("trace_format", "jsonl")
+        )
+    scheduler = JobScheduler(jobs, options)
+    results = _run_batch(scheduler, options, cancel_token, index)
+    complete = False  # все задачи выполнены и ни одна не отменена
+    try:
+        for entry in done:
+            yield skipped_result(entry)
+        cancelled = False
+        for result in results:
+            cancelled = cancelled or result["cancelled"]
+            scheduler.observe(result)
+            if index is not None:
+                index.claim(result)
+            if archive is not None:
+                result = archive.pack(result)
+            if journal is not None and not result["cancelled"]:  # остаётся pending
+                journal.record(result["index"], result["ok"], result["message"])
+            if writer is not None:
+                writer.write(result["spans"])
+            yield result
+        complete = not cancelled
+    finally:
+        results.close()
+        scheduler.save()
+        if index is not None:
+            index.save()
+        if archive is not None:
+            archive.close(complete)
+        if writer is not None:
+            writer.close()
+        if journal is not None:
+            journal.close()
+
+
+def _init_worker(
+    cancel_token, index
+):  # Инициализатор пула: флаг отмены и индекс папки.
+    cancel.set_token(cancel_token)
+    output_index.set_index(index)
+
+
+def _run_batch(
+    scheduler, options, cancel_token=None, index=None
+):  # Выполнение задач планировщика в пуле; результаты в порядке завершения.
+
+    workers = min(
+        options.get("workers") or default_workers(), max(len(scheduler.jobs), 1)
+    )
+
+    if workers <= 1:  # без накладных расходов на запуск процессов
+        previous = cancel.current(), output_index.current()
+        _init_worker(cancel_token, index)
+        try:
+            for job in scheduler.jobs:  # по одному порядок не влияет на общее время
+                yield run_job(*job)
+        finally:
+            _init_worker(*previous)
+            close_backends()  # воркеры pandoc и их скрипты не переживают пакет
+        _prune_cache(options)
+        return
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,  # флаг отмены и снимок индекса — при запуске процесса
+        initargs=(cancel_token, index),
+    )
+    running = {}  # future -> оценка памяти задачи, МБ
+    try:
+        while scheduler or running:
+            while len(running) < workers:  # задачи подаются по мере освобождения
+                job = scheduler.take(sum(running.values()), len(running))
+                if job is None:
+                    break
+                running[executor.submit(run_job, *job)] = scheduler.memory_mb(job)
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                del running[future]
+                yield future.result()
+        _prune_cache(options)
+    finally:  # при досрочном закрытии генератора отменяем ещё не начатые задачи
+        for future in running:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+from .utils import apply_default_mode
+
+DEDUP_MODES = ("off", "hardlink", "reference")
+
+
+class ImageStore:  # Хранилище изображений по хэшу содержимого, общее для пакета и между запусками.
+
+    def __init__(self, root, mode="hardlink"):
+        self.root = root
+        self.mode = mode
+        self.objects = os.path.join(root, "objects")
+        self.refs = os.path.join(root, "refs")
+        self.digests = []  # хэши изображений, размещённых через это хранилище
+        self.reused = set()  # имена, взятые у ранее записанных документов
+        os.makedirs(self.objects, exist_ok=True)
+        os.makedirs(self.refs, exist_ok=True)
+
+    @classmethod
+    def from_options(
+        cls, options, output_folder
+    ):  # Хранилище в <output>/.docx2md/store или None.
+        mode = options.get("image_dedup") or "off"
+        if mode == "off":
+            return None
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Неизвестный режим дедупликации: {mode}")
+        return cls(os.path.join(output_folder, ".docx2md", "store"), mode)
+
+    def lookup(
+        self, digest, images_folder
+    ):  # Имя уже записанного файла с тем же содержимым или None.
+        if self.mode != "reference":
+            return None
+        try:
+            with open(os.path.join(self.refs, digest), "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except OSError:
+            return None
+        if name and os.path.exists(os.path.join(images_folder, name)):
+            self.reused.add(name)
+            return name
+        return None
+
+    def register(
+        self, digest, name
+    ):  # Запоминает, под каким именем записано содержимое.
+        if self.mode != "reference":
+            return
+        ref_path = os.path.join(self.refs, digest)
+        try:
+            os.remove(ref_path)  # ссылка на удалённый файл
+        except OSError:
+            pass
+        fd, tmp_path = tempfile.mkstemp(dir=self.refs, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(tmp_path, ref_path)
+
+    def _object(self, src, digest):  # Единственная копия содержимого в objects/.
+        ext = os.path.splitext(src.name)[1].lower()
+        obj_dir = os.path.join(self.objects, digest[:2])
+        obj_path = os.path.join(obj_dir, digest + ext)
+        if not os.path.exists(obj_path):
+            os.makedirs(obj_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=obj_dir, prefix=".tmp-")
+            os.close(fd)
+            src.copy_to(tmp_path)
+            apply_default_mode(tmp_path)  # жёсткие ссылки в images/ делят эти права
+            os.replace(tmp_path, obj_path)
+        return obj_path
+
+    def materialize(
+        self, src, digest, dest_path
+    ):  # Размещение MediaFile: жёсткая ссылка на объект или копия.
+        if self.mode != "hardlink":
+            src.copy_to(dest_path)
+            return
+        obj_path = self._object(src, digest)
+        try:  # уже та же ссылка (своё имя с прошлого запуска) — rename бы не сработал
+            if os.path.samefile(obj_path, dest_path):
+                return
+        except OSError:
+            pass
+        tmp_path = f"{dest_path}.{os.getpid()}.lnk"
+        try:
+            os.link(obj_path, tmp_path)
+            os.replace(
+                tmp_path, dest_path
+            )  # dest_path уже зарезервирован пустым файлом
+        except OSError:  # другая ФС или ФС без жёстких ссылок
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            shutil.copy2(obj_path, dest_path)
@@ -0,0 +1,141 @@
+import os
+import time
+import sqlite3
+
+JOURNAL_NAME = ".docx2md-journal.sqlite"
+PENDING, DONE, FAILED = "pending", "done", "failed"
+
+
+def _stat(path):  # (размер, mtime) или None, если файла нет.
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime)
+
+
+class BatchJournal:  # Журнал пакета в папке результатов: состояние каждого файла в SQLite.
+
+    def __init__(self, output_folder):
+        self.path = os.path.join(output_folder, JOURNAL_NAME)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")  # запись отметки — одна fsync
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " idx INTEGER PRIMARY KEY,"
+            " input TEXT NOT NULL,"
+            " output TEXT NOT NULL,"
+            " size INTEGER,"
+            " mtime REAL,"
+            " state TEXT NOT NULL,"
+            " message TEXT NOT NULL DEFAULT '',"
+            " queued REAL NOT NULL,"
+            " finished REAL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def exists(output_folder):
+        return os.path.exists(os.path.join(output_folder, JOURNAL_NAME))
+
+    def start(self, files, outputs):  # Новый пакет: все файлы в состоянии pending.
+        now = time.time()
+        rows = []
+        for i, (input_path, output_path) in enumerate(zip(files, outputs)):
+            size, mtime = _stat(input_path) or (None, None)
+            rows.append((i, input_path, output_path, size, mtime, PENDING, now))
+        with self._db:
+            self._db.execute("DELETE FROM files")
+            self._db.executemany(
+                "INSERT INTO files (idx, input, output, size, mtime, state, queued)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def entries(self):  # Записи пакета в исходном порядке.
+        cursor = self._db.execute(
+            "SELECT idx, input, output, size, mtime, state, message, queued"
+            " FROM files ORDER BY idx"
+        )
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def unfinished(self):  # Сколько файлов ещё не сконвертировано.
+        return self._db.execute(
+            "SELECT COUNT(*) FROM files WHERE state != ?", (DONE,)
+        ).fetchone()[0]
+
+    def resume_plan(
+        self,
+    ):  # (готовые, к повтору): повтор — всё, что не done или изменилось после.
+
+        done, todo = [], []
+        recovered = []
+        for entry in self.entries():
+            source = _stat(entry["input"])
+            unchanged = source == (entry["size"], entry["mtime"])
+            output = _stat(entry["output"])
+            if entry["state"] == DONE and unchanged and output is not None:
+                done.append(entry)
+                continue
+            if (
+                entry["state"] == PENDING
+                and unchanged
+                and output is not None
+                and output[1] >= entry["queued"]
+            ):  # .md пишется атомарно последним: результат есть, отметки нет
+                recovered.append(entry["idx"])
+                done.append(entry)
+                continue
+            # свой прежний результат при изменившемся DOCX перезаписывается
+            entry["overwrite"] = output is not None and (
+                entry["state"] == DONE or output[1] >= entry["queued"]
+            )
+            todo.append(entry)
+
+        with self._db:
+            if recovered:
+                self._db.executemany(
+                    "UPDATE files SET state = ?, finished = ? WHERE idx = ?",
+                    [(DONE, time.time(), idx) for idx in recovered],
+                )
+            now = time.time()
+            for entry in todo:
+                size, mtime = _stat(entry["input"]) or (None, None)
+                self._db.execute(
+                    "UPDATE files SET state = ?, size = ?, mtime = ?, queued = ?"
+                    " WHERE idx = ?",
+                    (PENDING, size, mtime, now, entry["idx"]),
+                )
+        return done, todo
+
+    def record(self, index, ok, message):  # Итог файла; фиксируется сразу.
+        with self._db:
+            self._db.execute(
+                "UPDATE files SET state = ?, message = ?, finished = ? WHERE idx = ?",
+                (DONE if ok else FAILED, message, time.time(), index),
+            )
+
+    def close(self):
+        self._db.close()
+
+
+def journal_files(output_folder):  # Файлы пакета из журнала папки (пусто без журнала).
+    if not BatchJournal.exists(output_folder):
+        return []
+    journal = BatchJournal(output_folder)
+    try:
+        return [entry["input"] for entry in journal.entries()]
+    finally:
+        journal.close()
+
+
+def unfinished_count(output_folder):  # Незавершённые файлы прошлого пакета в папке.
+    if not BatchJournal.exists(output_folder):
+        return 0
+    journal = BatchJournal(output_folder)
+    try:
+        return journal.unfinished()
+    finally:
+        journal.close()
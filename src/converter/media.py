@@ -0,0 +1,107 @@
+import os
+import shutil
+import hashlib
+import zipfile
+
+MEDIA_MODES = ("direct", "extract")
+
+
+class MediaFile:  # Источник медиафайла: член zip-архива DOCX или файл на диске.
+
+    def __init__(self, name, archive=None, info=None, path=None):
+        self.name = name
+        self._archive = archive
+        self._info = info
+        self.path = path
+
+    @classmethod
+    def from_path(cls, path):
+        return cls(os.path.basename(path), path=path)
+
+    def open(self):  # Бинарный поток содержимого без промежуточных копий.
+        if self.path is not None:
+            return open(self.path, "rb")
+        return self._archive.open(self._info)
+
+    def digest(self, chunk_size=1 << 20):  # SHA-256 содержимого (потоково).
+        h = hashlib.sha256()
+        with self.open() as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def copy_to(self, dest_path):  # Одна потоковая копия в место назначения.
+        with self.open() as src, open(dest_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+
+class MediaIndex:  # Индекс медиафайлов документа в памяти: имя -> MediaFile, без stat на каждую ссылку.
+
+    def __init__(self, scratch_dir=None):
+        self.scratch_dir = scratch_dir  # куда извлекать файлы для wand (EMF)
+        self._files = {}
+        self._archive = None
+
+    @classmethod
+    def from_docx(
+        cls, docx_path, scratch_dir=None
+    ):  # Индекс word/media/* прямо из архива.
+        index = cls(scratch_dir)
+        index._archive = zipfile.ZipFile(docx_path)
+        for info in index._archive.infolist():
+            if info.is_dir() or not info.filename.startswith("word/media/"):
+                continue
+            name = os.path.basename(info.filename)
+            index._files[name] = MediaFile(name, index._archive, info)
+        return index
+
+    @classmethod
+    def from_dir(
+        cls, temp_dir
+    ):  # Индекс файлов, извлечённых pandoc --extract-media (один listdir).
+        index = cls(temp_dir)
+        for folder in (temp_dir, os.path.join(temp_dir, "media")):
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if os.path.isfile(path):
+                    index._files[name] = MediaFile(name, path=path)  # media/ важнее
+        return index
+
+    def names(self):
+        return list(self._files)
+
+    def lookup(self, name):  # MediaFile по имени файла или None.
+        return self._files.get(name)
+
+    def local_path(
+        self, name
+    ):  # Путь на диске; член архива извлекается в scratch_dir один раз.
+        media = self._files[name]
+        if media.path is None:
+            folder = os.path.join(self.scratch_dir, "media")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, name)
+            media.copy_to(path)
+            media.path = path
+        return media.path
+
+    def extract_all(
+        self, temp_dir
+    ):  # Извлечение всех файлов в temp_dir/media (как --extract-media).
+        folder = os.path.join(temp_dir, "media")
+        for media in self._files.values():
+            os.makedirs(folder, exist_ok=True)
+            media.copy_to(os.path.join(folder, media.name))
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,1112 @@
+import re
+import zipfile
+import posixpath
+import unicodedata
+import xml.etree.ElementTree as ET
+from decimal import Decimal, ROUND_HALF_EVEN
+
+# Конвертер простых DOCX без pandoc: document.xml читается потоково
+# (iterparse) и сразу переводится в GFM, байт в байт как у pandoc с
+# PANDOC_ARGS. Поддерживаются абзацы, заголовки, списки, простые таблицы,
+# ссылки и изображения; на всём остальном (формулы, сноски, исправления,
+# объединённые ячейки, поля, блоки управления содержимым...) поднимается
+# Unsupported, и документ уходит в pandoc целиком.
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+WP = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+PIC = "{http://schemas.openxmlformats.org/drawingml/2006/picture}"
+PKG = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+PICTURE_URI = "http://schemas.openxmlformats.org/drawingml/2006/picture"
+MAIN_PART = "word/document.xml"
+
+COLUMNS = 72  # ширина строки pandoc: шире неё таблица пишется без выравнивания
+EMU_PER_INCH = 914400
+MODIFIERS = ("emph", "strong", "strike")  # порядок вложенности у pandoc
+MARKS = {"emph": "*", "strong": "**", "strike": "~~"}
+ALWAYS_ESCAPED = set("*`[]<>|$")
+SPACE = "\0"  # разрывной пробел: повторы схлопываются, на краях строк пропадает
+SKIPPED = {  # метки без текста: закладки, проверка правописания, права
+    W + name
+    for name in (
+        "bookmarkStart",
+        "bookmarkEnd",
+        "proofErr",
+        "permStart",
+        "permEnd",
+        "lastRenderedPageBreak",
+    )
+}
+RUN_PROPERTIES = {  # свойства символов, которые pandoc не переносит в Markdown
+    W + name
+    for name in (
+        "rFonts",
+        "sz",
+        "szCs",
+        "bCs",
+        "iCs",
+        "color",
+        "lang",
+        "kern",
+        "spacing",
+        "w",
+        "position",
+        "noProof",
+        "webHidden",
+        "vanish",
+        "specVanish",
+        "eastAsianLayout",
+        "snapToGrid",
+        "shd",
+        "fitText",
+        "em",
+    )
+}
+PARAGRAPH_PROPERTIES = {  # свойства абзаца, не влияющие на вывод pandoc
+    W + name
+    for name in (
+        "pStyle",
+        "numPr",
+        "ind",
+        "jc",
+        "rPr",
+        "spacing",
+        "keepNext",
+        "keepLines",
+        "widowControl",
+        "contextualSpacing",
+        "tabs",
+        "sectPr",
+        "pageBreakBefore",
+        "shd",
+        "pBdr",
+        "suppressAutoHyphens",
+        "suppressLineNumbers",
+        "textAlignment",
+        "snapToGrid",
+        "autoSpaceDE",
+        "autoSpaceDN",
+        "adjustRightInd",
+        "wordWrap",
+        "overflowPunct",
+        "kinsoku",
+        "topLinePunct",
+        "mirrorIndents",
+        "cnfStyle",
+        "divId",
+    )
+}
+SPECIAL_STYLES = {  # абзацы, которые pandoc переводит не в обычный текст
+    "title",
+    "subtitle",
+    "author",
+    "date",
+    "abstract",
+    "quote",
+    "intense quote",
+    "block text",
+    "source code",
+    "sourcecode",
+    "definition",
+    "definition term",
+    "caption",
+    "table caption",
+    "image caption",
+    "bibliography",
+}
+ALIGNMENTS = {"left": "left", "both": "left", "center": "center", "right": "right"}
+ROMAN = "M*(?:CM)?D?(?:CD)?C*(?:XC)?L?(?:XL)?X*(?:IX)?V?(?:IV)?I*"
+AUTOLINK_URL = re.compile(r"(?:https?|ftp):[A-Za-z0-9\-._~:/?#@!$&'()*+,;=%]+")
+AUTOLINK_MAIL = re.compile(r"[A-Za-z0-9.!#$%&'*+/=?^_{}~-]+@[A-Za-z0-9.-]+")
+
+
+class Unsupported(Exception):  # Конструкция, которую правильно переведёт только pandoc.
+    pass
+
+
+def _on(el, default=True):  # Значение w:val у переключателей вроде <w:b/>.
+    if el is None:
+        return False
+    value = el.get(W + "val")
+    if value is None:
+        return default
+    return value not in ("0", "false", "off", "none")
+
+
+def _int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _read_xml(archive, name):  # Корень XML части пакета или None.
+    try:
+        return ET.fromstring(archive.read(name))
+    except KeyError:
+        return None
+
+
+def _relationships(archive, part):  # Id -> (тип, цель, внешняя ли) для части пакета.
+    folder, name = posixpath.split(part)
+    root = _read_xml(archive, posixpath.join(folder, "_rels", name + ".rels"))
+    rels = {}
+    if root is not None:
+        for rel in root.iter(PKG + "Relationship"):
+            rels[rel.get("Id")] = (
+                rel.get("Type", "").rsplit("/", 1)[-1],
+                rel.get("Target", ""),
+                rel.get("TargetMode") == "External",
+            )
+    return rels
+
+
+class Styles:  # Стили из styles.xml: pandoc смотрит на имена и цепочку basedOn.
+
+    def __init__(self, root):
+        self._styles = {}
+        self.default_paragraph = None
+        if root is not None:
+            for style in root.iter(W + "style"):
+                self._styles[style.get(W + "styleId")] = style
+                if style.get(W + "type") == "paragraph" and style.get(
+                    W + "default"
+                ) in ("1", "true"):
+                    self.default_paragraph = style.get(W + "styleId")
+        self._paragraphs = {}
+        self._runs = {}
+
+    def _chain(self, style_id):  # Стиль и его родители по basedOn.
+        chain = []
+        while style_id in self._styles and len(chain) < 20:
+            style = self._styles[style_id]
+            if style in chain:
+                break
+            chain.append(style)
+            based = style.find(W + "basedOn")
+            style_id = based.get(W + "val") if based is not None else None
+        return chain
+
+    @staticmethod
+    def _name(style):
+        name = style.find(W + "name")
+        return (name.get(W + "val", "") if name is not None else "").lower()
+
+    def paragraph(
+        self, style_id
+    ):  # (уровень заголовка или 0, отступ w:ind из стиля или None).
+        style_id = style_id or self.default_paragraph
+        if style_id not in self._paragraphs:
+            self._paragraphs[style_id] = self._paragraph(style_id)
+        info = self._paragraphs[style_id]
+        if info is None:
+            raise Unsupported(f"стиль абзаца {style_id}")
+        return info
+
+    def _paragraph(self, style_id):
+        level = 0
+        ind = None
+        for style in self._chain(style_id):
+            name = self._name(style)
+            if name in SPECIAL_STYLES:
+                return None
+            match = re.fullmatch(r"heading (\d+)", name)
+            if match and not level:
+                level = int(match.group(1))
+            ppr = style.find(W + "pPr")
+            if ppr is not None:
+                if (
+                    ppr.find(W + "numPr") is not None
+                    or ppr.find(W + "framePr") is not None
+                ):
+                    return None
+                if ind is None:
+                    ind = ppr.find(W + "ind")
+        return level, ind
+
+    def run_properties(
+        self, style_id
+    ):  # Свойства символьного стиля: модификаторы и особые имена.
+        if style_id not in self._runs:
+            props = {"code": False, "hyperlink": False}
+            for style in reversed(self._chain(style_id)):  # ближний стиль важнее
+                name = self._name(style)
+                if name == "verbatim char":
+                    props["code"] = True
+                if name == "hyperlink":
+                    props["hyperlink"] = True
+                rpr = style.find(W + "rPr")
+                if rpr is not None:
+                    props.update(_run_modifiers(rpr))
+            self._runs[style_id] = props
+        return self._runs[style_id]
+
+
+def _indented(ind):  # Отступ слева без выступа: pandoc делает из абзаца цитату.
+    if ind is None:
+        return False
+    left = _int(ind.get(W + "left", ind.get(W + "start")))
+    return left - _int(ind.get(W + "hanging")) > 0
+
+
+def _run_modifiers(rpr):  # Курсив, жирный и зачёркнутый из rPr; прочее — Unsupported.
+    props = {}
+    for child in rpr:
+        tag = child.tag
+        if tag == W + "i":
+            props["emph"] = _on(child)
+        elif tag == W + "b":
+            props["strong"] = _on(child)
+        elif tag == W + "strike":
+            props["strike"] = _on(child)
+        elif tag == W + "u":
+            props["underline"] = child.get(W + "val", "single") != "none"
+        elif tag == W + "vertAlign":
+            props["script"] = child.get(W + "val") not in (None, "baseline")
+        elif tag in (W + "smallCaps", W + "caps", W + "dstrike"):
+            props["other"] = _on(child)
+        elif tag == W + "highlight":
+            props["highlight"] = child.get(W + "val", "none") != "none"
+        elif tag in (W + "rtl", W + "cs"):  # span dir="rtl", жирный и курсив из bCs/iCs
+            props["complex"] = _on(child)
+        elif tag == W + "rStyle" or tag in RUN_PROPERTIES or not tag.startswith(W):
+            continue
+        else:
+            raise Unsupported(tag)
+    return props
+
+
+class Numbering:  # Уровни списков из numbering.xml.
+
+    def __init__(self, root):
+        self._levels = {}  # numId -> {ilvl: (формат, текст уровня, начало)}
+        if root is None:
+            return
+        abstract = {}
+        for node in root.iter(W + "abstractNum"):
+            if node.find(W + "numStyleLink") is not None:
+                continue  # уровни берутся из стиля — только pandoc
+            levels = {}
+            for lvl in node.iter(W + "lvl"):
+                fmt = lvl.find(W + "numFmt")
+                text = lvl.find(W + "lvlText")
+                start = lvl.find(W + "start")
+                levels[_int(lvl.get(W + "ilvl"))] = (
+                    fmt.get(W + "val") if fmt is not None else None,
+                    text.get(W + "val") if text is not None else None,
+                    _int(start.get(W + "val"), 1) if start is not None else 1,
+                )
+            abstract[node.get(W + "abstractNumId")] = levels
+        for num in root.iter(W + "num"):
+            ref = num.find(W + "abstractNumId")
+            if num.find(W + "lvlOverride") is not None or ref is None:
+                continue
+            levels = abstract.get(ref.get(W + "val"))
+            if levels is not None:
+                self._levels[num.get(W + "numId")] = levels
+
+    def level(self, num_id, ilvl):  # (маркированный ли, разделитель, начало).
+        level = self._levels.get(num_id, {}).get(ilvl)
+        if level is None:
+            raise Unsupported(f"список {num_id}/{ilvl}")
+        fmt, text, start = level
+        if fmt == "bullet":
+            return True, None, start
+        if fmt not in (
+            "decimal",
+            "lowerLetter",
+            "upperLetter",
+            "lowerRoman",
+            "upperRoman",
+        ):
+            raise Unsupported(f"нумерация {fmt}")
+        delim = re.sub(r"%\d", "", text or "")
+        if delim not in (".", ")"):
+            raise Unsupported(f"нумерация {text}")
+        return False, delim, start
+
+
+# Строчные элементы — кортежи, как узлы AST pandoc:
+# ("str", текст), ("space",), ("br",), ("code", текст),
+# ("img", src, title, alt, ширина, высота), (модификатор, [дети]),
+# где модификатор — "emph", "strong", "strike" или ("link", url).
+
+
+def _is_mod(node):  # Ссылка тоже модификатор, но общей двум соседям не бывает.
+    return node[0] in MODIFIERS or _is_link(node)
+
+
+def _link(url, groups):  # Содержимое склеенных ссылок pandoc не объединяет.
+    ils = []
+    for parts in groups:
+        ils = _concat(ils, _smush(parts))
+    if not ils or any(node[0] in ("img", "br") for node in ils):
+        raise Unsupported("ссылка без текста")
+    return [(("link", url), ils)]
+
+
+def _concat(xs, ys):  # Склейка последовательностей как Builder (<>) у pandoc.
+    if not xs:
+        return list(ys)
+    if not ys:
+        return list(xs)
+    x, y = xs[-1], ys[0]
+    kinds = (x[0], y[0])
+    if kinds == ("space", "space") or kinds == ("space", "br"):
+        meld = [y]
+    elif kinds == ("br", "space"):
+        meld = [x]
+    elif kinds == ("str", "str"):
+        meld = [("str", x[1] + y[1])]
+    elif x[0] == y[0] and x[0] in MODIFIERS:
+        meld = [(x[0], _concat(x[1], y[1]))]
+    else:
+        meld = [x, y]
+    return xs[:-1] + meld + ys[1:]
+
+
+def _unstack(ils):  # (модификаторы снаружи внутрь, содержимое) одиночного элемента.
+    mods = []
+    while len(ils) == 1 and _is_mod(ils[0]):
+        mods.append(ils[0][0])
+        ils = ils[0][1]
+    return mods, ils
+
+
+def _stack(mods, ils):  # Обёртка модификаторами; пустое содержимое не оборачивается.
+    for mod in reversed(mods):
+        if ils:
+            ils = [(mod, ils)]
+    return ils
+
+
+def _trim(ils, kinds=("space",)):
+    start, end = 0, len(ils)
+    while start < end and ils[start][0] in kinds:
+        start += 1
+    while end > start and ils[end - 1][0] in kinds:
+        end -= 1
+    return ils[start:end]
+
+
+def _space_out_left(ils):  # Пробел с левого края выделения выносится наружу.
+    mods, inner = _unstack(ils)
+    if inner and inner[0][0] == "space":
+        return [("space",)], _stack(mods, inner[1:])
+    return [], ils
+
+
+def _space_out_right(ils):
+    mods, inner = _unstack(ils)
+    if inner and inner[-1][0] == "space":
+        return _stack(mods, inner[:-1]), [("space",)]
+    return ils, []
+
+
+def _combine_single(x, y):  # combineSingletonInlines из pandoc (Docx/Combine.hs).
+    xfs, xs = _unstack(x)
+    yfs, ys = _unstack(y)
+    shared = [f for f in xfs if f in yfs and f in MODIFIERS]
+    if shared:
+        return _stack(
+            shared,
+            _combine(
+                _stack([f for f in xfs if f not in shared], xs),
+                _stack([f for f in yfs if f not in shared], ys),
+            ),
+        )
+    if not xs and not ys:
+        return []
+    if not xs:
+        space, rest = _space_out_left(y)
+        return _concat(space, rest)
+    if not ys:
+        rest, space = _space_out_right(x)
+        return _concat(rest, space)
+    x2, xsp = _space_out_right(x)
+    ysp, y2 = _space_out_left(y)
+    return _concat(_concat(_concat(x2, xsp), ysp), y2)
+
+
+def _combine(x, y):
+    return _concat(_concat(x[:-1], _combine_single(x[-1:], y[:1])), y[1:])
+
+
+def _smush(parts):  # smushInlines: последовательное объединение частей абзаца.
+    result = []
+    for part in parts:
+        result = _combine(result, part)
+    return _combine(result, [])
+
+
+def _text(text):  # Str/Space, как B.text.
+    if "\n" in text or "\r" in text:
+        raise Unsupported("перевод строки в тексте")
+    result = []
+    for word in re.split(r"([ \t]+)", text):
+        if not word:
+            continue
+        result = _concat(result, [("space",)] if word[0] in " \t" else [("str", word)])
+    return result
+
+
+def _inch(emu):  # Размер в дюймах, как showFl у pandoc (5 знаков, без хвостовых нулей).
+    value = Decimal(repr(emu / EMU_PER_INCH)).quantize(
+        Decimal("0.00001"), rounding=ROUND_HALF_EVEN
+    )
+    text = format(value, "f").rstrip("0")
+    return text[:-1] if text.endswith(".") else text
+
+
+def _escape_attr(text):
+    return (
+        text.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+    )
+
+
+def _ordered_marker(word):  # Начинается ли абзац со слова, похожего на номер пункта.
+    head = word[:10]
+    parens = head.startswith("(")
+    match = re.match(
+        r"([0-9]+|#|@[\w-]*|[A-Za-z]+)([.)])", head[1:] if parens else head
+    )
+    if not match or (parens and match.group(2) != ")"):
+        return False
+    if match.end() + parens != len(head):
+        return False  # после маркера должен идти пробел или конец
+    token, delim = match.groups()
+    period = delim == "." and not parens
+    if token[0] in "#@" or token.isdigit():
+        return True
+    if len(token) == 1 and token.islower() or token == "i":
+        return True
+    if len(token) == 1:  # одна заглавная буква: с точкой нужно два пробела
+        return not period
+    if token.islower():
+        return re.fullmatch(ROMAN.lower(), token) is not None
+    if token.isupper():
+        return re.fullmatch(ROMAN, token) is not None
+    return False
+
+
+class Converter:  # Один проход по document.xml: блоки -> GFM, ссылки в конце.
+
+    def __init__(self, archive):
+        self.archive = archive
+        root_rels = _relationships(archive, "")
+        main = [
+            target.lstrip("/")
+            for kind, target, _ in root_rels.values()
+            if kind == "officeDocument"
+        ]
+        if main != [MAIN_PART]:
+            raise Unsupported("основная часть пакета")
+        self.rels = _relationships(archive, MAIN_PART)
+        self.styles = Styles(_read_xml(archive, "word/styles.xml"))
+        self.numbering = Numbering(_read_xml(archive, "word/numbering.xml"))
+        self.list_state = {}  # (numId, ilvl) -> последний номер
+        self.refs = []  # [метка, url] в порядке появления
+        self.last_number = 0  # последняя числовая метка ссылки
+
+    def convert(self):  # Весь документ в GFM.
+        blocks = []
+        depth = 0
+        body = None
+        with self.archive.open(MAIN_PART) as stream:
+            for event, el in ET.iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and el.tag == W + "body":
+                        body = el
+                    continue
+                depth -= 1
+                if depth != 2 or body is None:
+                    continue
+                if el.tag == W + "p":
+                    block = self.paragraph(el)
+                    if block is not None:
+                        blocks.append(block)
+                elif el.tag == W + "tbl":
+                    blocks.append(self.table(el))
+                elif el.tag != W + "sectPr" and el.tag not in SKIPPED:
+                    raise Unsupported(el.tag)
+                body.clear()  # разобранные блоки больше не нужны
+        if body is None or not blocks:
+            raise Unsupported("нет текста")
+        text = self.render_blocks(self.group_lists(blocks)) + "\n"
+        if self.refs:
+            text += "\n" + "".join(f"  [{label}]: {url}\n" for label, url in self.refs)
+        return text
+
+    # --- разбор ---
+
+    def paragraph(self, p, in_table=False):  # Блок абзаца или None для пустого.
+        ppr = p.find(W + "pPr")
+        style_id = None
+        num = None
+        if ppr is not None:
+            for child in ppr:
+                if child.tag not in PARAGRAPH_PROPERTIES and child.tag.startswith(W):
+                    raise Unsupported(child.tag)
+            style = ppr.find(W + "pStyle")
+            style_id = style.get(W + "val") if style is not None else None
+            num_pr = ppr.find(W + "numPr")
+            if num_pr is not None:
+                num_id = num_pr.find(W + "numId")
+                ilvl = num_pr.find(W + "ilvl")
+                num_id = num_id.get(W + "val") if num_id is not None else None
+                if num_id not in (None, "0"):
+                    num = (num_id, _int(ilvl.get(W + "val")) if ilvl is not None else 0)
+            rpr = ppr.find(W + "rPr")
+            if rpr is not None:
+                for tag in ("ins", "del", "moveFrom", "moveTo", "rPrChange"):
+                    if rpr.find(W + tag) is not None:
+                        raise Unsupported(tag)
+        level, ind = self.styles.paragraph(style_id)
+        if ppr is not None and ppr.find(W + "ind") is not None:
+            ind = ppr.find(W + "ind")
+        if num is None and _indented(ind):  # pandoc сделает из абзаца цитату
+            raise Unsupported("отступ абзаца")
+
+        parts = []
+        link = None  # соседние ссылки на один адрес pandoc склеивает
+        for child in p:
+            if child.tag == W + "hyperlink":
+                url, runs = self.hyperlink(child)
+                if link is not None and link[0] == url:
+                    link[1].append(runs)
+                else:
+                    link = (url, [runs])
+                    parts.append(link)
+                continue
+            link = None
+            if child.tag == W + "r":
+                parts.append(self.run(child))
+            elif child.tag != W + "pPr" and child.tag not in SKIPPED:
+                raise Unsupported(child.tag)
+        ils = _smush([_link(*part) if type(part) is tuple else part for part in parts])
+        if level and not num:  # заголовок pandoc не обрезает
+            if in_table or not ils or ils[0][0] == "space":
+                raise Unsupported("особый заголовок")
+            if any(node[0] == "br" for node in ils):
+                raise Unsupported("перенос строки в заголовке")
+            return ("header", level, ils)
+        ils = _trim(ils, ("space", "br"))
+
+        if num is not None:
+            if level or in_table or not ils:
+                raise Unsupported("особый пункт списка")
+            bullet, delim, start = self.numbering.level(*num)
+            key = (num[0], num[1])
+            number = self.list_state[key] + 1 if key in self.list_state else start
+            self.list_state = {
+                k: v for k, v in self.list_state.items() if k[1] <= num[1]
+            }
+            self.list_state[key] = number
+            return ("item", num[0], num[1], bullet, delim, number, ils)
+        if not ils:
+            return None
+        return ("para", ils, ppr)
+
+    def run(self, r, in_link=False):  # Строчные элементы одного фрагмента текста.
+        props = {}
+        rpr = r.find(W + "rPr")
+        if rpr is not None:
+            style = rpr.find(W + "rStyle")
+            if style is not None:
+                props.update(self.styles.run_properties(style.get(W + "val")))
+            if rpr.find(W + "rPrChange") is not None:
+                raise Unsupported("rPrChange")
+            props.update(_run_modifiers(rpr))
+        if props.get("hyperlink") and in_link:
+            props.pop("underline", None)  # подчёркивание стиля ссылки pandoc не видит
+        if any(
+            props.get(key)
+            for key in ("underline", "script", "other", "highlight", "complex")
+        ):
+            raise Unsupported("оформление символов")
+
+        parts = []
+        for child in r:
+            tag = child.tag
+            if tag == W + "t":
+                parts.append(_text(child.text or ""))
+            elif tag == W + "tab":
+                parts.append([("space",)])
+            elif tag == W + "br":
+                parts.append([("br",)])
+            elif tag == W + "noBreakHyphen":
+                parts.append([("str", "‑")])
+            elif tag == W + "softHyphen":
+                parts.append([("str", "­")])
+            elif tag == W + "drawing":
+                parts.append([self.image(child)])
+            elif tag != W + "rPr" and tag not in SKIPPED:
+                raise Unsupported(tag)
+        ils = _smush(parts)
+        mods = [mod for mod in MODIFIERS if props.get(mod)]
+        if props.get("code"):
+            text = "".join(node[1] if node[0] == "str" else " " for node in ils)
+            if mods or any(node[0] not in ("str", "space") for node in ils):
+                raise Unsupported("код с оформлением")
+            return [("code", text)] if text else []
+        for mod in reversed(mods):  # как B.strong: пустое содержимое тоже оборачивается
+            ils = [(mod, ils)]
+        return ils
+
+    def hyperlink(self, link):  # (url, строчные элементы фрагментов).
+        if link.get(W + "anchor") is not None:
+            raise Unsupported("внутренняя ссылка")
+        rel = self.rels.get(link.get(R + "id"))
+        if rel is None or rel[0] != "hyperlink" or not rel[2]:
+            raise Unsupported("ссылка")
+        parts = []
+        for child in link:
+            if child.tag == W + "r":
+                parts.append(self.run(child, in_link=True))
+            elif child.tag not in SKIPPED:
+                raise Unsupported(child.tag)
+        return rel[1], parts
+
+    def image(self, drawing):  # Узел изображения из w:drawing с одной картинкой.
+        if len(drawing) != 1 or drawing[0].tag not in (WP + "inline", WP + "anchor"):
+            raise Unsupported("рисунок")
+        frame = drawing[0]
+        extent = frame.find(WP + "extent")
+        doc_pr = frame.find(WP + "docPr")
+        data = frame.find(A + "graphic/" + A + "graphicData")
+        if extent is None or doc_pr is None or data is None:
+            raise Unsupported("рисунок")
+        if data.get("uri") != PICTURE_URI:
+            raise Unsupported("рисунок")
+        blip = data.find(PIC + "pic/" + PIC + "blipFill/" + A + "blip")
+        if blip is None or blip.get(R + "link") is not None:
+            raise Unsupported("рисунок")
+        if any(el.tag.endswith("svgBlip") for el in blip.iter()):
+            raise Unsupported("SVG")
+        rel = self.rels.get(blip.get(R + "embed"))
+        if rel is None or rel[0] != "image" or rel[2]:
+            raise Unsupported("рисунок")
+        target = rel[1]
+        if not target.startswith("media/") or "/" in target[6:]:
+            raise Unsupported("рисунок вне word/media")
+        width = _inch(_int(extent.get("cx")))
+        height = _inch(_int(extent.get("cy")))
+        if width == "0" or height == "0":
+            raise Unsupported("рисунок без размера")
+        alt = " ".join(
+            re.split(r"[ \t\r\n]+", doc_pr.get("descr", "").strip(" \t\r\n"))
+        )
+        return ("img", target, doc_pr.get("title", ""), alt, width, height)
+
+    def table(self, tbl):  # Простая таблица: одна строка заголовка, без объединений.
+        rows = []
+        header = False
+        look = None
+        for child in tbl:
+            if child.tag == W + "tblPr":
+                if child.find(W + "tblCaption") is not None:
+                    raise Unsupported("подпись таблицы")
+                look = child.find(W + "tblLook")
+            elif child.tag == W + "tr":
+                rows.append(self.table_row(child))
+            elif child.tag != W + "tblGrid" and child.tag not in SKIPPED:
+                raise Unsupported(child.tag)
+        if not rows or any(len(cells) != len(rows[0][1]) for _, cells in rows):
+            raise Unsupported("неровная таблица")
+        if look is not None:
+            first_row = look.get(W + "firstRow")
+            if first_row is not None:
+                header = first_row in ("1", "true", "on")
+            else:
+                header = bool(int(look.get(W + "val", "0"), 16) & 0x20)
+        header = header or rows[0][0]
+        if len(rows) > 1 and rows[1][0] and header:
+            raise Unsupported("несколько строк заголовка")
+        if not header and rows[0][0]:
+            header = True
+        head = [cell for cell, _ in rows[0][1]] if header else None
+        body = rows[1:] if header else rows
+        aligns = [align for _, align in body[0][1]] if body else None
+        return (
+            "table",
+            head,
+            [[cell for cell, _ in cells] for _, cells in body],
+            aligns,
+        )
+
+    def table_row(
+        self, tr
+    ):  # (строка заголовка?, [(содержимое ячейки, выравнивание)]).
+        cells = []
+        is_header = False
+        for child in tr:
+            if child.tag == W + "trPr":
+                for prop in child:
+                    if prop.tag in (W + "gridBefore", W + "gridAfter"):
+                        raise Unsupported("сдвиг строки")
+                is_header = _on(child.find(W + "tblHeader"))
+            elif child.tag == W + "tc":
+                cells.append(self.table_cell(child))
+            elif child.tag != W + "tblPrEx" and child.tag not in SKIPPED:
+                raise Unsupported(child.tag)
+        return is_header, cells
+
+    def table_cell(self, tc):
+        blocks = []
+        first_ppr = None
+        first = True
+        for child in tc:
+            if child.tag == W + "tcPr":
+                span = child.find(W + "gridSpan")
+                if span is not None and _int(span.get(W + "val"), 1) > 1:
+                    raise Unsupported("объединённые ячейки")
+                if (
+                    child.find(W + "vMerge") is not None
+                    or child.find(W + "hMerge") is not None
+                ):
+                    raise Unsupported("объединённые ячейки")
+            elif child.tag == W + "p":
+                if first:
+                    first_ppr = child.find(W + "pPr")
+                    first = False
+                block = self.paragraph(child, in_table=True)
+                if block is not None:
+                    blocks.append(block)
+            elif child.tag not in SKIPPED:
+                raise Unsupported(child.tag)
+        if len(blocks) > 1:
+            raise Unsupported("несколько абзацев в ячейке")
+        ils = blocks[0][1] if blocks else []
+        if any(node[0] == "br" for node in ils):
+            raise Unsupported("перенос строки в ячейке")
+        jc = first_ppr.find(W + "jc") if first_ppr is not None else None
+        align = ALIGNMENTS.get(jc.get(W + "val")) if jc is not None else None
+        return ils, align
+
+    def group_lists(
+        self, blocks, level=-1
+    ):  # Пункты -> вложенные списки (flatToBullets).
+        result = []
+        i = 0
+        while i < len(blocks):
+            block = blocks[i]
+            block_level = block[2] if block[0] == "item" else -1
+            if block_level == level:
+                result.append(block)
+                i += 1
+                continue
+            j = i + 1
+            while j < len(blocks) and blocks[j][0] == "item":
+                other = blocks[j]
+                if other[2] > block_level or (
+                    other[2] == block_level and other[1] == block[1]
+                ):
+                    j += 1
+                else:
+                    break
+            items = []
+            for child in self.group_lists(blocks[i:j], block_level):
+                if child[0] == "item":
+                    items.append([("para", child[6], None)])
+                elif items:
+                    items[-1].append(child)
+                else:
+                    raise Unsupported("пропуск уровня списка")
+            _, _, _, bullet, delim, number, _ = block
+            if bullet:
+                result.append(("bullet", items))
+            else:
+                result.append(("ordered", number, delim, items))
+            i = j
+        return result
+
+    # --- вывод ---
+
+    def render_blocks(self, blocks):
+        out = []
+        previous = None
+        for block in blocks:
+            if (
+                previous is not None
+                and previous in ("bullet", "ordered")
+                and previous == block[0]
+            ):
+                out.append("<!-- -->")
+            out.append(self.render_block(block))
+            previous = block[0]
+        return "\n\n".join(out)
+
+    def render_block(self, block):
+        kind = block[0]
+        if kind == "para":
+            return self.render_plain(block[1])
+        if kind == "header":
+            if _edge_spaces(block[2]):
+                raise Unsupported("пробел на краю выделения в заголовке")
+            text = self.render_inlines(block[2])  # без переноса: пробелы остаются
+            return "#" * block[1] + " " + re.sub(SPACE + "+", " ", text)
+        if kind == "table":
+            return self.render_table(*block[1:])
+        if kind == "bullet":
+            return "\n\n".join(
+                _item("- ", self.render_blocks(item)) for item in block[1]
+            )
+        _, start, delim, items = block
+        return "\n\n".join(
+            _item(f"{start + n}{delim}".ljust(3) + " ", self.render_blocks(item))
+            for n, item in enumerate(items)
+        )
+
+    def render_plain(
+        self, ils, strip=True
+    ):  # Абзац: экранирование маркеров списка в начале.
+        first = ils[0]
+        text = None
+        if first[0] == "str":
+            rest = ils[1:]
+            if first[1] in ("+", "-"):
+                text = "\\" + self.render_inlines(ils)
+            elif (not rest or rest[0][0] == "space") and _ordered_marker(first[1]):
+                marker = re.sub(r"([.()])", r"\\\1", first[1])
+                text = marker + self.render_inlines(rest)
+        return _layout(text if text is not None else self.render_inlines(ils), strip)
+
+    def render_inlines(self, ils):
+        ils = _spaces_outside(ils)
+        out = []
+        for k, node in enumerate(ils):
+            kind = node[0]
+            following = ils[k + 1] if k + 1 < len(ils) else None
+            if kind == "str":
+                text = _escape(node[1])
+                if (
+                    following is not None
+                    and _is_link(following)
+                    and node[1].endswith("!")
+                ):
+                    text = text[:-1] + "\\!"
+                out.append(text)
+            elif kind == "space":
+                out.append(SPACE)
+            elif kind == "br":
+                out.append("\\\n")
+            elif kind == "code":
+                if "`" in node[1] or node[1][:1] == " " or node[1][-1:] == " ":
+                    raise Unsupported("код")
+                out.append(f"`{node[1]}`")
+            elif kind == "img":
+                out.append(_img(node))
+            elif kind in MODIFIERS:
+                mark = MARKS[kind]
+                out.append(mark + self.render_inlines(node[1]) + mark)
+            else:
+                out.append(self.render_link(node, ils[k + 1 :]))
+        return "".join(out)
+
+    def render_link(
+        self, node, rest
+    ):  # Автоссылка или ссылка-сноска в конце документа.
+        url = node[0][1]
+        children = node[1]
+        if len(children) == 1 and children[0][0] == "str":
+            text = children[0][1]
+            suffix = url[7:] if url.startswith("mailto:") else url
+            if text == suffix:
+                if AUTOLINK_URL.fullmatch(url) or (
+                    url.startswith("mailto:") and AUTOLINK_MAIL.fullmatch(suffix)
+                ):
+                    return f"<{text}>"
+                raise Unsupported("автоссылка")
+        text = self.render_inlines(children)  # в строке пробелы по краям остаются
+        label = _layout(text)
+        ref = None
+        for ref_label, ref_url in self.refs:
+            if ref_url == url:
+                ref = ref_label
+                break
+        if ref is None:
+            ref = label
+            keys = {_key(ref_label) for ref_label, _ in self.refs}
+            if _key(label) in keys or not label or "[" in label or "]" in label:
+                self.last_number += 1
+                ref = str(self.last_number)
+            self.refs.append((ref, url))
+        if ref != label:
+            return f"[{text}][{ref}]"
+        if _unshortcutable(rest):
+            return f"[{text}][]"
+        return f"[{text}]"
+
+    def render_table(self, head, rows, aligns):  # Pipe-таблица с выравниванием pandoc.
+        columns = len(rows[0]) if rows else len(head)
+        aligns = aligns or [None] * columns
+        cells = (head or []) + [cell for row in rows for cell in row]
+        if any(_edge_spaces(cell) for cell in cells):
+            raise Unsupported("пробел на краю выделения в таблице")
+        render = lambda ils: self.render_plain(ils, strip=False) if ils else ""
+        head_text = [render(cell) for cell in head] if head else [""] * columns
+        body_text = [[render(cell) for cell in row] for row in rows]
+        widths = [
+            max([3, _width(head_text[c])] + [_width(row[c]) for row in body_text])
+            for c in range(columns)
+        ]
+        lines = []
+        if sum(widths) > COLUMNS:  # pandoc пишет таблицу без выравнивания пробелами
+            render = lambda ils: self.render_plain(ils) if ils else ""
+            head_text = [render(cell) for cell in head] if head else [""] * columns
+            body_text = [[render(cell) for cell in row] for row in rows]
+            for row in [head_text] + body_text:
+                lines.append("| " + " | ".join(row) + " |")
+            compact = {"left": ":---", "center": ":--:", "right": "---:", None: "----"}
+            lines.insert(1, "|" + "".join(compact[a] + "|" for a in aligns))
+            return "\n".join(lines)
+        for row in [head_text] + body_text:
+            lines.append(
+                "|"
+                + "".join(
+                    f" {_pad(text, widths[c], aligns[c])} |"
+                    for c, text in enumerate(row)
+                )
+            )
+        border = []
+        for width, align in zip(widths, aligns):
+            if align == "left":
+                border.append(":" + "-" * (width + 1))
+            elif align == "center":
+                border.append(":" + "-" * width + ":")
+            elif align == "right":
+                border.append("-" * (width + 1) + ":")
+            else:
+                border.append("-" * (width + 2))
+        lines.insert(1, "|" + "|".join(border) + "|")
+        return "\n".join(lines)
+
+
+def _escape(text):  # Экранирование Str, как у писателя gfm в pandoc.
+    out = []
+    last = len(text) - 1
+    k = 0
+    while k <= last:
+        c = text[k]
+        following = text[k + 1] if k < last else ""
+        if c == "!" and following == "[":  # не изображение; сама скобка уже не нужна
+            out.append("\\![")
+            k += 1
+        elif c in ALWAYS_ESCAPED:
+            out.append("\\" + c)
+        elif c == "_":
+            if k and text[k - 1].isalnum() and following.isalnum():
+                out.append(c)
+            else:
+                out.append("\\_")
+        elif (c == "#" and k == 0) or (c == "~" and following == "~"):
+            out.append("\\" + c)
+        elif c == "\\":
+            raise Unsupported("обратная косая черта")
+        else:
+            out.append(c)
+        k += 1
+    return "".join(out)
+
+
+def _edge_spaces(ils):  # Есть ли выделение, начинающееся или кончающееся пробелом.
+    for node in ils:
+        if node[0] in MODIFIERS or _is_link(node):
+            inner = node[1]
+            if inner and (
+                "space" in (inner[0][0], inner[-1][0]) or _edge_spaces(inner)
+            ):
+                return True
+    return False
+
+
+def _spaces_outside(ils):  # Пробелы с краёв выделения писатель pandoc выносит наружу.
+    result = []
+    for node in ils:
+        if node[0] not in MODIFIERS:
+            result.append(node)
+            continue
+        inner = _spaces_outside(node[1])
+        core = _trim(inner)
+        if inner[:1] == [("space",)]:
+            result.append(("space",))
+        if core:
+            result.append((node[0], core))
+        if inner[-1:] == [("space",)] and core:
+            result.append(("space",))
+    return result
+
+
+def _layout(text, strip=True):  # Разрывные пробелы -> обычные, как в doclayout.
+    text = re.sub(SPACE + "+", SPACE, text)
+    if strip:  # в ячейках таблиц пробелы по краям остаются
+        text = re.sub(SPACE + r"(?=\n|$)|(?<=\n)" + SPACE + "|^" + SPACE, "", text)
+    return text.replace(SPACE, " ")
+
+
+def _is_link(node):
+    return isinstance(node[0], tuple)
+
+
+def _unshortcutable(rest):  # Ссылка, после которой краткая форма [текст] неоднозначна.
+    if not rest:
+        return False
+    head = rest[0]
+    if _is_link(head):
+        return True
+    if head[0] == "str":
+        return head[1][:1] in "[(:"
+    if head[0] in ("space", "br") and len(rest) > 1:
+        return _is_link(rest[1]) or (rest[1][0] == "str" and rest[1][1][:1] == "[")
+    return False
+
+
+def _key(label):  # Ключ ссылки: без учёта регистра и лишних пробелов.
+    return " ".join(label.lower().split())
+
+
+def _img(node):
+    _, src, title, alt, width, height = node
+    attrs = f' title="{_escape_attr(title)}"' if title else ""
+    attrs += f' style="width:{width}in;height:{height}in"'
+    if alt:
+        attrs += f' alt="{_escape_attr(alt)}"'
+    return f'<img src="{src}"{attrs} />'
+
+
+def _width(text):  # Ширина строки на экране: широкие восточноазиатские символы — 2.
+    return sum(
+        (
+            2
+            if unicodedata.east_asian_width(c) in "WF"
+            else 0 if unicodedata.combining(c) else 1
+        )
+        for c in text
+    )
+
+
+def _pad(text, width, align):
+    gap = width - _width(text)
+    if align == "center":
+        return " " * (gap // 2) + text + " " * (gap - gap // 2)
+    if align == "right":
+        return " " * gap + text
+    return text + " " * gap
+
+
+def _item(marker, text):  # Пункт списка: продолжение с отступом по ширине маркера.
+    indent = " " * len(marker)
+    lines = text.split("\n")
+    return marker + "\n".join(
+        [lines[0]] + [indent + line if line else "" for line in lines[1:]]
+    )
+
+
+def convert(input_path):  # DOCX -> GFM без pandoc; Unsupported для сложных документов.
+    with zipfile.ZipFile(input_path) as archive:
+        return Converter(archive).convert()
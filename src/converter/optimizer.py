@@ -0,0 +1,150 @@
+import os
+import warnings
+from .utils import file_digest
+from .rasterizer import pool_executor, image_workers, cache_subdir
+from . import cancel
+
+OPTIMIZED_EXTENSIONS = (".png", ".jpg", ".jpeg")  # GIF может быть анимирован
+DEFAULT_JPEG_QUALITY = 85
+
+
+def _optimize(
+    src_path, dest_path, settings
+):  # Задача пула: сжатие одного файла; False — результат не меньше исходного.
+    cancel.check()
+    warnings.filterwarnings("ignore", category=UserWarning, module="wand.*")
+    from wand.image import Image  # импорт при первом сжатии: wand тянет ImageMagick
+
+    ext = os.path.splitext(dest_path)[1]
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp{ext}"
+    resized = False
+    with Image(filename=src_path) as img:
+        limit = settings["max_size"]
+        if limit and max(img.width, img.height) > limit:
+            scale = limit / max(img.width, img.height)
+            img.resize(
+                max(int(round(img.width * scale)), 1),
+                max(int(round(img.height * scale)), 1),
+            )
+            resized = True
+        img.strip()  # EXIF, профили и миниатюры
+        lossless = src_path.lower().endswith(".png")
+        if ext == ".webp":
+            img.format = "webp"
+            if lossless:
+                img.options["webp:lossless"] = "true"
+            else:
+                img.compression_quality = settings["jpeg_quality"]
+        elif lossless:
+            img.format = "png"
+            img.options["png:compression-level"] = "9"
+            img.options["png:compression-filter"] = "5"
+        else:
+            img.format = "jpeg"
+            img.compression_quality = settings["jpeg_quality"]
+        img.save(filename=tmp_path)
+    if not resized and os.path.getsize(tmp_path) >= os.path.getsize(src_path):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, dest_path)  # в кэше не бывает недописанных файлов
+    return True
+
+
+class ImageOptimizer:  # Пакетное сжатие PNG/JPEG с кэшем по хэшу содержимого и настройкам.
+
+    def __init__(
+        self,
+        cache_dir,
+        max_size=None,
+        jpeg_quality=None,
+        webp=False,
+        workers=None,
+        scratch_dir=None,
+    ):
+        self.cache_root = cache_dir
+        self.scratch_dir = scratch_dir  # запасная папка, если кэш недоступен
+        self.cache_dir = None  # создаётся при первом сжатии
+        self.settings = {
+            "max_size": max_size,
+            "jpeg_quality": jpeg_quality or DEFAULT_JPEG_QUALITY,
+        }
+        self.webp = webp
+        self.workers = workers or image_workers()
+        self.stats = []  # {"image", "bytes_in", "bytes_out", "cached"} по каждому файлу
+
+    def _cached_path(self, src_path):  # Путь результата в кэше для этого содержимого.
+        ext = ".webp" if self.webp else os.path.splitext(src_path)[1].lower()
+        tag = f"{self.settings['max_size'] or 0}-q{self.settings['jpeg_quality']}"
+        if self.cache_dir is None:
+            self.cache_dir = cache_subdir(
+                self.cache_root, "optimized", self.scratch_dir
+            )
+        return os.path.join(self.cache_dir, f"{file_digest(src_path)}-{tag}{ext}")
+
+    @staticmethod
+    def _kept_path(cached_path):  # Метка «сжатие не помогло, оставить исходный».
+        return cached_path + ".keep"
+
+    def _result(self, src_path, cached_path, cached):
+        bytes_in = os.path.getsize(src_path)
+        optimized = os.path.exists(cached_path)
+        self.stats.append(
+            {
+                "image": os.path.basename(src_path),
+                "bytes_in": bytes_in,
+                "bytes_out": os.path.getsize(cached_path) if optimized else bytes_in,
+                "cached": cached,
+            }
+        )
+        return cached_path if optimized else None
+
+    def optimize_all(
+        self, paths
+    ):  # {исходный путь: путь сжатой копии}; несжимаемые файлы не входят.
+
+        targets = {src_path: self._cached_path(src_path) for src_path in paths}
+        pending = {}  # путь в кэше -> исходные пути с тем же содержимым
+        for src_path, cached_path in targets.items():
+            if not os.path.exists(cached_path) and not os.path.exists(
+                self._kept_path(cached_path)
+            ):
+                pending.setdefault(cached_path, []).append(src_path)
+
+        if len(pending) <= 1 or self.workers == 1:  # пул ради одного потока не нужен
+            optimized = {
+                cached_path: _optimize(sources[0], cached_path, self.settings)
+                for cached_path, sources in pending.items()
+            }
+        else:
+            with pool_executor(min(self.workers, len(pending))) as executor:
+                futures = {
+                    cached_path: executor.submit(
+                        _optimize, sources[0], cached_path, self.settings
+                    )
+                    for cached_path, sources in pending.items()
+                }
+            optimized = {path: future.result() for path, future in futures.items()}
+        for cached_path, changed in optimized.items():
+            if not changed:
+                open(self._kept_path(cached_path), "w").close()
+
+        result = {}
+        for src_path, cached_path in targets.items():
+            sources = pending.get(cached_path)  # повторы внутри документа — из кэша
+            cached = sources is None or sources[0] != src_path
+            path = self._result(src_path, cached_path, cached)
+            if path is not None:
+                result[src_path] = path
+        return result
+
+
+def savings_summary(stats):  # Итог сжатия по пакету: файлов, байт до и после.
+    bytes_in = sum(s["bytes_in"] for s in stats)
+    bytes_out = sum(s["bytes_out"] for s in stats)
+    return {
+        "images": len(stats),
+        "cached": sum(s["cached"] for s in stats),
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "saved": bytes_in - bytes_out,
+    }
@@ -0,0 +1,128 @@
+import os
+import json
+from .utils import write_atomic
+
+INDEX_NAME = ".docx2md-index.json"  # владельцы имён в images/ между запусками
+
+_index = None  # индекс папки результатов текущего пакета в этом процессе
+
+
+def set_index(index):  # Инициализатор пула: снимок индекса для всего процесса.
+    global _index
+    _index = index
+
+
+def current():
+    return _index
+
+
+def _names(folder):  # Имена файлов папки одним scandir; пустое множество, если её нет.
+    try:
+        with os.scandir(folder) as entries:
+            return {entry.name for entry in entries}
+    except OSError:
+        return set()
+
+
+class OutputIndex:  # Имена в папке результатов: читается один раз на пакет, дальше без stat.
+
+    def __init__(self, output_folder):
+        self.folder = os.path.abspath(output_folder)
+        self.images_folder = os.path.join(self.folder, "images")
+        self.outputs = set()  # имена .md в нижнем регистре
+        self.images = {}  # имя в images/ (нижний регистр) -> .md-владелец или ""
+
+    @classmethod
+    def load(cls, output_folder):
+        index = cls(output_folder)
+        index.outputs = {
+            name.lower()
+            for name in _names(index.folder)
+            if name.lower().endswith(".md")
+        }
+        try:
+            with open(
+                os.path.join(index.folder, INDEX_NAME), "r", encoding="utf-8"
+            ) as f:
+                owners = json.load(f)
+        except (OSError, ValueError):
+            owners = {}
+        index.images = {  # владелец известен только у файлов, которые ещё на месте
+            name.lower(): owners.get(name.lower(), "")
+            for name in _names(index.images_folder)
+        }
+        return index
+
+    def output_exists(
+        self, output_path
+    ):  # Есть ли уже такой .md; вне папки — по диску.
+        path = os.path.abspath(output_path)
+        if os.path.dirname(path) != self.folder:
+            return os.path.exists(output_path)
+        return os.path.basename(path).lower() in self.outputs
+
+    def for_document(
+        self, output_path
+    ):  # Выдача имён изображений для .md (None вне папки).
+        path = os.path.abspath(output_path)
+        if os.path.dirname(path) != self.folder:
+            return None
+        return DocumentNames(self, os.path.basename(path).lower())
+
+    def claim(self, result):  # Учёт результата пакета: .md и его изображения.
+        if not result["ok"] or result["skipped"] or not result["output"]:
+            return
+        owner = os.path.basename(result["output"]).lower()
+        self.outputs.add(owner)
+        for name in result.get("images", []):  # общие по содержимому не переходят
+            if not self.images.get(name.lower()):
+                self.images[name.lower()] = owner
+
+    def save(self):  # Владельцы имён для следующего запуска; ошибки записи не критичны.
+        owners = {name: owner for name, owner in self.images.items() if owner}
+        try:
+            write_atomic(
+                os.path.join(self.folder, INDEX_NAME),
+                json.dumps(owners, ensure_ascii=False, sort_keys=True),
+            )
+        except OSError:
+            pass
+
+
+class DocumentNames:  # Имена изображений одного документа: свои прежние имена переиспользуются.
+
+    def __init__(self, index, owner):
+        self.index = index
+        self.owner = owner
+        self.taken = set()  # имена, выданные этому документу в текущем запуске
+        self.overwritten = set()  # свои файлы прошлого запуска, записанные заново
+
+    def reserve(
+        self, img_name, base_name, ext
+    ):  # Имя в images/: перебор по индексу в памяти, на диске — одно O_EXCL.
+
+        images = self.index.images
+        counter = 1
+        while True:
+            key = img_name.lower()
+            holder = images.get(key)
+            if key not in self.taken and holder == self.owner:  # имя с прошлого раза
+                self.taken.add(key)
+                self.overwritten.add(img_name)
+                return img_name
+            if key not in self.taken and holder is None:
+                try:  # имя мог занять другой процесс пакета после снимка индекса
+                    fd = os.open(
+                        os.path.join(self.index.images_folder, img_name),
+                        os.O_CREAT | os.O_EXCL | os.O_WRONLY,
+                        0o666,  # права по umask, как у reserve_filename
+                    )
+                except FileExistsError:
+                    images[key] = ""
+                else:
+                    os.close(fd)
+                    images[key] = self.owner
+                    self.taken.add(key)
+                    return img_name
+            img_name = f"{base_name}_{counter}{ext}"
+            counter += 1
@@ -0,0 +1,191 @@
+import os
+from .utils import (
+    process_images_content,
+    replace_image_links_content,
+    fix_links_and_toc_content,
+    write_atomic,
+)
+from .image_store import ImageStore
+from .media import MediaIndex
+from .rasterizer import Rasterizer, VECTOR_EXTENSIONS, image_workers
+from .optimizer import ImageOptimizer, OPTIMIZED_EXTENSIONS
+from .cache import default_cache_dir
+from .tracing import Tracer
+from .ast_engine import ast_stage
+from .cancel import check as check_cancelled
+from . import output_index
+
+ENGINES = (
+    "regex",
+    "ast",
+    "stream",
+)  # постобработка: регулярные выражения, AST, потоково
+
+
+class PipelineContext:  # Состояние, общее для всех стадий обработки одного документа.
+
+    def __init__(self, md_path, temp_dir, options=None, media=None, tracer=None):
+        self.md_path = md_path
+        self.md_dir = os.path.dirname(md_path)
+        self.temp_dir = temp_dir
+        self.options = options or {}
+        self.media = media if media is not None else MediaIndex.from_dir(temp_dir)
+        self.images = []  # имена файлов, записанных в images/
+        self.store = ImageStore.from_options(self.options, self.md_dir)
+        self.rasterized = {}  # замены исходных файлов: EMF/WMF -> PNG, сжатые копии
+        self.emf_timings = []
+        self.image_savings = []  # статистика сжатия изображений
+        self.tracer = tracer or Tracer(os.path.basename(md_path))
+        index = output_index.current()
+        self.names = index.for_document(md_path) if index is not None else None
+
+    def discard_images(
+        self,
+    ):  # Удаление изображений, записанных документом, если он не завершён.
+        reused = self.store.reused if self.store is not None else set()
+        if self.names is not None:  # на них ссылается прежний .md
+            reused = reused | self.names.overwritten
+        for name in set(self.images) - reused:
+            try:
+                os.remove(os.path.join(self.md_dir, "images", name))
+            except OSError:
+                pass
+
+
+class Pipeline:  # Цепочка стадий str -> str; итоговый Markdown пишется на диск один раз.
+
+    def __init__(self, stages=None):
+        self.stages = []
+        for stage in stages or []:
+            if isinstance(stage, tuple):  # (стадия, имя для трассировки)
+                self.add(*stage)
+            else:
+                self.add(stage)
+
+    def add(
+        self, stage, name=None
+    ):  # Добавление стадии: вызываемый объект (content, ctx) -> content.
+        self.stages.append((name or stage.__name__, stage))
+        return self
+
+    def run(self, content, ctx):  # Прогон текста через все стадии с замером каждой.
+        for name, stage in self.stages:
+            check_cancelled()
+            images_before = len(ctx.images)
+            with ctx.tracer.span(name, bytes_in=len(content)) as span:
+                content = stage(content, ctx)
+                span["bytes_out"] = len(content)
+                span["images"] = len(ctx.images) - images_before
+        return content
+
+    def run_to_file(
+        self, content, ctx
+    ):  # Прогон стадий и единственная атомарная запись.
+        content = self.run(content, ctx)
+        with ctx.tracer.span("write", bytes_in=len(content)):
+            write_atomic(ctx.md_path, content)
+        return content
+
+
+def media_replacement_rules(
+    media,
+):  # Правила замены media/* -> images/* по индексу медиафайлов.
+
+    rules = {}
+    for f in media.names():
+        if f.lower().endswith((".png", ".jpg", ".jpeg", ".gif")):
+            rules[os.path.join("media", f)] = os.path.join("images", f)
+    return rules
+
+
+def vector_images_stage(
+    content, ctx
+):  # Пакетная растеризация всех EMF/WMF документа до замены ссылок.
+
+    names = sorted(
+        f for f in ctx.media.names() if f.lower().endswith(VECTOR_EXTENSIONS)
+    )
+    if names:
+        rasterizer = Rasterizer(
+            ctx.options.get("cache_dir") or default_cache_dir(),
+            ctx.options.get("emf_dpi"),
+            ctx.options.get("emf_workers") or image_workers(ctx.options.get("workers")),
+            ctx.temp_dir,
+        )
+        paths = {name: ctx.media.local_path(name) for name in names}
+        pngs = rasterizer.rasterize_all(list(paths.values()))
+        ctx.rasterized = {name: pngs[path] for name, path in paths.items()}
+        ctx.emf_timings = rasterizer.timings
+    return content
+
+
+def optimize_images_stage(
+    content, ctx
+):  # Сжатие PNG/JPEG (и растеризованных EMF) пулом перед переносом в images/.
+
+    if not ctx.options.get("optimize_images"):
+        return content
+    paths = {
+        name: ctx.media.local_path(name)
+        for name in ctx.media.names()
+        if name.lower().endswith(OPTIMIZED_EXTENSIONS)
+    }
+    paths.update(ctx.rasterized)
+    if paths:
+        optimizer = ImageOptimizer(
+            ctx.options.get("cache_dir") or default_cache_dir(),
+            ctx.options.get("max_image_size"),
+            ctx.options.get("jpeg_quality"),
+            ctx.options.get("webp"),
+            ctx.options.get("optimize_workers")
+            or image_workers(ctx.options.get("workers")),
+            ctx.temp_dir,
+        )
+        optimized = optimizer.optimize_all(sorted(set(paths.values())))
+        ctx.rasterized.update(
+            {name: optimized[path] for name, path in paths.items() if path in optimized}
+        )
+        ctx.image_savings = optimizer.stats
+    return content
+
+
+def images_stage(content, ctx):  # Перенос изображений в images/ и обновление ссылок.
+    return process_images_content(
+        content,
+        ctx.md_dir,
+        ctx.media,
+        ctx.images,
+        ctx.store,
+        ctx.rasterized,
+        ctx.names,
+    )
+
+
+def image_links_stage(content, ctx):  # Замена оставшихся ссылок media/* на images/*.
+    return replace_image_links_content(content, media_replacement_rules(ctx.media))
+
+
+def links_and_toc_stage(content, ctx):  # Нормализация ссылок, якоря и оглавление.
+    return fix_links_and_toc_content(content)
+
+
+def default_pipeline():  # Стандартная последовательность стадий постобработки.
+    return Pipeline(
+        [
+            (vector_images_stage, "emf"),
+            (optimize_images_stage, "optimize_images"),
+            (images_stage, "process_images"),
+            (image_links_stage, "replace_image_links"),
+            (links_and_toc_stage, "fix_links_and_toc"),
+        ]
+    )
+
+
+def ast_pipeline():  # Постобработка одним обходом JSON AST pandoc (engine="ast").
+    return Pipeline(
+        [
+            (vector_images_stage, "emf"),
+            (optimize_images_stage, "optimize_images"),
+            (ast_stage, "ast"),
+        ]
+    )
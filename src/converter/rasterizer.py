@@ -0,0 +1,135 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .utils import convert_emf_to_png, file_digest
+from . import cancel
+
+VECTOR_EXTENSIONS = (".emf", ".wmf")
+
+
+def _rasterize(
+    src_path, png_path, dpi
+):  # Задача пула: растеризация одного файла с замером времени.
+    cancel.check()  # очередь задач пула после отмены проходится мгновенно
+    started = time.perf_counter()
+    tmp_path = f"{png_path}.{os.getpid()}.tmp.png"
+    convert_emf_to_png(src_path, tmp_path, dpi)
+    os.replace(tmp_path, png_path)  # в кэше не бывает недописанных PNG
+    return time.perf_counter() - started
+
+
+def image_workers(
+    batch_workers=None,
+):  # Доля ядер на изображения: в рабочем процессе пакета — cpu_count // число процессов.
+    cores = os.cpu_count() or 1
+    if multiprocessing.parent_process() is None:
+        return cores
+    return max(cores // max(batch_workers or cores, 1), 1)
+
+
+def cache_subdir(
+    cache_dir, name, scratch_dir=None
+):  # <cache>/<name>; кэш недоступен — папка в scratch_dir, без кэша между запусками.
+    path = os.path.join(cache_dir, name)
+    try:
+        os.makedirs(path, exist_ok=True)
+        if os.access(path, os.W_OK):
+            return path
+        error = PermissionError(f"Нет прав на запись в кэш: {path}")
+    except OSError as e:
+        error = e
+    if scratch_dir is None:
+        raise error
+    path = os.path.join(scratch_dir, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def pool_executor(
+    workers,
+):  # В рабочем процессе пула — потоки (wand отпускает GIL), иначе процессы.
+    if multiprocessing.parent_process() is not None:
+        return ThreadPoolExecutor(max_workers=workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=cancel.set_token,
+        initargs=(cancel.current(),),
+    )
+
+
+class Rasterizer:  # Пакетная растеризация EMF/WMF с кэшем по хэшу содержимого и DPI.
+
+    def __init__(self, cache_dir, dpi=None, workers=None, scratch_dir=None):
+        self.cache_root = cache_dir
+        self.scratch_dir = scratch_dir  # запасная папка, если кэш недоступен
+        self.cache_dir = None  # создаётся при первой растеризации
+        self.dpi = dpi
+        self.workers = workers or image_workers()
+        self.timings = []  # {"image", "seconds", "cached"} по каждому файлу
+
+    def _cached_path(self, src_path):
+        if self.cache_dir is None:
+            self.cache_dir = cache_subdir(self.cache_root, "emf", self.scratch_dir)
+        return os.path.join(
+            self.cache_dir, f"{file_digest(src_path)}-{self.dpi or 'default'}.png"
+        )
+
+    def rasterize_all(
+        self, paths
+    ):  # {исходный путь: путь PNG}; каждое содержимое растеризуется один раз.
+
+        result = {}
+        pending = {}  # путь PNG в кэше -> исходные пути с тем же содержимым
+        for src_path in paths:
+            png_path = self._cached_path(src_path)
+            result[src_path] = png_path
+            if os.path.exists(png_path):
+                self.timings.append(
+                    {
+                        "image": os.path.basename(src_path),
+                        "seconds": 0.0,
+                        "cached": True,
+                    }
+                )
+            else:
+                pending.setdefault(png_path, []).append(src_path)
+
+        if not pending:
+            return result
+
+        if len(pending) == 1 or self.workers == 1:  # пул ради одного потока не нужен
+            seconds = {
+                png_path: _rasterize(sources[0], png_path, self.dpi)
+                for png_path, sources in pending.items()
+            }
+        else:
+            executor = pool_executor(min(self.workers, len(pending)))
+            with executor:
+                futures = {
+                    png_path: executor.submit(
+                        _rasterize, sources[0], png_path, self.dpi
+                    )
+                    for png_path, sources in pending.items()
+                }
+            seconds = {
+                png_path: future.result() for png_path, future in futures.items()
+            }
+
+        for png_path, sources in pending.items():
+            self.timings.append(
+                {
+                    "image": os.path.basename(sources[0]),
+                    "seconds": seconds[png_path],
+                    "cached": False,
+                }
+            )
+            for src_path in sources[1:]:  # повторы внутри документа
+                self.timings.append(
+                    {
+                        "image": os.path.basename(src_path),
+                        "seconds": 0.0,
+                        "cached": True,
+                    }
+                )
+        return result
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import ctypes
+from .cache import default_cache_dir
+from .utils import read_text, write_atomic
+
+SCHEDULES = ("cost", "size", "list")  # по прогнозу времени, по размеру, по списку
+MEMORY_BASE_MB = 200  # рабочий процесс Python + запуск pandoc
+MEMORY_PER_MB = 40  # пик памяти на МБ DOCX: XML распаковывается, AST pandoc в памяти
+MEMORY_SHARE = 0.7  # доля физической памяти для пакета по умолчанию
+HISTORY_LIMIT = 5000  # документов с известным временем
+SAMPLES_LIMIT = 500  # точек (размер, секунды) для оценки новых файлов
+
+
+def physical_memory_mb():  # Объём физической памяти или None, если узнать не удалось.
+    if sys.platform == "win32":
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+        return status.ullTotalPhys // 2**20
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_memory_budget_mb():
+    total = physical_memory_mb()
+    return int(total * MEMORY_SHARE) if total else None
+
+
+def estimate_memory_mb(size):  # Оценка пика памяти одной задачи по размеру DOCX.
+    return MEMORY_BASE_MB + MEMORY_PER_MB * size / 2**20
+
+
+class CostModel:  # Время конвертации по прошлым запускам: точное для знакомых файлов, линейное для новых.
+
+    def __init__(self, path):
+        self.path = path
+        self.history = {}  # ключ документа -> секунды
+        self.samples = {}  # движок -> [[размер, секунды], ...]
+        self._changed = False
+        try:
+            data = json.loads(read_text(path))
+            self.history = data.get("history", {})
+            self.samples = data.get("samples", {})
+        except (OSError, ValueError):
+            pass
+
+    @classmethod
+    def from_options(cls, options):  # <папка кэша>/costs.json.
+        return cls(
+            os.path.join(options.get("cache_dir") or default_cache_dir(), "costs.json")
+        )
+
+    @staticmethod
+    def _key(engine, path, size, mtime):
+        return f"{engine}|{os.path.abspath(path)}|{size}|{mtime}"
+
+    def _fit(
+        self, engine
+    ):  # Секунды = a + b * размер по последним точкам; None, пока их мало.
+        points = self.samples.get(engine, [])
+        if len(points) < 3:
+            return None
+        n = len(points)
+        mean_x = sum(p[0] for p in points) / n
+        mean_y = sum(p[1] for p in points) / n
+        var_x = sum((p[0] - mean_x) ** 2 for p in points)
+        if not var_x:
+            return mean_y, 0.0
+        slope = sum((p[0] - mean_x) * (p[1] - mean_y) for p in points) / var_x
+        slope = max(slope, 0.0)
+        return max(mean_y - slope * mean_x, 0.0), slope
+
+    def predict(self, engine, path, size, mtime):  # Секунды или None без данных.
+        seconds = self.history.get(self._key(engine, path, size, mtime))
+        if seconds is not None:
+            return seconds
+        fit = self._fit(engine)
+        if fit is None:
+            return None
+        return fit[0] + fit[1] * size
+
+    def observe(self, engine, path, size, mtime, seconds):
+        key = self._key(engine, path, size, mtime)
+        self.history.pop(key, None)  # свежие записи — в конец словаря
+        self.history[key] = seconds
+        points = self.samples.setdefault(engine, [])
+        points.append([size, seconds])
+        del points[:-SAMPLES_LIMIT]
+        self._changed = True
+
+    def save(self):
+        if not self._changed:
+            return
+        for key in list(self.history)[:-HISTORY_LIMIT]:
+            del self.history[key]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_atomic(
+            self.path, json.dumps({"history": self.history, "samples": self.samples})
+        )
+        self._changed = False
+
+
+class JobScheduler:  # Очередь задач пакета: дорогие первыми, в пределах памяти и числа процессов.
+
+    def __init__(self, jobs, options):
+        self.engine = options.get("engine") or "regex"
+        self.order = options.get("schedule") or "cost"
+        if self.order not in SCHEDULES:
+            raise ValueError(f"Неизвестный порядок задач: {self.order}")
+        budget = options.get("memory_budget_mb")
+        self.memory_budget = budget if budget else default_memory_budget_mb()
+        self.costs = CostModel.from_options(options) if self.order == "cost" else None
+
+        self.jobs = list(jobs)  # в исходном порядке
+        self._stat = {}  # номер задачи -> (размер, mtime)
+        for job in self.jobs:
+            try:
+                st = os.stat(job[1])
+                self._stat[job[0]] = (st.st_size, st.st_mtime)
+            except OSError:  # ошибка попадёт в результат задачи
+                self._stat[job[0]] = (0, 0.0)
+        self.queue = self._ordered()
+
+    def _ordered(self):  # Задачи в порядке запуска; равные — в порядке списка.
+        if self.order == "list":
+            return list(self.jobs)
+
+        def by_size(job):
+            return self._stat[job[0]][0]
+
+        if self.costs is None:
+            return sorted(self.jobs, key=by_size, reverse=True)
+        predicted = {
+            job[0]: self.costs.predict(self.engine, job[1], *self._stat[job[0]])
+            for job in self.jobs
+        }
+        if None in predicted.values():  # истории ещё мало — только по размеру
+            return sorted(self.jobs, key=by_size, reverse=True)
+        return sorted(self.jobs, key=lambda job: predicted[job[0]], reverse=True)
+
+    def memory_mb(self, job):
+        return estimate_memory_mb(self._stat[job[0]][0])
+
+    def take(
+        self, used_mb, running
+    ):  # Следующая задача, помещающаяся в бюджет; None — ждать завершения.
+        if not self.queue:
+            return None
+        if not running or self.memory_budget is None:  # одна задача идёт всегда
+            return self.queue.pop(0)
+        if used_mb + self.memory_mb(self.queue[0]) <= self.memory_budget:
+            return self.queue.pop(0)
+        return None  # меньшие не обгоняют: крупная задача не ждёт до конца пакета
+
+    def __bool__(self):
+        return bool(self.queue)
+
+    def observe(self, result):  # Время успешной конвертации — в историю.
+        if self.costs is None or not result["ok"] or result["cached"]:
+            return
+        if result["skipped"] or result["index"] not in self._stat:
+            return
+        size, mtime = self._stat[result["index"]]
+        seconds = sum(span["duration"] for span in result["spans"])
+        self.costs.observe(self.engine, result["input"], size, mtime, seconds)
+
+    def save(self):
+        if self.costs is None:
+            return
+        try:
+            self.costs.save()
+        except OSError:  # история — только подсказка для порядка, пакет не ломаем
+            pass
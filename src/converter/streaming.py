@@ -0,0 +1,160 @@
+import os
+import re
+import shutil
+import tempfile
+import subprocess
+from .backends import PANDOC_ARGS, CREATE_NO_WINDOW, pandoc_path
+from .cancel import kill_on_cancel
+from .pipeline import (
+    vector_images_stage,
+    optimize_images_stage,
+    media_replacement_rules,
+)
+from .utils import (
+    ImageRewriter,
+    CAPTION_PATTERNS,
+    normalize_links,
+    replace_image_links_content,
+    heading_anchor,
+    toc_markdown,
+    apply_default_mode,
+)
+
+HEADING_RE = re.compile(r"^(#+)\s+(.+)$")
+TOC_HEADING = "## Оглавление\n"
+
+
+def pandoc_lines(input_path):  # Построчный вывод pandoc (GFM) без сборки всего текста.
+
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(
+            [pandoc_path(), input_path, "-f", "docx", "-t", "gfm"] + PANDOC_ARGS,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            text=True,
+            encoding="utf-8",
+            creationflags=CREATE_NO_WINDOW,
+        )
+        try:
+            with kill_on_cancel(proc):  # после kill stdout заканчивается
+                yield from proc.stdout
+        except BaseException:  # чтение прервано — pandoc больше не нужен
+            proc.kill()
+            raise
+        finally:
+            proc.stdout.close()
+            proc.wait()
+        if proc.returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode("utf-8", "replace").strip()
+            raise RuntimeError(
+                message or f"pandoc завершился с кодом {proc.returncode}"
+            )
+
+
+class StreamingRewriter:  # Обработка GFM по строкам: изображения, ссылки, якоря, подписи.
+
+    def __init__(self, ctx):
+        self.images = ImageRewriter(
+            ctx.md_dir, ctx.media, ctx.images, ctx.store, ctx.rasterized, ctx.names
+        )
+        self.rules = media_replacement_rules(ctx.media)
+        self.toc_entries = []
+        self._carry = ""  # строка, у которой подпись съела перевод строки
+
+    def feed(self, line):  # Готовый текст для одной входной строки (может быть пустым).
+        line = self._carry + self.images.rewrite(line)
+        self._carry = ""
+        for pattern in CAPTION_PATTERNS:
+            line = re.sub(pattern, "", line)
+        if line and not line.endswith("\n"):  # как в re.sub по всему тексту
+            self._carry = line
+            return ""
+        line = normalize_links(replace_image_links_content(line, self.rules))
+
+        heading = HEADING_RE.match(line.rstrip("\n"))
+        if heading:
+            title = heading.group(2).strip()
+            anchor = heading_anchor(title)
+            self.toc_entries.append((len(heading.group(1)), title, anchor))
+            return f'<a id="{anchor}"></a>\n{line}'
+        return line
+
+    def flush(self):
+        line, self._carry = self._carry, ""
+        return line
+
+
+def stream_to_file(
+    input_path, ctx
+):  # Потоковый режим: вывод pandoc обрабатывается по строкам и пишется сразу на диск.
+
+    with ctx.tracer.span("emf") as span:
+        vector_images_stage("", ctx)
+        span["images"] = len(ctx.rasterized)
+    if ctx.options.get("optimize_images"):
+        with ctx.tracer.span("optimize_images") as span:
+            optimize_images_stage("", ctx)
+            span["images"] = len(ctx.image_savings)
+
+    rewriter = StreamingRewriter(ctx)
+    folder = os.path.dirname(ctx.md_path) or "."
+    fd, body_path = tempfile.mkstemp(dir=folder, prefix=".", suffix=".tmp")
+    toc_start = toc_end = None  # байтовые границы старого оглавления в body_path
+    try:
+        with ctx.tracer.span(
+            "stream", bytes_in=os.path.getsize(input_path)
+        ) as span, os.fdopen(fd, "wb") as body:
+            offset = 0
+            after_toc_heading = False
+            for line in pandoc_lines(input_path):
+                out = rewriter.feed(line)
+                if not out:
+                    continue
+                if toc_start is not None and toc_end is None:
+                    if out.startswith("<a id=") and out.split("\n", 1)[1][:3] == "## ":
+                        toc_end = offset  # следующий раздел 2-го уровня
+                if after_toc_heading and toc_start is None and out == "\n":
+                    toc_start = offset + 1
+                after_toc_heading = out.endswith("\n" + TOC_HEADING)
+                data = out.encode("utf-8")
+                body.write(data)
+                offset += len(data)
+            body.write(rewriter.flush().encode("utf-8"))
+            span["bytes_out"] = body.tell()
+            span["images"] = len(ctx.images)
+
+        if toc_end is None:  # оглавления нет или за ним нет разделов
+            apply_default_mode(body_path)
+            os.replace(body_path, ctx.md_path)
+            return
+        with ctx.tracer.span("toc"):
+            splice_toc(body_path, ctx.md_path, toc_start, toc_end, rewriter.toc_entries)
+    finally:
+        if os.path.exists(body_path):
+            os.remove(body_path)
+
+
+def splice_toc(
+    body_path, md_path, start, end, toc_entries
+):  # Второй проход: копия файла с новым оглавлением вместо байтов [start, end).
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(md_path) or ".", prefix=".", suffix=".tmp"
+    )
+    try:
+        with open(body_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+            remaining = start
+            while remaining:
+                chunk = src.read(min(remaining, 1 << 20))
+                dst.write(chunk)
+                remaining -= len(chunk)
+            dst.write((toc_markdown(toc_entries) + "\n\n").encode("utf-8"))
+            src.seek(end)
+            shutil.copyfileobj(src, dst)
+        apply_default_mode(tmp_path)
+        os.replace(tmp_path, md_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
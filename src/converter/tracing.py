@@ -0,0 +1,120 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+
+TRACE_FORMATS = ("jsonl", "chrome")
+
+
+class Tracer:  # Интервалы времени по стадиям обработки одного файла.
+
+    def __init__(self, file):
+        self.file = file
+        self.spans = []
+
+    @contextmanager
+    def span(
+        self, stage, **fields
+    ):  # Замер стадии; поля (bytes_out, images) можно дописать внутри.
+        record = {
+            "file": self.file,
+            "stage": stage,
+            "start": time.time(),
+            "duration": 0.0,
+            "bytes_in": None,
+            "bytes_out": None,
+            "images": None,
+            "pid": os.getpid(),
+        }
+        record.update(fields)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["duration"] = time.perf_counter() - started
+            self.spans.append(record)
+
+
+class TraceWriter:  # Запись интервалов в файл: JSON Lines или формат Chrome trace (chrome://tracing).
+
+    def __init__(self, path, fmt="jsonl"):
+        if fmt not in TRACE_FORMATS:
+            raise ValueError(f"Неизвестный формат трассировки: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self._events = []
+        self._file = open(path, "w", encoding="utf-8") if fmt == "jsonl" else None
+
+    def write(self, spans):
+        if self._file is not None:
+            for span in spans:
+                self._file.write(json.dumps(span, ensure_ascii=False) + "\n")
+            self._file.flush()
+            return
+        for span in spans:
+            self._events.append(
+                {
+                    "name": span["stage"],
+                    "cat": span["file"],
+                    "ph": "X",
+                    "ts": int(span["start"] * 1e6),
+                    "dur": int(span["duration"] * 1e6),
+                    "pid": span["pid"],
+                    "tid": span["pid"],
+                    "args": {
+                        k: span[k]
+                        for k in ("file", "bytes_in", "bytes_out", "images")
+                        if span[k] is not None
+                    },
+                }
+            )
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            return
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self._events}, f, ensure_ascii=False)
+
+
+def summarize_spans(
+    spans, top=5
+):  # Сводка пакета: время по стадиям и самые медленные файлы.
+
+    by_stage = {}
+    by_file = {}
+    for span in spans:
+        by_stage[span["stage"]] = by_stage.get(span["stage"], 0.0) + span["duration"]
+        by_file[span["file"]] = by_file.get(span["file"], 0.0) + span["duration"]
+
+    slowest_stages = sorted(
+        (span for span in spans), key=lambda s: s["duration"], reverse=True
+    )[:top]
+    return {
+        "stages": dict(sorted(by_stage.items(), key=lambda kv: kv[1], reverse=True)),
+        "slowest_files": sorted(by_file.items(), key=lambda kv: kv[1], reverse=True)[
+            :top
+        ],
+        "slowest_spans": [
+            (s["file"], s["stage"], s["duration"]) for s in slowest_stages
+        ],
+    }
+
+
+def format_summary(summary):  # Текстовая таблица сводки для журнала.
+
+    lines = ["Время по стадиям:"]
+    lines += [
+        f"  {stage:<22} {seconds:8.2f} с"
+        for stage, seconds in summary["stages"].items()
+    ]
+    lines.append("Самые медленные файлы:")
+    lines += [
+        f"  {seconds:8.2f} с  {file}" for file, seconds in summary["slowest_files"]
+    ]
+    lines.append("Самые медленные стадии:")
+    lines += [
+        f"  {seconds:8.2f} с  {stage:<22} {file}"
+        for file, stage, seconds in summary["slowest_spans"]
+    ]
+    return "\n".join(lines)
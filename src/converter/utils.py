@@ -1,11 +1,10 @@
 import os
 import re
-import shutil
-from datetime import datetime
-from wand.image import Image
+import hashlib
+import tempfile
 import warnings
-
-warnings.filterwarnings("ignore", category=UserWarning, module="wand.*")
+from .media import MediaIndex, MediaFile
+from .cancel import check as check_cancelled
 
 
 def sanitize_filename(name):  # Очищает имя файла от недопустимых символов.
@@ -14,11 +13,46 @@ def sanitize_filename(name):  # Очищает имя файла от недоп
     )  # это выражение "очищает" строку, заменяя недопустимые символы на подчёркивания.
 
 
-def convert_emf_to_png(emf_path):  # Конвертирует файл EMF в PNG с помощью Wand.
+def file_digest(path, chunk_size=1 << 20):  # SHA-256 содержимого файла.
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def reserve_filename(
+    folder, img_name, base_name, ext
+):  # Атомарно занимает свободное имя файла в папке (безопасно при параллельной записи).
+
+    counter = 1
+    while True:
+        try:
+            fd = os.open(
+                os.path.join(folder, img_name),
+                os.O_CREAT | os.O_EXCL | os.O_WRONLY,
+                0o666,  # по умолчанию 0o777: copy_to пишет в этот же файл
+            )
+        except FileExistsError:
+            img_name = f"{base_name}_{counter}{ext}"
+            counter += 1
+            continue
+        os.close(fd)
+        return img_name
+
+
+def convert_emf_to_png(
+    emf_path, png_path=None, dpi=None
+):  # Конвертирует файл EMF/WMF в PNG с помощью Wand.
 
     try:
-        png_path = os.path.splitext(emf_path)[0] + ".png"
-        with Image(filename=emf_path) as img:
+        warnings.filterwarnings("ignore", category=UserWarning, module="wand.*")
+        from wand.image import (
+            Image,
+        )  # импорт только при первом EMF: wand тянет ImageMagick
+
+        png_path = png_path or os.path.splitext(emf_path)[0] + ".png"
+        with Image(filename=emf_path, resolution=dpi) as img:
             img.format = "png"
             img.save(filename=png_path)
         return png_path
@@ -26,114 +60,255 @@ def convert_emf_to_png(emf_path):  # Конвертирует файл EMF в PN
         raise Exception(f"Ошибка конвертации EMF в PNG: {str(e)}")
 
 
+def read_text(path):  # Чтение текстового файла в UTF-8.
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+_UMASK = os.umask(0)  # umask читается один раз: изменить его можно только так
+os.umask(_UMASK)
+
+
+def apply_default_mode(path):  # Права по umask, как у open(); mkstemp создаёт 0600.
+    os.chmod(path, 0o666 & ~_UMASK)
+
+
+def write_atomic(
+    path, content
+):  # Атомарная запись: во временный файл рядом с целевым и os.replace.
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        apply_default_mode(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 def process_images(
     md_path, temp_dir
 ):  # Обработка изображений в Markdown файле, перемещение их в папку images и обновление ссылок.
 
-    md_dir = os.path.dirname(md_path)
-    images_folder = os.path.join(md_dir, "images")
-    os.makedirs(images_folder, exist_ok=True)
-
-    with open(md_path, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    image_counter = {}  # Словарь для подсчёта одинаковых alt_text
-
-    img_patterns = [
-        (r"!\[([^\]]*)\]\(([^)]+)\)", True),  # поиск изображений в Markdown
-        (r'<img[^>]+src="([^"]+)"[^>]*>', False),  # поиск изображений в HTML
-    ]
-    for pattern, is_markdown in img_patterns:
-
-        def replacer(match):
-            src = match.group(2 if is_markdown else 1)
-            if src.startswith("data:") or not src.strip():
-                return match.group(0)
-
-            original_name = os.path.basename(src.split("?")[0])
-            name, ext = os.path.splitext(original_name)
-
-            # Извлечение alt_text
-            alt_text = match.group(1) if is_markdown and match.group(1) else None
-            if not alt_text:
-                # Если alt_text отсутствует, используем имя файла или подпись
-                alt_text = (
-                    os.path.splitext(original_name)[0].replace("_", " ").title()
-                    or "Изображение"
-                )
-
-            base_name = sanitize_filename(alt_text)
-
-            # Подсчёт уникальности для одинаковых alt_text
-            if base_name in image_counter:
-                image_counter[base_name] += 1
-                img_name = f"{base_name}_{image_counter[base_name]}{ext.lower()}"
-            else:
-                image_counter[base_name] = 0
-                img_name = f"{base_name}{ext.lower()}"
-
-            possible_paths = [
-                os.path.join(temp_dir, "media", original_name),
-                os.path.join(temp_dir, original_name),
-            ]
-
-            src_path = next(
-                (path for path in possible_paths if os.path.exists(path)), None
+    content = process_images_content(
+        read_text(md_path), os.path.dirname(md_path), temp_dir
+    )
+    write_atomic(md_path, content)
+
+
+def process_images_content(
+    content,
+    md_dir,
+    media,
+    written_images=None,
+    store=None,
+    rasterized=None,
+    names=None,
+):  # То же, что process_images, но над строкой; media — MediaIndex или папка извлечения.
+
+    rewriter = ImageRewriter(md_dir, media, written_images, store, rasterized, names)
+    return remove_captions(rewriter.rewrite(content))
+
+
+IMG_PATTERNS = [
+    (r"!\[([^\]]*)\]\(([^)]+)\)", True),  # поиск изображений в Markdown
+    (r'<img[^>]+src="([^"]+)"[^>]*>', False),  # поиск изображений в HTML
+]
+CAPTION_PATTERNS = [r"Рисунок \d+ – [^\n]+\n", r"Рисунок \d+\.\n"]
+
+
+class ImageRewriter:  # Перенос изображений в images/ и замена ссылок; текст можно подавать частями.
+
+    def __init__(
+        self,
+        md_dir,
+        media,
+        written_images=None,
+        store=None,
+        rasterized=None,
+        names=None,
+    ):
+        if isinstance(media, str):
+            media = MediaIndex.from_dir(media)
+        self.md_dir = md_dir
+        self.media = media
+        self.images_folder = os.path.join(md_dir, "images")
+        self.written_images = written_images
+        self.store = store
+        self.rasterized = rasterized
+        self.names = names  # выдача имён по индексу папки результатов
+        self.image_counter = {}  # Словарь для подсчёта одинаковых alt_text
+        os.makedirs(self.images_folder, exist_ok=True)
+
+    def rewrite(self, content):  # Все ссылки на изображения в тексте.
+        for pattern, is_markdown in IMG_PATTERNS:
+            content = re.sub(
+                pattern,
+                lambda match: self._replace(match, is_markdown),
+                content,
+                flags=re.IGNORECASE,
             )
-            if not src_path:
-                return match.group(0)
-
-            if src_path.lower().endswith(".emf"):
-                png_path = convert_emf_to_png(src_path)
-                if png_path:
-                    src_path = png_path
-                    img_name = os.path.splitext(img_name)[0] + ".png"
-
-            counter = 1
-            while os.path.exists(os.path.join(images_folder, img_name)):
-                img_name = f"{base_name}_{counter}{ext.lower()}"
-                counter += 1
-
-            dest_path = os.path.join(images_folder, img_name)
-            shutil.copy2(src_path, dest_path)
-            rel_path = os.path.relpath(dest_path, md_dir).replace("\\", "/")
-
-            # Формируем только изображение без подписи и якоря
-            if is_markdown:
-                style = ""
-                if match.group(0).find("style=") != -1:
-                    style_match = re.search(r'style="([^"]*)"', match.group(0))
-                    if style_match:
-                        style = f' style="{style_match.group(1)}"'
-                return f"![{alt_text}]({rel_path}{style})"
-            else:
-                style = re.search(r'style="([^"]*)"', match.group(0))
-                style_str = f' style="{style.group(1)}"' if style else ""
-                return f'<img src="{rel_path}"{style_str}>'
-
-        content = re.sub(pattern, replacer, content, flags=re.IGNORECASE)
-
-    # Удаляем строки вида "Рисунок X – ..." и связанные с ними упоминания
-    content = re.sub(r"Рисунок \d+ – [^\n]+\n", "", content)
-    content = re.sub(r"Рисунок \d+\.\n", "", content)
-
-    with open(md_path, "w", encoding="utf-8") as f:
-        f.write(content)
+        return content
+
+    def _replace(self, match, is_markdown):
+        src = match.group(2 if is_markdown else 1)
+        if src.startswith("data:") or not src.strip():
+            return match.group(0)
+
+        original_name = os.path.basename(src.split("?")[0])
+        name, ext = os.path.splitext(original_name)
+
+        # Извлечение alt_text
+        alt_text = image_alt_text(
+            match.group(1) if is_markdown else None, original_name
+        )
+
+        base_name = sanitize_filename(alt_text)
+        img_name = unique_image_name(self.image_counter, base_name, ext)
+
+        img_name = place_image(
+            self.media,
+            original_name,
+            img_name,
+            base_name,
+            self.images_folder,
+            self.store,
+            self.rasterized,
+            self.names,
+        )
+        if img_name is None:
+            return match.group(0)
+        if self.written_images is not None:
+            self.written_images.append(img_name)
+        dest_path = os.path.join(self.images_folder, img_name)
+        rel_path = os.path.relpath(dest_path, self.md_dir).replace("\\", "/")
+
+        # Формируем только изображение без подписи и якоря
+        if is_markdown:
+            style = ""
+            if match.group(0).find("style=") != -1:
+                style_match = re.search(r'style="([^"]*)"', match.group(0))
+                if style_match:
+                    style = f' style="{style_match.group(1)}"'
+            return f"![{alt_text}]({rel_path}{style})"
+        else:
+            style = re.search(r'style="([^"]*)"', match.group(0))
+            style_str = f' style="{style.group(1)}"' if style else ""
+            return f'<img src="{rel_path}"{style_str}>'
+
+
+def remove_captions(
+    content,
+):  # Удаляем строки вида "Рисунок X – ..." и связанные с ними упоминания
+    for pattern in CAPTION_PATTERNS:
+        content = re.sub(pattern, "", content)
+    return content
+
+
+def image_alt_text(alt_text, original_name):  # alt_text или замена по имени файла.
+    if alt_text:
+        return alt_text
+    # Если alt_text отсутствует, используем имя файла или подпись
+    return os.path.splitext(original_name)[0].replace("_", " ").title() or "Изображение"
+
+
+def unique_image_name(
+    image_counter, base_name, ext
+):  # Имя файла по alt_text; повторы получают суффикс _N.
+
+    # Подсчёт уникальности для одинаковых alt_text
+    if base_name in image_counter:
+        image_counter[base_name] += 1
+        return f"{base_name}_{image_counter[base_name]}{ext.lower()}"
+    image_counter[base_name] = 0
+    return f"{base_name}{ext.lower()}"
+
+
+def place_image(
+    media,
+    original_name,
+    img_name,
+    base_name,
+    images_folder,
+    store=None,
+    rasterized=None,
+    names=None,
+):  # Запись изображения из индекса в images/; итоговое имя или None, если его нет.
+
+    check_cancelled()  # точка отмены перед каждым изображением
+    src = media.lookup(original_name)  # поиск в индексе, без stat
+    if src is None:
+        return None
+
+    replacement = None
+    if rasterized and original_name in rasterized:  # уже растеризован или сжат
+        replacement = rasterized[original_name]
+    elif original_name.lower().endswith((".emf", ".wmf")):
+        replacement = convert_emf_to_png(media.local_path(original_name))
+    if replacement:
+        src = MediaFile.from_path(replacement)
+        img_name = os.path.splitext(img_name)[0] + os.path.splitext(replacement)[1]
+
+    digest = src.digest() if store is not None else None
+    existing = store.lookup(digest, images_folder) if digest else None
+    if existing:  # то же содержимое уже лежит в images/ — ссылаемся на него
+        img_name = existing
+    else:
+        ext = os.path.splitext(img_name)[1]
+        if names is not None:  # по индексу пакета, без перебора имён на диске
+            img_name = names.reserve(img_name, base_name, ext)
+        else:
+            img_name = reserve_filename(images_folder, img_name, base_name, ext)
+        if store is not None:
+            store.materialize(src, digest, os.path.join(images_folder, img_name))
+            store.register(digest, img_name)
+        else:
+            src.copy_to(os.path.join(images_folder, img_name))
+
+    if store is not None:
+        store.digests.append(digest)
+    return img_name
+
+
+def heading_anchor(title):  # Якорь заголовка для ссылок оглавления.
+    anchor = re.sub(
+        r"[^\w\s-]", "", title.lower(), flags=re.UNICODE
+    )  # очищает строку от "лишних" символов
+    return re.sub(r"\s+", "-", anchor).strip(
+        "-"
+    )  # 1. Заменяет все пробельные последовательности на дефисы 2. Удаляет дефисы в начале и конце строки
+
+
+def toc_markdown(toc_entries):  # Список оглавления из (level, title, anchor).
+    return "\n".join(
+        f"{'    '*(level-1)}- [{title}](#{anchor})"
+        for level, title, anchor in toc_entries
+    )
+
+
+def normalize_links(content):  # Нормализация ссылок
+    return re.sub(
+        r"\[([^\]]+)\]\(([^)]+)\)",
+        lambda m: f'[{m.group(1)}]({m.group(2).replace(" ", "%20")})',
+        content,  # Этот код исправляет Markdown-ссылки, заменяя пробелы в URL на %20, чтобы они корректно работали в браузерах и других системах.
+    )
 
 
 def fix_links_and_toc(
     md_path,
 ):  # Исправление ссылок и оглавления в Markdown файле.
 
-    with open(md_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    write_atomic(md_path, fix_links_and_toc_content(read_text(md_path)))
 
-    # Нормализация ссылок
-    content = re.sub(
-        r"\[([^\]]+)\]\(([^)]+)\)",
-        lambda m: f'[{m.group(1)}]({m.group(2).replace(" ", "%20")})',
-        content,  # Этот код исправляет Markdown-ссылки, заменяя пробелы в URL на %20, чтобы они корректно работали в браузерах и других системах.
-    )
+
+def fix_links_and_toc_content(content):  # То же, что fix_links_and_toc, над строкой.
+
+    content = normalize_links(content)
 
     # Исправление TOC
     toc_entries = []
@@ -141,12 +316,7 @@ def fix_links_and_toc(
     def toc_replacer(match):
         level = len(match.group(1))
         title = match.group(2).strip()
-        anchor = re.sub(
-            r"[^\w\s-]", "", title.lower(), flags=re.UNICODE
-        )  # очищает строку от "лишних" символов
-        anchor = re.sub(r"\s+", "-", anchor).strip(
-            "-"
-        )  # 1. Заменяет все пробельные последовательности на дефисы 2. Удаляет дефисы в начале и конце строки
+        anchor = heading_anchor(title)
         toc_entries.append((level, title, anchor))
         return f'<a id="{anchor}"></a>\n{match.group(0)}'
 
@@ -155,25 +325,27 @@ def fix_links_and_toc(
     )  # Обработка заголовков
 
     # Обновление TOC, если оно есть
-    toc_content = "## Оглавление\n\n" + "\n".join(
-        f"{'    '*(level-1)}- [{title}](#{anchor})"
-        for level, title, anchor in toc_entries
-    )
+    toc_content = "## Оглавление\n\n" + toc_markdown(toc_entries)
     content = re.sub(
         r"(?s)(## Оглавление\n\n).*?(\n## )", f"{toc_content}\\2", content, count=1
     )
 
     # Пропускаем замену "Рисунок X", так как подписи удалены
-    with open(md_path, "w", encoding="utf-8") as f:
-        f.write(content)
+    return content
 
 
 def replace_image_links(
     md_path, replacement_rules=None
 ):  # Замена ссылок на изображения по заданным правилам.
 
-    with open(md_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    write_atomic(
+        md_path, replace_image_links_content(read_text(md_path), replacement_rules)
+    )
+
+
+def replace_image_links_content(
+    content, replacement_rules=None
+):  # То же, что replace_image_links, над строкой.
 
     rules = replacement_rules or {}
 
@@ -198,6 +370,4 @@ def replace_image_links(
     content = re.sub(
         r'<img[^>]+src="([^"]+)"[^>]*>', html_replacer, content
     )  # замена ссылок в HTML
-
-    with open(md_path, "w", encoding="utf-8") as f:
-        f.write(content)
+    return content
@@ -0,0 +1,262 @@
+import os
+import re
+import glob
+import json
+import time
+import sqlite3
+from collections import Counter
+from .engine import iter_batch, plan_outputs
+from .utils import file_digest
+
+MANIFEST_NAME = ".docx2md-watch.sqlite"
+DEFAULT_INTERVAL = 2.0
+DEFAULT_DEBOUNCE = 2.0
+IMAGE_REF_RE = re.compile(r'(?<=[("])images/([^)"\s]+)')
+
+
+def _is_document(name):  # DOCX, кроме файлов-блокировок Word (~$имя.docx).
+    return name.lower().endswith(".docx") and not name.startswith("~$")
+
+
+def scan(patterns):  # {путь DOCX: (размер, mtime)} по папкам, файлам и glob-шаблонам.
+    found = {}
+    folders = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            folders.append(pattern)
+            continue
+        paths = (
+            glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        )
+        for path in paths:
+            if _is_document(os.path.basename(path)):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found[os.path.abspath(path)] = (st.st_size, st.st_mtime)
+    while folders:  # scandir: тип и размер без отдельного stat на каждый файл в Windows
+        try:
+            entries = os.scandir(folders.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        folders.append(entry.path)
+                    elif entry.is_file() and _is_document(entry.name):
+                        st = entry.stat()
+                        found[os.path.abspath(entry.path)] = (st.st_size, st.st_mtime)
+                except OSError:  # файл удалён во время обхода
+                    continue
+    return found
+
+
+def referenced_images(md_path):  # Имена в images/, на которые ссылается .md.
+    try:
+        with open(md_path, "r", encoding="utf-8") as f:
+            return sorted(set(IMAGE_REF_RE.findall(f.read())))
+    except OSError:
+        return []
+
+
+class WatchManifest:  # Состояние синхронизации в папке результатов: документ -> результат в SQLite.
+
+    def __init__(self, output_folder):
+        self.path = os.path.join(output_folder, MANIFEST_NAME)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " input TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime REAL NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " output TEXT NOT NULL,"
+            " images TEXT NOT NULL,"
+            " ok INTEGER NOT NULL,"
+            " converted REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def entries(self):  # {путь DOCX: запись}; images — список имён.
+        cursor = self._db.execute(
+            "SELECT input, size, mtime, digest, output, images, ok FROM documents"
+        )
+        columns = [c[0] for c in cursor.description]
+        entries = {}
+        for row in cursor:
+            entry = dict(zip(columns, row))
+            entry["images"] = json.loads(entry["images"])
+            entries[entry["input"]] = entry
+        return entries
+
+    def update(
+        self, input_path, size, mtime, digest, output, images, ok
+    ):  # Итог конвертации документа; фиксируется сразу.
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents"
+                " (input, size, mtime, digest, output, images, ok, converted)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    input_path,
+                    size,
+                    mtime,
+                    digest,
+                    output,
+                    json.dumps(images, ensure_ascii=False),
+                    int(ok),
+                    time.time(),
+                ),
+            )
+
+    def touch(self, input_path, size, mtime):  # Файл пересохранён без изменений.
+        with self._db:
+            self._db.execute(
+                "UPDATE documents SET size = ?, mtime = ? WHERE input = ?",
+                (size, mtime, input_path),
+            )
+
+    def remove(self, input_path):
+        with self._db:
+            self._db.execute("DELETE FROM documents WHERE input = ?", (input_path,))
+
+    def close(self):
+        self._db.close()
+
+
+class FolderWatcher:  # Инкрементальная синхронизация папки: конвертируются только новые и изменённые DOCX.
+
+    def __init__(self, patterns, output_folder, options, debounce=DEFAULT_DEBOUNCE):
+        self.patterns = patterns
+        self.output_folder = output_folder
+        self.images_folder = os.path.join(output_folder, "images")
+        # перезаписываются только свои .md (по манифесту); вместо журнала — манифест
+        self.options = dict(options, journal=False, resume=False)
+        self.debounce = debounce
+        self.manifest = WatchManifest(output_folder)
+        self._seen = {}  # путь -> ((размер, mtime), когда впервые замечен таким)
+
+    def _settled(self, path, stat, now):  # Сохранение файла закончено.
+        seen = self._seen.get(path)
+        if seen is None or seen[0] != stat:
+            seen = self._seen[path] = (stat, now)
+        if time.time() - stat[1] >= self.debounce:  # давно не менялся
+            return True
+        return now - seen[1] >= self.debounce  # не менялся между опросами (часы шары)
+
+    def _release(
+        self, refs, names
+    ):  # Удаление изображений, на которые больше никто не ссылается.
+        removed = 0
+        refs.subtract(names)
+        for name in names:
+            if refs[name] > 0:
+                continue
+            try:
+                os.remove(os.path.join(self.images_folder, name))
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def sync(
+        self,
+    ):  # Один проход: ("removed", сведения) по удалённым DOCX, ("file", результат) по сконвертированным.
+
+        now = time.monotonic()
+        entries = self.manifest.entries()
+        current = scan(self.patterns)
+        self._seen = {p: s for p, s in self._seen.items() if p in current}
+
+        refs = None  # имя в images/ -> сколько документов на него ссылается
+        gone = sorted(set(entries) - set(current))
+        if gone:
+            refs = Counter(name for e in entries.values() for name in e["images"])
+            for path in gone:
+                entry = entries.pop(path)
+                try:
+                    os.remove(entry["output"])
+                except OSError:
+                    pass
+                images = self._release(refs, entry["images"])
+                self.manifest.remove(path)
+                yield "removed", {
+                    "input": entry["input"],
+                    "output": entry["output"],
+                    "images": images,
+                }
+
+        changed = {}  # путь -> ((размер, mtime), хэш)
+        for path, stat in sorted(current.items()):
+            entry = entries.get(path)
+            if entry is not None and (entry["size"], entry["mtime"]) == stat:
+                continue
+            if not self._settled(path, stat, now):
+                continue
+            del self._seen[path]
+            try:
+                digest = file_digest(path)
+            except OSError:
+                continue
+            if entry is not None and entry["digest"] == digest:  # только mtime
+                self.manifest.touch(path, *stat)
+                continue
+            changed[path] = (stat, digest)
+        if not changed:
+            return
+
+        files = list(changed)
+        taken = {  # изменённые документы сохраняют свои имена, новые их не занимают
+            os.path.splitext(os.path.basename(entry["output"]))[0].lower()
+            for entry in entries.values()
+        }
+        taken.update(  # .md, которые лежат в папке не от синхронизации
+            os.path.splitext(name)[0].lower()
+            for name in os.listdir(self.output_folder)
+            if name.lower().endswith(".md")
+        )
+        fresh = iter(
+            plan_outputs(
+                [p for p in files if p not in entries], self.output_folder, taken
+            )
+        )
+        outputs = [
+            entries[path]["output"] if path in entries else next(fresh)
+            for path in files
+        ]
+        planned = dict(zip(files, outputs))
+        if refs is None:
+            refs = Counter(name for e in entries.values() for name in e["images"])
+        for result in iter_batch(
+            files,
+            self.output_folder,
+            self.options,
+            outputs=outputs,
+            replace=[path in entries for path in files],
+        ):
+            if result["cancelled"]:
+                continue
+            path = result["input"]
+            stat, digest = changed[path]
+            old = entries.get(path)
+            if result["ok"]:  # записанные файлы и ссылки .md (из кэша — только они)
+                images = sorted(
+                    set(result.get("images", []))
+                    | set(referenced_images(planned[path]))
+                )
+            else:  # прежний .md остаётся на месте
+                images = old["images"] if old is not None else []
+            self.manifest.update(
+                path, *stat, digest, planned[path], images, result["ok"]
+            )
+            refs.update(images)
+            if old is not None:  # прежние изображения документа
+                self._release(refs, old["images"])
+            yield "file", result
+
+    def close(self):
+        self.manifest.close()
@@ -1,27 +1,36 @@
-from PyQt5.QtWidgets import QMessageBox
-import pypandoc
+import subprocess
+import importlib.util
+from src.converter.cache import probe_pandoc
+
+GUI_LIBS = ["markdown", "bs4", "PyQt5", "wand"]
 
 
 class DependencyChecker:
     @staticmethod
-    def check():
+    def missing(
+        libs=GUI_LIBS,
+    ):  # Список недостающих зависимостей; без Qt, годится для CLI.
         missing = []
         try:
-            version = pypandoc.get_pandoc_version()
-            if tuple(map(int, version.split("."))) < (2, 14):
+            version = probe_pandoc()
+            if tuple(map(int, version.split(".")[:2])) < (2, 14):
                 missing.append(
                     f"Pandoc (версия {version} найдена, требуется 2.14 или выше)"
                 )
-        except (ImportError, OSError):
+        except (ImportError, OSError, ValueError, subprocess.CalledProcessError):
             missing.append("Pandoc (установите с https://pandoc.org/installing.html)")
 
-        for lib in ["markdown", "bs4", "PyQt5", "wand"]:
-            try:
-                __import__(lib)
-            except ImportError:
+        for lib in libs:  # модули ищутся, но не импортируются
+            if importlib.util.find_spec(lib) is None:
                 missing.append(f"{lib} (pip install {lib})")
+        return missing
 
+    @staticmethod
+    def check():
+        missing = DependencyChecker.missing()
         if missing:
+            from PyQt5.QtWidgets import QMessageBox
+
             msg = "Не хватает зависимостей:\n" + "\n".join(missing)
             QMessageBox.critical(None, "Ошибка зависимостей", msg)
             return False
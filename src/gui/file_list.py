@@ -0,0 +1,186 @@
+import os
+import time
+from PyQt5.QtCore import (
+    Qt,
+    QThread,
+    QModelIndex,
+    QAbstractTableModel,
+    pyqtSignal,
+)
+
+COLUMNS = ("Файл", "Размер", "Изменён")
+SORT_ROLE = Qt.UserRole  # сырое значение ячейки (байты, секунды)
+
+
+def path_key(path):  # Ключ индекса: один файл под разными написаниями пути.
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
+
+
+def stat_entry(path):  # (путь, размер, mtime) или None, если файл недоступен.
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_size, st.st_mtime)
+
+
+def format_size(size):
+    for unit in ("Б", "КБ", "МБ"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
+
+class FileListModel(
+    QAbstractTableModel
+):  # Список документов с индексом путей; строки добавляются пачками.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = []  # (путь, размер, mtime)
+        self._index = {}  # path_key -> номер строки
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path, size, mtime = self._entries[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return path
+            if column == 1:
+                return format_size(size)
+            return time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime))
+        if role == Qt.ToolTipRole:
+            return path
+        if role == SORT_ROLE:
+            return (path, size, mtime)[column]
+        if role == Qt.TextAlignmentRole and column == 1:
+            return Qt.AlignRight | Qt.AlignVCenter
+        return None
+
+    def add_entries(
+        self, entries
+    ):  # Новые записи одной вставкой; повторы пропускаются.
+        new = []
+        for entry in entries:
+            key = path_key(entry[0])
+            if key in self._index:
+                continue
+            self._index[key] = len(self._entries) + len(new)
+            new.append(entry)
+        if not new:
+            return 0
+        first = len(self._entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+        self._entries.extend(new)
+        self.endInsertRows()
+        return len(new)
+
+    def add_paths(self, paths):  # Добавление отдельных файлов (stat для каждого).
+        return self.add_entries(
+            entry for entry in map(stat_entry, paths) if entry is not None
+        )
+
+    def remove_rows(self, rows):  # Удаление строк; смежные удаляются одним блоком.
+        ranges = []
+        for row in sorted(set(rows)):
+            if ranges and row == ranges[-1][1] + 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._entries[first : last + 1]
+            self.endRemoveRows()
+        self._reindex()
+
+    def clear(self):
+        self.beginResetModel()
+        self._entries = []
+        self._index = {}
+        self.endResetModel()
+
+    def _reindex(self):
+        self._index = {path_key(e[0]): row for row, e in enumerate(self._entries)}
+
+    def contains(self, path):
+        return path_key(path) in self._index
+
+    def path(self, row):
+        return self._entries[row][0]
+
+    def paths(self):
+        return [entry[0] for entry in self._entries]
+
+    def sizes(
+        self,
+    ):  # путь -> размер из последнего stat (для прогресса и планирования).
+        return {path: size for path, size, _ in self._entries}
+
+    def total_bytes(self):
+        return sum(entry[1] for entry in self._entries)
+
+
+class FolderScanner(QThread):  # Поиск DOCX в папке через os.scandir вне GUI-потока.
+
+    batch_found = pyqtSignal(list)  # [(путь, размер, mtime), ...]
+    scan_finished = pyqtSignal(str, int)  # папка, найдено файлов
+
+    def __init__(self, folder, batch_size=500, interval=0.1, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.batch_size = batch_size
+        self.interval = interval  # секунды между пачками при медленном обходе
+        self._is_running = True
+
+    def run(self):
+        found = 0
+        batch = []
+        last_emit = time.monotonic()
+        stack = [self.folder]
+        while stack and self._is_running:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:  # нет доступа к подпапке — пропускаем её
+                continue
+            subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(".docx") and entry.is_file():
+                        st = entry.stat()  # на Windows берётся из результата обхода
+                        batch.append((entry.path, st.st_size, st.st_mtime))
+                except OSError:
+                    continue
+            stack.extend(reversed(subdirs))  # обход в алфавитном порядке
+
+            now = time.monotonic()
+            if len(batch) >= self.batch_size or (
+                batch and now - last_emit >= self.interval
+            ):
+                found += len(batch)
+                self.batch_found.emit(batch)
+                batch = []
+                last_emit = now
+        if batch and self._is_running:
+            found += len(batch)
+            self.batch_found.emit(batch)
+        self.scan_finished.emit(self.folder, found)
+
+    def stop(self):
+        self._is_running = False
@@ -0,0 +1,222 @@
+import time
+from collections import deque
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QListView,
+    QComboBox,
+    QDoubleSpinBox,
+    QAbstractItemView,
+)
+from PyQt5.QtCore import (
+    Qt,
+    QTimer,
+    QModelIndex,
+    QAbstractListModel,
+    QSortFilterProxyModel,
+)
+from PyQt5.QtGui import QColor, QFont
+
+LEVEL_COLORS = {
+    "ok": QColor("green"),
+    "error": QColor("red"),
+    "warning": QColor("orange"),
+    "info": QColor("gray"),
+}
+LEVEL_ROLE = Qt.UserRole
+SECONDS_ROLE = Qt.UserRole + 1
+
+FRAME_MS = 33  # ~30 обновлений интерфейса в секунду
+
+
+class LogModel(
+    QAbstractListModel
+):  # Журнал в кольцевом буфере; строки добавляются пачками.
+
+    def __init__(self, capacity=50000, parent=None):
+        super().__init__(parent)
+        self._entries = deque()  # (уровень, текст, подсказка, секунды)
+        self._pending = []
+        self.capacity = capacity
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        level, text, tooltip, seconds = self._entries[index.row()]
+        if role == Qt.DisplayRole:
+            return text
+        if role == Qt.ForegroundRole:
+            return LEVEL_COLORS.get(level)
+        if role == Qt.ToolTipRole:
+            return tooltip
+        if role == LEVEL_ROLE:
+            return level
+        if role == SECONDS_ROLE:
+            return seconds
+        return None
+
+    def append(
+        self, level, text, tooltip=None, seconds=None
+    ):  # Запись попадает в модель при следующем flush.
+        for line in text.splitlines() or [""]:
+            self._pending.append((level, line, tooltip, seconds))
+
+    def flush(self):  # Перенос накопленных записей в модель одной операцией.
+        if not self._pending:
+            return
+        pending = self._pending[-self.capacity :]
+        self._pending = []
+
+        overflow = len(self._entries) + len(pending) - self.capacity
+        if overflow > 0:  # старые записи вытесняются
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._entries.popleft()
+            self.endRemoveRows()
+
+        first = len(self._entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(pending) - 1)
+        self._entries.extend(pending)
+        self.endInsertRows()
+
+    def has_pending(self):
+        return bool(self._pending)
+
+    def clear(self):
+        self.beginResetModel()
+        self._entries.clear()
+        self._pending = []
+        self.endResetModel()
+
+
+class LogFilterProxy(
+    QSortFilterProxyModel
+):  # Фильтр журнала: все, ошибки, медленные файлы.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.mode = "all"
+        self.slow_seconds = 5.0
+
+    def set_filter(self, mode, slow_seconds=None):
+        self.mode = mode
+        if slow_seconds is not None:
+            self.slow_seconds = slow_seconds
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        if self.mode == "all":
+            return True
+        index = self.sourceModel().index(row, 0, parent)
+        if self.mode == "errors":
+            return index.data(LEVEL_ROLE) == "error"
+        seconds = index.data(SECONDS_ROLE)
+        return seconds is not None and seconds >= self.slow_seconds
+
+
+class LogView(QWidget):  # Виртуализированный журнал: QListView над LogModel с фильтром.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = LogModel(parent=self)
+        self.proxy = LogFilterProxy(self)
+        self.proxy.setSourceModel(self.model)
+
+        self.view = QListView()
+        self.view.setModel(self.proxy)
+        self.view.setUniformItemSizes(True)  # без измерения каждой строки
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.setFont(QFont("Consolas", 9))
+
+        self.filter_combo = QComboBox()
+        self.filter_combo.addItem("Все записи", "all")
+        self.filter_combo.addItem("Только ошибки", "errors")
+        self.filter_combo.addItem("Медленные файлы", "slow")
+        self.slow_spin = QDoubleSpinBox()
+        self.slow_spin.setRange(0.1, 3600)
+        self.slow_spin.setValue(self.proxy.slow_seconds)
+        self.slow_spin.setSuffix(" с")
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Показывать:"))
+        filter_layout.addWidget(self.filter_combo)
+        filter_layout.addWidget(QLabel("медленнее"))
+        filter_layout.addWidget(self.slow_spin)
+        filter_layout.addStretch()
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.view)
+
+        self.filter_combo.currentIndexChanged.connect(self.apply_filter)
+        self.slow_spin.valueChanged.connect(self.apply_filter)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(FRAME_MS)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def add(self, level, text, tooltip=None, seconds=None):
+        self.model.append(level, text, tooltip, seconds)
+
+    def flush(self):  # Вызывается таймером; прокрутка вниз, если журнал был внизу.
+        if not self.model.has_pending():
+            return
+        bar = self.view.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum()
+        self.model.flush()
+        if at_bottom:
+            self.view.scrollToBottom()
+
+    def clear(self):
+        self.model.clear()
+
+    def apply_filter(self):
+        self.proxy.set_filter(self.filter_combo.currentData(), self.slow_spin.value())
+
+
+def format_duration(seconds):  # 75 -> "1:15", 3725 -> "1:02:05".
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class ByteProgress:  # Прогресс пакета по объёму обработанных DOCX и оценка оставшегося времени.
+
+    def __init__(self, total_bytes):
+        self.total = total_bytes
+        self.done = 0
+        self.started = time.monotonic()
+
+    def update(self, done_bytes):
+        self.done = done_bytes
+
+    def fraction(self):
+        return self.done / self.total if self.total else 0.0
+
+    def eta(self):  # Секунды до конца или None, пока оценивать не по чему.
+        if not self.done or not self.total:
+            return None
+        elapsed = time.monotonic() - self.started
+        return elapsed / self.done * (self.total - self.done)
+
+    def text(self, filename=""):
+        mb = 2**20
+        parts = [f"{self.fraction() * 100:.0f}%"]
+        parts.append(f"{self.done / mb:.1f} из {self.total / mb:.1f} МБ")
+        eta = self.eta()
+        if eta is not None and self.done < self.total:
+            parts.append(f"осталось ~{format_duration(eta)}")
+        if filename:
+            parts.insert(0, filename)
+        return " — ".join(parts)
@@ -8,20 +8,26 @@ from PyQt5.QtWidgets import (
     QLineEdit,
     QPushButton,
     QProgressBar,
-    QTextEdit,
     QFileDialog,
     QMessageBox,
     QGroupBox,
     QCheckBox,
     QTabWidget,
-    QListWidget,
-    QListWidgetItem,
+    QTableView,
+    QHeaderView,
+    QAbstractItemView,
+    QSpinBox,
+    QComboBox,
 )
-from PyQt5.QtCore import Qt, QSettings, QTimer
-from PyQt5.QtGui import QIcon, QFont, QTextCursor
+from PyQt5.QtCore import Qt, QSettings
+from PyQt5.QtGui import QIcon
 from src.converter.converter_thread import EnhancedConverterThread
+from src.converter.engine import default_workers
+from src.converter.journal import journal_files, unfinished_count
 from src.gui.preview_window import ModernPreviewWindow
-import pypandoc
+from src.gui.preview_worker import PreviewWorker, PreviewCache, preview_key
+from src.gui.log_view import LogView, ByteProgress
+from src.gui.file_list import FileListModel, FolderScanner
 
 
 class DocxToMarkdownConverter(
@@ -31,10 +37,13 @@ class DocxToMarkdownConverter(
         super().__init__()
         self.thread = None
         self.preview_window = None
+        self.preview_cache = PreviewCache()
+        self.preview_workers = []
+        self.preview_pending = None  # ключ последнего запрошенного предпросмотра
+        self.scanners = []  # фоновые обходы папок
         self.settings = QSettings("DOCX2MD", "EnhancedConverter")
         self.init_ui()
-        self.load_settings()
-        QTimer.singleShot(100, self.check_pandoc_installation)
+        self.load_settings()  # pandoc уже проверен DependencyChecker до открытия окна
 
     def init_ui(self):  # Инициализация пользовательского интерфейса.
         self.setWindowTitle("DOCX to Markdown Converter Pro")
@@ -45,8 +54,23 @@ class DocxToMarkdownConverter(
         layout = QVBoxLayout(central)
 
         file_group = QGroupBox("Документы для конвертации")
-        self.file_list = QListWidget()
-        self.file_list.setSelectionMode(QListWidget.ExtendedSelection)
+        self.file_model = FileListModel(self)
+        self.file_list = QTableView()
+        self.file_list.setModel(self.file_model)
+        self.file_list.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.file_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.file_list.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.file_list.setShowGrid(False)
+        self.file_list.setWordWrap(False)
+        self.file_list.verticalHeader().hide()
+        self.file_list.verticalHeader().setDefaultSectionSize(
+            self.file_list.fontMetrics().height() + 6
+        )
+        header = self.file_list.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        self.scan_label = QLabel()
 
         btn_layout = QHBoxLayout()
         self.add_files_btn = QPushButton("Добавить файлы")
@@ -61,6 +85,7 @@ class DocxToMarkdownConverter(
 
         file_group_layout = QVBoxLayout()
         file_group_layout.addWidget(self.file_list)
+        file_group_layout.addWidget(self.scan_label)
         file_group_layout.addLayout(btn_layout)
         file_group.setLayout(file_group_layout)
 
@@ -69,12 +94,84 @@ class DocxToMarkdownConverter(
         self.overwrite_cb = QCheckBox("Перезаписывать существующие файлы")
         self.smart_quotes_cb = QCheckBox("Умные кавычки")
         self.preserve_tabs_cb = QCheckBox("Сохранять табуляцию")
+        self.cache_cb = QCheckBox("Кэшировать результаты конвертации")
+        self.optimize_cb = QCheckBox("Сжимать изображения (PNG без потерь, JPEG)")
+        self.trace_cb = QCheckBox("Сохранять трассировку стадий (docx2md-trace.json)")
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(default_workers() * 2, 1))
+
+        self.memory_spin = QSpinBox()
+        self.memory_spin.setRange(0, 1024 * 1024)
+        self.memory_spin.setSingleStep(512)
+        self.memory_spin.setSuffix(" МБ")
+        self.memory_spin.setSpecialValueText("авто")  # 70% физической памяти
+        self.memory_spin.setToolTip(
+            "Сколько памяти могут занимать одновременно идущие задачи; "
+            "крупные файлы запускаются первыми"
+        )
+
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("Параллельных процессов:"))
+        workers_layout.addWidget(self.workers_spin)
+        workers_layout.addWidget(QLabel("Память:"))
+        workers_layout.addWidget(self.memory_spin)
+        workers_layout.addStretch()
+
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItem("Процесс pandoc на файл", "subprocess")
+        self.backend_combo.addItem("Постоянные процессы pandoc", "warm")
+        self.backend_combo.addItem("Простые документы без pandoc", "auto")
+
+        backend_layout = QHBoxLayout()
+        backend_layout.addWidget(QLabel("Запуск pandoc:"))
+        backend_layout.addWidget(self.backend_combo)
+        backend_layout.addStretch()
+
+        self.engine_combo = QComboBox()
+        self.engine_combo.addItem("Регулярные выражения по Markdown", "regex")
+        self.engine_combo.addItem("Один обход дерева документа (AST)", "ast")
+        self.engine_combo.addItem("Потоково, для очень больших файлов", "stream")
+
+        engine_layout = QHBoxLayout()
+        engine_layout.addWidget(QLabel("Постобработка:"))
+        engine_layout.addWidget(self.engine_combo)
+        engine_layout.addStretch()
+
+        self.dedup_combo = QComboBox()
+        self.dedup_combo.addItem("Копировать каждое", "off")
+        self.dedup_combo.addItem("Жёсткие ссылки на одну копию", "hardlink")
+        self.dedup_combo.addItem("Ссылаться на уже сохранённый файл", "reference")
+
+        dedup_layout = QHBoxLayout()
+        dedup_layout.addWidget(QLabel("Повторяющиеся изображения:"))
+        dedup_layout.addWidget(self.dedup_combo)
+        dedup_layout.addStretch()
+
+        self.archive_combo = QComboBox()
+        self.archive_combo.addItem("Файлы .md и папка images", "")
+        self.archive_combo.addItem("ZIP-архив на весь пакет", "zip:batch")
+        self.archive_combo.addItem("ZIP-архив на каждый документ", "zip:document")
+        self.archive_combo.addItem("TAR-архив на весь пакет", "tar:batch")
+        self.archive_combo.addItem("TAR-архив на каждый документ", "tar:document")
+
+        archive_layout = QHBoxLayout()
+        archive_layout.addWidget(QLabel("Результат:"))
+        archive_layout.addWidget(self.archive_combo)
+        archive_layout.addStretch()
 
         settings_layout = QVBoxLayout()
         settings_layout.addWidget(self.toc_cb)
         settings_layout.addWidget(self.overwrite_cb)
         settings_layout.addWidget(self.smart_quotes_cb)
         settings_layout.addWidget(self.preserve_tabs_cb)
+        settings_layout.addWidget(self.cache_cb)
+        settings_layout.addWidget(self.optimize_cb)
+        settings_layout.addWidget(self.trace_cb)
+        settings_layout.addLayout(workers_layout)
+        settings_layout.addLayout(backend_layout)
+        settings_layout.addLayout(engine_layout)
+        settings_layout.addLayout(dedup_layout)
+        settings_layout.addLayout(archive_layout)
         settings_group.setLayout(settings_layout)
 
         output_group = QGroupBox("Папка для сохранения")
@@ -89,13 +186,18 @@ class DocxToMarkdownConverter(
         self.convert_btn = QPushButton("Начать конвертацию")
         self.cancel_btn = QPushButton("Отмена")
         self.cancel_btn.setEnabled(False)
+        self.resume_btn = QPushButton("Продолжить прерванный")
+        self.resume_btn.setToolTip(
+            "Повторить незавершённые и ошибочные файлы пакета по журналу папки"
+        )
+        self.resume_btn.setEnabled(False)
 
         self.progress = QProgressBar()
         self.progress.setAlignment(Qt.AlignCenter)
+        self.progress.setRange(0, 1000)  # доли объёма пакета, а не номера файлов
+        self.byte_progress = None
 
-        self.log = QTextEdit()
-        self.log.setReadOnly(True)
-        self.log.setFont(QFont("Consolas", 9))
+        self.log = LogView()
 
         layout.addWidget(file_group)
         layout.addWidget(settings_group)
@@ -104,6 +206,7 @@ class DocxToMarkdownConverter(
         btn_row = QHBoxLayout()
         btn_row.addWidget(self.convert_btn)
         btn_row.addWidget(self.cancel_btn)
+        btn_row.addWidget(self.resume_btn)
         layout.addLayout(btn_row)
 
         layout.addWidget(self.progress)
@@ -116,19 +219,9 @@ class DocxToMarkdownConverter(
         self.browse_btn.clicked.connect(self.select_output)
         self.convert_btn.clicked.connect(self.start_conversion)
         self.cancel_btn.clicked.connect(self.cancel_conversion)
-        self.file_list.itemDoubleClicked.connect(self.preview_file)
-
-    def check_pandoc_installation(self):  # Проверка наличия Pandoc.
-
-        try:
-            pypandoc.get_pandoc_version()
-        except OSError:
-            QMessageBox.critical(
-                self,
-                "Pandoc не найден",
-                "Для работы программы требуется Pandoc.\n\n"
-                "Установите его с официального сайта: https://pandoc.org/installing.html",
-            )
+        self.resume_btn.clicked.connect(self.resume_conversion)
+        self.output_path_edit.textChanged.connect(self.update_resume_button)
+        self.file_list.doubleClicked.connect(self.preview_file)
 
     def add_files(self):  # Добавление файлов через диалог.
 
@@ -137,39 +230,50 @@ class DocxToMarkdownConverter(
         )
 
         if files:
-            existing = {
-                self.file_list.item(i).text() for i in range(self.file_list.count())
-            }
-            for f in files:
-                if f not in existing:
-                    item = QListWidgetItem(f)
-                    item.setToolTip(f)
-                    self.file_list.addItem(item)
+            self.file_model.add_paths(files)  # повторы отсекает индекс путей модели
 
-    def add_folder(self):  # Добавление всех DOCX из папки.
+    def add_folder(self):  # Добавление всех DOCX из папки; обход идёт в фоне.
 
         folder = QFileDialog.getExistingDirectory(self, "Выберите папку с документами")
         if folder:
-            existing = {
-                self.file_list.item(i).text() for i in range(self.file_list.count())
-            }
-            for root, _, files in os.walk(folder):
-                for f in files:
-                    if f.lower().endswith(".docx"):
-                        path = os.path.join(root, f)
-                        if path not in existing:
-                            item = QListWidgetItem(path)
-                            item.setToolTip(path)
-                            self.file_list.addItem(item)
+            scanner = FolderScanner(folder, parent=self)
+            scanner.batch_found.connect(self.file_model.add_entries)
+            scanner.batch_found.connect(self.update_scan_status)
+            scanner.scan_finished.connect(self.finish_scan)
+            self.scanners.append(scanner)
+            self.update_scan_status()
+            scanner.start()
+
+    def update_scan_status(self, batch=None):  # Строка состояния под списком файлов.
+
+        text = f"Файлов: {self.file_model.rowCount()}"
+        if self.scanners:
+            text += f" — идёт поиск в папках: {len(self.scanners)}"
+        self.scan_label.setText(text)
+
+    def finish_scan(self, folder, found):  # Обход папки завершён.
+
+        scanner = self.sender()
+        if scanner in self.scanners:
+            self.scanners.remove(scanner)
+        self.update_scan_status()
 
     def remove_selected(self):  # Удаление выбранных файлов из списка.
 
-        for item in self.file_list.selectedItems():
-            self.file_list.takeItem(self.file_list.row(item))
+        rows = [index.row() for index in self.file_list.selectionModel().selectedRows()]
+        self.file_model.remove_rows(rows)
+        self.update_scan_status()
 
     def clear_list(self):  # Очистка всего списка файлов.
 
-        self.file_list.clear()
+        for scanner in self.scanners:
+            scanner.stop()
+            try:  # пачки, уже стоящие в очереди, не нужны
+                scanner.batch_found.disconnect()
+            except TypeError:  # отключён прошлой очисткой, обход ещё не завершился
+                pass
+        self.file_model.clear()
+        self.update_scan_status()
 
     def select_output(self):  # Выбор папки для сохранения.
 
@@ -177,25 +281,79 @@ class DocxToMarkdownConverter(
         if path:
             self.output_path_edit.setText(path)
 
-    def preview_file(self, item):  # редпросмотр выбранного файла.
+    def preview_file(
+        self, index
+    ):  # Предпросмотр выбранного файла; конвертация идёт в фоне.
 
         if self.preview_window is None:
             self.preview_window = ModernPreviewWindow(self)
 
+        path = self.file_model.path(index.row())
         try:
-            content = pypandoc.convert_file(
-                item.text(), "markdown", format="docx", extra_args=["--wrap=none"]
-            )
-            self.preview_window.set_content(content)
+            key = preview_key(path)
+        except OSError as e:
+            self.show_preview_error(path, str(e))
+            return
+
+        self.preview_pending = key
+        cached = self.preview_cache.get(key)
+        if cached is not None:
+            self.preview_window.set_content(*cached)
             self.preview_window.show()
-        except Exception as e:
+            return
+
+        self.preview_window.set_loading(path)
+        self.preview_window.show()
+
+        worker = PreviewWorker(path, key, self.backend_combo.currentData(), self)
+        worker.preview_ready.connect(self.show_preview)
+        worker.preview_failed.connect(self.show_preview_error)
+        worker.finished.connect(lambda: self.preview_workers.remove(worker))
+        self.preview_workers.append(worker)
+        worker.start()
+
+    def show_preview(self, key, text, html):  # Готовый предпросмотр из фонового потока.
+
+        self.preview_cache.put(key, text, html)
+        if key == self.preview_pending:  # пользователь мог открыть другой файл
+            self.preview_window.set_content(text, html)
+
+    def show_preview_error(self, path, message):  # Ошибка фоновой конвертации.
+
+        QMessageBox.warning(
+            self, "Ошибка предпросмотра", f"Не удалось открыть файл:\n{message}"
+        )
+
+    def start_conversion(self):  # Запуск нового пакета по списку файлов.
+        self.launch_conversion(resume=False)
+
+    def resume_conversion(
+        self,
+    ):  # Продолжение прерванного пакета: список файлов берётся из журнала.
+
+        files = journal_files(self.output_path_edit.text())
+        if not files:
             QMessageBox.warning(
-                self, "Ошибка предпросмотра", f"Не удалось открыть файл:\n{str(e)}"
+                self, "Нет журнала", "В папке результатов нет прерванного пакета"
             )
+            return
+        self.clear_list()
+        self.file_model.add_paths(files)
+        self.update_scan_status()
+        self.launch_conversion(resume=True)
+
+    def update_resume_button(
+        self,
+    ):  # Кнопка доступна, если в папке есть незавершённый пакет.
+        idle = self.convert_btn.isEnabled()  # во время пакета журнал занят
+        folder = self.output_path_edit.text().strip()
+        self.resume_btn.setEnabled(
+            idle and bool(folder) and unfinished_count(folder) > 0
+        )
 
-    def start_conversion(self):  # Запуск процесса конвертации.
+    def launch_conversion(self, resume):  # Проверки и запуск потока конвертации.
 
-        if self.file_list.count() == 0:
+        if self.file_model.rowCount() == 0:
             QMessageBox.warning(self, "Нет файлов", "Добавьте файлы для конвертации")
             return
 
@@ -219,54 +377,93 @@ class DocxToMarkdownConverter(
             "overwrite": self.overwrite_cb.isChecked(),
             "smart": self.smart_quotes_cb.isChecked(),
             "preserve_tabs": self.preserve_tabs_cb.isChecked(),
+            "workers": self.workers_spin.value(),
+            "memory_budget_mb": self.memory_spin.value() or None,
+            "backend": self.backend_combo.currentData(),
+            "image_dedup": self.dedup_combo.currentData(),
+            "engine": self.engine_combo.currentData(),
+            "cache": self.cache_cb.isChecked(),
+            "optimize_images": self.optimize_cb.isChecked(),
+            "resume": resume,
         }
+        if self.archive_combo.currentData():  # "формат:на что"
+            fmt, scope = self.archive_combo.currentData().split(":")
+            options["archive"] = fmt
+            options["archive_scope"] = scope
+        if self.trace_cb.isChecked():  # открывается в chrome://tracing или Perfetto
+            options["trace_path"] = os.path.join(
+                self.output_path_edit.text(), "docx2md-trace.json"
+            )
+            options["trace_format"] = "chrome"
 
         self.thread = EnhancedConverterThread(
-            [self.file_list.item(i).text() for i in range(self.file_list.count())],
+            self.file_model.paths(),
             self.output_path_edit.text(),
             options,
+            self.file_model.sizes(),
         )
 
         self.thread.progress_updated.connect(self.update_progress)
         self.thread.conversion_finished.connect(self.log_result)
         self.thread.finished_all.connect(self.finalize_conversion)
         self.thread.error_occurred.connect(self.log_error)
+        self.thread.info_message.connect(self.log_info)
 
         self.convert_btn.setEnabled(False)
         self.cancel_btn.setEnabled(True)
+        self.resume_btn.setEnabled(False)
         self.progress.setValue(0)
+        self.byte_progress = ByteProgress(0)
         self.log.clear()
 
         self.thread.start()
 
-    def update_progress(self, value, filename):  # Oбновление прогресс-бара.
+    def update_progress(
+        self, done_bytes, total_bytes, filename
+    ):  # Oбновление прогресс-бара по объёму обработанных файлов.
 
-        self.progress.setValue(value)
-        self.progress.setFormat(f"{filename} — {value}%")
+        self.byte_progress.total = total_bytes
+        self.byte_progress.update(done_bytes)
+        self.progress.setValue(int(self.byte_progress.fraction() * 1000))
+        self.progress.setFormat(self.byte_progress.text(filename))
 
-    def log_result(self, filename, message, output_path):  # Логирование результата.
+    def log_result(
+        self, filename, message, output_path, seconds
+    ):  # Логирование результата (строка попадает в журнал со следующим кадром).
 
         if output_path:
-            self.log.append(f"<font color='green'>{message}</font>")
-            self.log.append(f"<font color='gray'>Сохранено в: {output_path}</font><br>")
+            self.log.add(
+                "ok",
+                f"{message} ({seconds:.2f} с) — {output_path}",
+                f"Сохранено в: {output_path}",
+                seconds,
+            )
         else:
-            self.log.append(f"<font color='red'>{message}</font><br>")
-
-        self.log.moveCursor(QTextCursor.End)
+            self.log.add("error", message, filename, seconds)
 
     def log_error(self, message):  # Логирование ошибки.
+        self.log.add("error", message)
 
-        self.log.append(f"<font color='red'>{message}</font><br>")
-        self.log.moveCursor(QTextCursor.End)
+    def log_info(self, message):  # Информационное сообщение (сводки по пакету).
+        self.log.add("info", message)
 
     def finalize_conversion(self, success_count):  # Завершение процесса конвертации.
 
-        total = self.file_list.count()
+        if self.thread.cancelled:
+            self.log.add("warning", "Конвертация отменена пользователем")
+            self.progress.setFormat("Отменено")
+            self.progress.setValue(0)
+            self.convert_btn.setEnabled(True)
+            self.update_resume_button()
+            return
+
+        total = self.file_model.rowCount()
         self.progress.setFormat(f"Готово! Успешно: {success_count}/{total}")
-        self.progress.setValue(100)
+        self.progress.setValue(self.progress.maximum())
 
         self.convert_btn.setEnabled(True)
         self.cancel_btn.setEnabled(False)
+        self.update_resume_button()
 
         if success_count > 0:
             QMessageBox.information(
@@ -275,20 +472,14 @@ class DocxToMarkdownConverter(
                 f"Успешно обработано {success_count} из {total} файлов",
             )
 
-    def cancel_conversion(self):  # Отмена конвертации.
+    def cancel_conversion(
+        self,
+    ):  # Отмена без ожидания: итог придёт через finished_all.
 
         if self.thread and self.thread.isRunning():
             self.thread.stop()
-            self.thread.wait()
-
-            self.log.append(
-                "<font color='orange'>Конвертация отменена пользователем</font><br>"
-            )
-            self.progress.setFormat("Отменено")
-            self.progress.setValue(0)
-
-            self.convert_btn.setEnabled(True)
             self.cancel_btn.setEnabled(False)
+            self.progress.setFormat("Отмена...")
 
     def load_settings(self):  # Загрузка сохраненных настроек.
 
@@ -301,6 +492,25 @@ class DocxToMarkdownConverter(
         self.preserve_tabs_cb.setChecked(
             self.settings.value("preserve_tabs", False, type=bool)
         )
+        self.cache_cb.setChecked(self.settings.value("cache", False, type=bool))
+        self.trace_cb.setChecked(self.settings.value("trace", False, type=bool))
+        self.optimize_cb.setChecked(
+            self.settings.value("optimize_images", False, type=bool)
+        )
+        index = self.backend_combo.findData(
+            self.settings.value("backend", "subprocess")
+        )
+        self.backend_combo.setCurrentIndex(max(index, 0))
+        index = self.engine_combo.findData(self.settings.value("engine", "regex"))
+        self.engine_combo.setCurrentIndex(max(index, 0))
+        index = self.archive_combo.findData(self.settings.value("archive", ""))
+        self.archive_combo.setCurrentIndex(max(index, 0))
+        index = self.dedup_combo.findData(self.settings.value("image_dedup", "off"))
+        self.dedup_combo.setCurrentIndex(max(index, 0))
+        self.workers_spin.setValue(
+            self.settings.value("workers", default_workers(), type=int)
+        )
+        self.memory_spin.setValue(self.settings.value("memory_budget", 0, type=int))
 
     def save_settings(self):  # Сохранение текущих настроек.
 
@@ -309,10 +519,24 @@ class DocxToMarkdownConverter(
         self.settings.setValue("overwrite", self.overwrite_cb.isChecked())
         self.settings.setValue("smart_quotes", self.smart_quotes_cb.isChecked())
         self.settings.setValue("preserve_tabs", self.preserve_tabs_cb.isChecked())
+        self.settings.setValue("workers", self.workers_spin.value())
+        self.settings.setValue("memory_budget", self.memory_spin.value())
+        self.settings.setValue("cache", self.cache_cb.isChecked())
+        self.settings.setValue("trace", self.trace_cb.isChecked())
+        self.settings.setValue("optimize_images", self.optimize_cb.isChecked())
+        self.settings.setValue("backend", self.backend_combo.currentData())
+        self.settings.setValue("image_dedup", self.dedup_combo.currentData())
+        self.settings.setValue("engine", self.engine_combo.currentData())
+        self.settings.setValue("archive", self.archive_combo.currentData())
 
     def closeEvent(self, event):  # Обработка закрытия окна.
 
         self.save_settings()
+        for worker in list(self.preview_workers):
+            worker.wait()
+        for scanner in list(self.scanners):
+            scanner.stop()
+            scanner.wait()
         if self.thread and self.thread.isRunning():
             self.thread.stop()
             self.thread.wait()
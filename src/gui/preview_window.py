@@ -9,7 +9,6 @@ from PyQt5.QtWidgets import (
     QFileDialog,
 )
 from PyQt5.QtGui import QFont
-import markdown
 
 
 class ModernPreviewWindow(
@@ -54,11 +53,30 @@ class ModernPreviewWindow(
         self.save_btn.clicked.connect(self.save_content)
         self.close_btn.clicked.connect(self.close)
 
-    def set_content(self, text):  # Установка содержимого для предпросмотра.
+    def set_loading(
+        self, path
+    ):  # Состояние загрузки, пока предпросмотр готовится в фоне.
+
+        self.setWindowTitle(f"Предпросмотр Markdown — {path}")
+        self.raw_edit.setPlainText("Загрузка...")
+        self.rendered_view.setHtml("<p><i>Загрузка...</i></p>")
+        self.copy_md_btn.setEnabled(False)
+        self.copy_html_btn.setEnabled(False)
+        self.save_btn.setEnabled(False)
+
+    def set_content(
+        self, text, html=None
+    ):  # Установка содержимого; HTML может быть готов заранее.
 
         self.raw_edit.setPlainText(text)
-        html = markdown.markdown(text, extensions=["fenced_code", "codehilite"])
+        if html is None:
+            import markdown  # импорт при первом предпросмотре
+
+            html = markdown.markdown(text, extensions=["fenced_code", "codehilite"])
         self.rendered_view.setHtml(f"{html}")
+        self.copy_md_btn.setEnabled(True)
+        self.copy_html_btn.setEnabled(True)
+        self.save_btn.setEnabled(True)
 
     def copy_markdown(self):  # Копирование Markdown в буфер обмена.
 
@@ -0,0 +1,55 @@
+import os
+from collections import OrderedDict
+from PyQt5.QtCore import QThread, pyqtSignal
+from src.converter.backends import get_backend
+from src.converter.cache import PandocOutputCache
+
+
+def preview_key(path):  # Ключ предпросмотра: путь, время изменения и размер файла.
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+class PreviewCache:  # LRU готовых предпросмотров (Markdown и HTML) в памяти.
+
+    def __init__(self, max_items=16):
+        self.max_items = max_items
+        self._items = OrderedDict()
+
+    def get(self, key):
+        if key not in self._items:
+            return None
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, markdown_text, html):
+        self._items[key] = (markdown_text, html)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+
+class PreviewWorker(QThread):  # Конвертация pandoc и рендеринг HTML вне GUI-потока.
+
+    preview_ready = pyqtSignal(object, str, str)  # ключ, Markdown, HTML
+    preview_failed = pyqtSignal(str, str)  # путь, ошибка
+
+    def __init__(self, path, key, backend=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.key = key
+        self.backend = backend
+
+    def run(self):
+        try:
+            import markdown
+
+            pandoc_cache = PandocOutputCache()
+            text = pandoc_cache.get(self.path)
+            if text is None:
+                text = get_backend(self.backend).convert(self.path)
+                pandoc_cache.put(self.path, text)  # пригодится при конвертации
+            html = markdown.markdown(text, extensions=["fenced_code", "codehilite"])
+            self.preview_ready.emit(self.key, text, html)
+        except Exception as e:
+            self.preview_failed.emit(self.path, str(e))
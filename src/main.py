@@ -0,0 +1,45 @@
+# Copyright (c) 2025 [Schukin Sergey or CPA]
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+import sys
+
+
+def run_gui():  # Запуск графического интерфейса; PyQt5 импортируется только здесь.
+    from PyQt5.QtWidgets import QApplication
+    from src.gui.palette import DarkPalette
+    from src.gui.main_window import DocxToMarkdownConverter
+    from src.dependencies.checker import DependencyChecker
+
+    try:
+        app = QApplication(sys.argv)  # QMessageBox в check() требует QApplication
+        if not DependencyChecker.check():
+            return 1
+
+        DarkPalette.apply(app)
+
+        converter = DocxToMarkdownConverter()
+        converter.show()
+
+        return app.exec_()
+    except Exception as e:
+        print(f"Произошла ошибка: {str(e)}")
+        return 1
+
+
+def main(argv=None):  # С аргументами — консольный режим без Qt, без них — GUI.
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "serve":  # локальный HTTP-сервис
+        from src.service import run as serve
+
+        return serve(argv[1:])
+    if argv:
+        from src.cli import run
+
+        return run(argv)
+    return run_gui()
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()  # для пула процессов в сборке PyInstaller
+    sys.exit(main())
@@ -0,0 +1,372 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import signal
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+from src.converter import cancel
+from src.converter.engine import convert_document, default_workers
+from src.converter.archive import ArchiveWriter
+from src.converter.backends import BACKENDS
+from src.converter.pipeline import ENGINES
+from src.converter.utils import sanitize_filename
+
+DEFAULT_PORT = 8765
+MAX_HEADER_BYTES = 64 * 1024
+CHUNK_SIZE = 1 << 20
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class HttpError(Exception):  # Ответ с кодом ошибки и сообщением в JSON.
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def convert_to_zip(
+    input_path, name, options, deadline
+):  # Задача пула: DOCX -> zip (.md и images/) в байтах; к сроку pandoc прерывается.
+
+    token = cancel.CancelToken()
+    cancel.set_token(token)
+    timer = threading.Timer(max(deadline - time.time(), 0), token.cancel)
+    timer.start()
+    work_dir = tempfile.mkdtemp(prefix="docx2md-service-")
+    try:
+        md_path = os.path.join(work_dir, "doc", name + ".md")
+        os.makedirs(os.path.dirname(md_path))
+        convert_document(input_path, md_path, options)
+        zip_path = os.path.join(work_dir, name + ".zip")
+        writer = ArchiveWriter(zip_path, "zip")
+        try:
+            writer.add_document(md_path, name + ".md")
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        with open(zip_path, "rb") as f:
+            return f.read()
+    finally:
+        timer.cancel()
+        cancel.set_token(None)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class Job:  # Задание в очереди: вход, параметры и future с результатом.
+
+    def __init__(self, input_path, name, options, deadline):
+        self.input_path = input_path
+        self.name = name
+        self.options = options
+        self.deadline = deadline  # time.time(), общий для сервера и пула
+        self.future = asyncio.get_running_loop().create_future()
+        self.queued = time.monotonic()
+        self.started = None
+
+
+class ConversionService:  # HTTP на asyncio: ограниченная очередь, воркеры по числу процессов пула.
+
+    def __init__(
+        self,
+        workers=None,
+        queue_size=32,
+        timeout=120.0,
+        max_upload_mb=200,
+        roots=(),
+        options=None,
+    ):
+        self.workers = workers or default_workers()
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.max_upload = max_upload_mb * 2**20
+        self.roots = [os.path.realpath(root) for root in roots]
+        self.options = options or {}
+        self.running = 0
+        self.queue = None
+        self.pool = None
+
+    async def serve(self, host, port):  # Работает до отмены задачи (Ctrl+C).
+        self.queue = asyncio.Queue(self.queue_size)
+        # spawn: при fork процессы пула унаследовали бы сокеты клиентов,
+        # и закрытое сервером соединение оставалось бы открытым
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        try:  # SIGTERM — как Ctrl+C: пул закрывается, процессы не остаются
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, asyncio.current_task().cancel
+            )
+        except (NotImplementedError, AttributeError):  # Windows
+            pass
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        server = await asyncio.start_server(
+            self.handle, host, port, limit=MAX_HEADER_BYTES
+        )
+        address = server.sockets[0].getsockname()
+        print(
+            json.dumps({"event": "listening", "host": address[0], "port": address[1]}),
+            flush=True,
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in workers:
+                task.cancel()
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _worker(
+        self,
+    ):  # Забирает задания из очереди; одно задание — один процесс.
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            if job.future.done():  # клиент не дождался, пока задание стояло в очереди
+                continue
+            job.started = time.monotonic()
+            self.running += 1
+            try:
+                data = await loop.run_in_executor(
+                    self.pool,
+                    convert_to_zip,
+                    job.input_path,
+                    job.name,
+                    job.options,
+                    job.deadline,
+                )
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                if not job.future.done():
+                    job.future.set_result(data)
+            finally:
+                self.running -= 1
+
+    async def handle(self, reader, writer):  # Один запрос на соединение.
+        deadline = time.time() + self.timeout
+        upload_path = None
+        try:
+            method, target, headers = await self._read_head(reader)
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path == "/health":
+                status, body, extra = 200, self._health(), {}
+                content_type = "application/json"
+            elif url.path == "/convert":
+                if method != "POST":
+                    raise HttpError(405, "Используйте POST", {"Allow": "POST"})
+                if "timeout" in query:  # клиент может только сократить срок
+                    deadline = min(deadline, time.time() + float(query["timeout"]))
+                if "path" in query:
+                    input_path = self._allowed_path(query["path"])
+                else:
+                    upload_path = await self._read_body(reader, headers, deadline)
+                    input_path = upload_path
+                name = query.get("name") or os.path.basename(
+                    query.get("path", "document.docx")
+                )
+                name = sanitize_filename(os.path.splitext(os.path.basename(name))[0])
+                body, extra = await self._convert(input_path, name, query, deadline)
+                status, content_type = 200, "application/zip"
+                extra["Content-Disposition"] = f'attachment; filename="{name}.zip"'
+            else:
+                raise HttpError(404, f"Неизвестный адрес: {url.path}")
+        except HttpError as e:
+            status, extra = e.status, e.headers
+            body = json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json"
+        except (ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            status, extra, content_type = 400, {}, "application/json"
+            body = json.dumps({"error": "Некорректный запрос"}).encode("utf-8")
+        finally:
+            if upload_path is not None:
+                os.remove(upload_path)
+
+        try:
+            head = [f"HTTP/1.1 {status} {REASONS[status]}"]
+            extra.update(
+                {
+                    "Content-Type": content_type,
+                    "Content-Length": str(len(body)),
+                    "Connection": "close",
+                }
+            )
+            head += [f"{key}: {value}" for key, value in extra.items()]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+            writer.write(body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_head(self, reader):  # (метод, адрес, заголовки в нижнем регистре).
+        request_line = (await reader.readuntil(b"\r\n")).decode("latin-1")
+        method, target, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readuntil(b"\r\n")).decode("latin-1")
+            if line == "\r\n":
+                return method, target, headers
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+    async def _read_body(
+        self, reader, headers, deadline
+    ):  # Тело запроса во временный файл; путь к нему.
+        if "content-length" not in headers:
+            raise HttpError(411, "Нужен заголовок Content-Length")
+        remaining = int(headers["content-length"])
+        if remaining > self.max_upload:
+            raise HttpError(413, "Файл больше допустимого размера")
+        fd, path = tempfile.mkstemp(prefix="docx2md-upload-", suffix=".docx")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while remaining:
+                    chunk = await asyncio.wait_for(
+                        reader.read(min(remaining, CHUNK_SIZE)),
+                        max(deadline - time.time(), 0),
+                    )
+                    if not chunk:
+                        raise asyncio.IncompleteReadError(b"", remaining)
+                    f.write(chunk)
+                    remaining -= len(chunk)
+        except asyncio.TimeoutError:
+            os.remove(path)
+            raise HttpError(504, "Тело запроса не получено вовремя")
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    def _allowed_path(self, path):  # Путь на диске сервера — только внутри --root.
+        if not self.roots:
+            raise HttpError(403, "Конвертация по пути выключена (нет --root)")
+        real = os.path.realpath(path)
+        for root in self.roots:
+            if os.path.commonpath([root, real]) == root:
+                return real
+        raise HttpError(403, "Путь вне разрешённых папок")
+
+    async def _convert(
+        self, input_path, name, query, deadline
+    ):  # Постановка в очередь и ожидание; (zip, заголовки).
+
+        options = dict(self.options)
+        if "engine" in query:
+            if query["engine"] not in ENGINES:
+                raise HttpError(400, f"Неизвестный движок: {query['engine']}")
+            options["engine"] = query["engine"]
+
+        job = Job(input_path, name, options, deadline)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:  # обратное давление: клиент повторит позже
+            raise HttpError(503, "Очередь заполнена", {"Retry-After": "1"})
+        try:
+            data = await asyncio.wait_for(
+                asyncio.shield(job.future), max(deadline - time.time(), 0)
+            )
+        except asyncio.TimeoutError:
+            job.future.cancel()  # из очереди задание не будет взято
+            raise HttpError(504, "Превышено время ожидания конвертации")
+        except cancel.Cancelled:
+            raise HttpError(504, "Превышено время ожидания конвертации")
+        except Exception as e:
+            raise HttpError(422, f"Ошибка конвертации: {str(e)}")
+
+        now = time.monotonic()
+        return data, {
+            "X-Queue-Seconds": f"{job.started - job.queued:.3f}",
+            "X-Convert-Seconds": f"{now - job.started:.3f}",
+        }
+
+    def _health(self):
+        return json.dumps(
+            {
+                "workers": self.workers,
+                "running": self.running,
+                "queued": self.queue.qsize(),
+                "queue_size": self.queue_size,
+            }
+        ).encode("utf-8")
+
+
+def build_parser():  # Аргументы режима сервиса.
+    parser = argparse.ArgumentParser(
+        prog="docx2md serve",
+        description="Локальный HTTP-сервис конвертации DOCX в Markdown (zip с .md и images/).",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="процессов конвертации (одновременных заданий)",
+    )
+    parser.add_argument(
+        "--queue",
+        type=int,
+        default=32,
+        help="заданий в очереди сверх идущих; больше — 503",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=120.0, help="срок запроса, с; дольше — 504"
+    )
+    parser.add_argument("--max-upload-mb", type=int, default=200)
+    parser.add_argument(
+        "--root",
+        action="append",
+        default=[],
+        help="папка, файлы из которой можно конвертировать по ?path= (можно несколько)",
+    )
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="subprocess")
+    parser.add_argument("--engine", choices=ENGINES, default="regex")
+    parser.add_argument(
+        "--cache", action="store_true", help="использовать кэш конвертации"
+    )
+    return parser
+
+
+def run(argv=None):  # Точка входа: python -m src.service или docx2md serve.
+    args = build_parser().parse_args(argv)
+    service = ConversionService(
+        workers=max(args.workers, 1),
+        queue_size=max(args.queue, 1),
+        timeout=args.timeout,
+        max_upload_mb=args.max_upload_mb,
+        roots=args.root,
+        options={"backend": args.backend, "engine": args.engine, "cache": args.cache},
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
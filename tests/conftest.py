@@ -0,0 +1,34 @@
+import os
+import pytest
+from benchmarks.corpus import build_corpus
+from src.converter.backends import pandoc_path
+
+
+@pytest.fixture
+def pandoc():  # Тесты с настоящим pandoc пропускаются, если его нет.
+    try:
+        return pandoc_path()
+    except OSError:
+        pytest.skip("pandoc не найден")
+
+
+@pytest.fixture
+def corpus(
+    tmp_path, pandoc
+):  # Два небольших DOCX: оглавление, ссылка, изображения с подписями.
+    return build_corpus(str(tmp_path / "in"), docs=2, pages=3, images=3)
+
+
+@pytest.fixture
+def output_folder(tmp_path):
+    path = tmp_path / "out"
+    path.mkdir()
+    return str(path)
+
+
+def listing(folder):  # Все файлы под папкой, относительные пути.
+    return sorted(
+        os.path.relpath(os.path.join(root, name), folder)
+        for root, _, names in os.walk(folder)
+        for name in names
+    )
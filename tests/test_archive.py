@@ -0,0 +1,23 @@
+import os
+import zipfile
+from src.converter.engine import iter_batch
+
+
+def test_interrupted_batch_keeps_previous_archive(corpus, output_folder):
+    options = {"archive": "zip", "workers": 1, "overwrite": True}
+    list(iter_batch(corpus, output_folder, options))
+    archive = os.path.join(output_folder, "docx2md.zip")
+    with open(archive, "rb") as f:
+        complete = f.read()
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(archive).st_mode & 0o777 == 0o666 & ~umask
+
+    batch = iter_batch(corpus, output_folder, options)
+    assert next(batch)["ok"]
+    batch.close()  # пакет прерван после первого документа
+
+    with open(archive, "rb") as f:
+        assert f.read() == complete
+    assert len(zipfile.ZipFile(archive).namelist()) > len(corpus)
+    assert [n for n in os.listdir(output_folder) if n.endswith(".partial")] == []
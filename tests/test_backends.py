@@ -0,0 +1,20 @@
+import glob
+import tempfile
+from src.converter.engine import iter_batch
+
+
+def warm_scripts(folder):
+    return glob.glob(f"{folder}/docx2md-*.lua")
+
+
+def test_warm_backend_scripts_removed_after_batch(
+    corpus, output_folder, tmp_path, monkeypatch
+):
+    scratch = tmp_path / "tmp"
+    scratch.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(scratch))  # наследуют и процессы пула
+    for workers in (1, 2):
+        options = {"backend": "warm", "workers": workers, "overwrite": True}
+        results = list(iter_batch(corpus, output_folder, options))
+        assert [r["ok"] for r in results] == [True] * len(corpus)
+        assert warm_scripts(scratch) == []
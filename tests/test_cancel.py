@@ -0,0 +1,55 @@
+import os
+import tempfile
+import pytest
+from benchmarks.cancel_latency import measure, orphan_images
+from benchmarks.corpus import build_corpus
+
+SCENARIOS = (  # (движок, backend, процессов)
+    ("regex", "subprocess", 1),
+    ("stream", "subprocess", 2),
+    ("regex", "warm", 2),
+)
+
+
+def processes_mentioning(text):  # PID процессов, в командной строке которых есть text.
+    found = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().decode("utf-8", "replace")
+        except OSError:  # процесс уже завершился
+            continue
+        if text in cmdline:
+            found.append(int(pid))
+    return found
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="нужен /proc")
+@pytest.mark.parametrize("engine, backend, workers", SCENARIOS)
+def test_cancel_leaves_no_partial_outputs(
+    pandoc, tmp_path, monkeypatch, engine, backend, workers
+):
+    scratch = tmp_path / "tmp"  # скрипт warm-воркера тоже окажется под tmp_path
+    scratch.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(scratch))
+    files = build_corpus(str(tmp_path / "in"), docs=3, pages=150, images=20)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    latency, completed = measure(
+        files, str(out_dir), engine, backend, workers, delay=0.3
+    )
+
+    assert len(completed) < len(files)  # отмена пришла посреди пакета
+    assert latency < 0.5
+    assert orphan_images(str(out_dir), completed) == []
+    written = {os.path.basename(r["output"]) for r in completed}
+    leftovers = {
+        name
+        for name in os.listdir(out_dir)
+        if name.endswith((".md", ".tmp")) and name not in written
+    }
+    assert leftovers == set()
+    assert processes_mentioning(str(tmp_path)) == []  # pandoc и воркеры завершены
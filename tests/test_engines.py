@@ -0,0 +1,44 @@
+import os
+import pytest
+from benchmarks.bench_ast import normalize, same_anchors
+from src.converter.engine import convert_document
+
+
+def convert(path, folder, engine):
+    os.makedirs(folder, exist_ok=True)
+    output = os.path.join(folder, "doc.md")
+    convert_document(path, output, {"engine": engine})
+    return output
+
+
+@pytest.mark.parametrize("engine", ["ast", "stream"])
+def test_engine_matches_regex(corpus, tmp_path, engine):
+    for path in corpus:
+        expected = convert(path, str(tmp_path / "regex"), "regex")
+        actual = convert(path, str(tmp_path / engine), engine)
+
+        with open(expected, encoding="utf-8") as f:
+            content = f.read()
+        assert 'src="images/' in content  # изображения перенесены
+        assert "Рисунок 1 –" not in content  # подписи удалены
+        assert "Будет заменено." not in content  # оглавление перестроено
+        assert "[Руководство пользователя]:" in content
+
+        regex_lines, regex_anchors = normalize(expected)
+        lines, anchors = normalize(actual)
+        assert lines == regex_lines
+        assert same_anchors(regex_anchors, anchors)
+        os.remove(expected)
+        os.remove(actual)
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_unusable_cache_dir(corpus, tmp_path, monkeypatch, cache):
+    blocker = tmp_path / "notadir"
+    blocker.write_text("")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(blocker))  # кэш не создать
+    folder = tmp_path / "out"
+    folder.mkdir()
+    output = str(folder / "doc.md")
+    convert_document(corpus[0], output, {"cache": cache})
+    assert os.path.getsize(output) > 0
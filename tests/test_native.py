@@ -0,0 +1,61 @@
+import zipfile
+import pytest
+from benchmarks.corpus import CONTENT_TYPES, ROOT_RELS, STYLES, NS
+from src.converter import native
+from src.converter.backends import AutoBackend, SubprocessBackend
+
+DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    "</Relationships>"
+)
+
+CASES = {  # свойства фрагмента посреди абзаца -> должен ли он уйти в pandoc
+    "plain": ("", False),
+    "bold": ("<w:b/>", False),
+    "italic strike": ("<w:i/><w:strike/>", False),
+    "formatting pandoc ignores": (
+        '<w:rFonts w:ascii="Arial"/><w:sz w:val="30"/><w:color w:val="FF0000"/>',
+        False,
+    ),
+    "complex script bold without cs": ("<w:b/><w:bCs/>", False),
+    "rtl": ("<w:rtl/>", True),
+    "rtl bold": ("<w:bCs/><w:rtl/>", True),
+    "rtl off": ('<w:rtl w:val="0"/>', False),
+    "complex script": ("<w:i/><w:iCs/><w:cs/>", True),
+    "underline": ("<w:u/>", True),
+}
+
+
+def build(path, rpr):  # Один абзац: обычный текст, фрагмент с rpr, обычный текст.
+    runs = (
+        '<w:r><w:t xml:space="preserve">Before </w:t></w:r>'
+        f"<w:r><w:rPr>{rpr}</w:rPr><w:t>mid text</w:t></w:r>"
+        '<w:r><w:t xml:space="preserve"> after</w:t></w:r>'
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f"<w:document {NS}><w:body><w:p>{runs}</w:p><w:sectPr/></w:body></w:document>"
+    )
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", ROOT_RELS)
+        archive.writestr("word/document.xml", document)
+        archive.writestr("word/styles.xml", STYLES)
+        archive.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS)
+    return str(path)
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_native_matches_pandoc(pandoc, tmp_path, case):
+    rpr, unsupported = CASES[case]
+    path = build(tmp_path / "doc.docx", rpr)
+    expected = SubprocessBackend().convert(path)
+
+    if unsupported:
+        with pytest.raises(native.Unsupported):
+            native.convert(path)
+    else:
+        assert native.convert(path) == expected
+    assert AutoBackend().convert(path) == expected
@@ -0,0 +1,28 @@
+import os
+from src.converter.engine import iter_batch
+from conftest import listing
+
+
+def test_reruns_reuse_image_names(corpus, output_folder, tmp_path):
+    options = {"overwrite": True, "cache": True, "cache_dir": str(tmp_path / "cache")}
+    warmup = tmp_path / "warmup"  # кэш заполнен конвертацией в другую папку
+    warmup.mkdir()
+    list(iter_batch(corpus, str(warmup), dict(options, workers=1)))
+    runs = []
+    for _ in range(3):  # все запуски — попадания в кэш, в процессах пула
+        results = list(iter_batch(corpus, output_folder, dict(options, workers=2)))
+        assert all(r["ok"] for r in results)
+        runs.append(listing(output_folder))
+    assert runs[0] == runs[1] == runs[2]
+    assert [r["cached"] for r in results] == [True] * len(corpus)
+
+
+def test_image_files_get_umask_permissions(corpus, output_folder):
+    list(iter_batch(corpus, output_folder, {"workers": 1}))
+    umask = os.umask(0)
+    os.umask(umask)
+    images = os.path.join(output_folder, "images")
+    modes = {
+        os.stat(os.path.join(images, n)).st_mode & 0o777 for n in os.listdir(images)
+    }
+    assert modes == {0o666 & ~umask}
@@ -0,0 +1,46 @@
+import os
+from benchmarks.corpus import build_docx
+from src.converter.watch import FolderWatcher
+
+
+def sync(watcher):  # {путь DOCX: путь .md} сконвертированных за проход.
+    return {
+        info["input"]: info["output"]
+        for kind, info in watcher.sync()
+        if kind == "file" and info["ok"]
+    }
+
+
+def test_changed_and_new_documents_get_separate_outputs(
+    pandoc, tmp_path, output_folder
+):
+    first = tmp_path / "in" / "a" / "doc.docx"
+    second = tmp_path / "in" / "b" / "doc.docx"
+    first.parent.mkdir(parents=True)
+    second.parent.mkdir(parents=True)
+    build_docx(str(first), pages=1, images=1, seed=1)
+    with open(os.path.join(output_folder, "notes.md"), "w") as f:
+        f.write("не от синхронизации\n")
+
+    watcher = FolderWatcher([str(tmp_path / "in")], output_folder, {}, debounce=0)
+    try:
+        assert sync(watcher) == {str(first): os.path.join(output_folder, "doc.md")}
+
+        build_docx(str(first), pages=1, images=1, seed=2)  # изменён
+        os.utime(first, (1, 1))
+        build_docx(str(second), pages=1, images=1, seed=3)  # новый с тем же именем
+        (notes := tmp_path / "in" / "b" / "notes.docx").write_bytes(second.read_bytes())
+        converted = sync(watcher)
+        assert converted[str(first)] == os.path.join(output_folder, "doc.md")
+        assert len(set(converted.values())) == 3
+        assert os.path.join(output_folder, "notes.md") not in converted.values()
+        with open(os.path.join(output_folder, "notes.md")) as f:
+            assert f.read() == "не от синхронизации\n"
+
+        second.unlink()
+        notes.unlink()
+        list(watcher.sync())
+        assert os.path.exists(os.path.join(output_folder, "doc.md"))
+        assert os.path.exists(os.path.join(output_folder, "notes.md"))
+    finally:
+        watcher.close()